@@ -1,53 +1,50 @@
-
 from commands.calendar import logger
+from commands.models import ClientSearchParams, InstallationParams
 from services import db_service
-from commands.utils import is_string_non_empty
 
 
-def client_details(params):
+def client_details(params: ClientSearchParams):
     """
     Get detailed information about the client based on their first and last name
-    :param params: {first_name: str, last_name: str}
+    :param params: {first_name: str, last_name: str, limit: int, fields: list[str] | None}
     """
 
-    if not isinstance(params, dict):
-        return {'error': 'Invalid params: expected object with first_name and last_name'}
-
-    first_name = params.get('first_name')
-    last_name = params.get('last_name')
-
-    if not is_string_non_empty([first_name, last_name]):
-        return {'error': 'first_name and/or last_name should be a valid non-empty string'}
-
     try:
-        result = db_service.get_client_details(
-            first_name=first_name, last_name=last_name
-        )
+        result = db_service.get_client_details(params.first_name, params.last_name,
+                                               limit=params.limit, fields=params.fields)
         return {'data': result}
     except Exception as e:
-        logger.exception(f"Exception during fetching client data from database: {e}")
+        logger.exception("Exception during fetching client data from database: %s", e)
         return {'error': str(e)}
 
 
-def get_client_installation(params):
+def client_with_installations(params: ClientSearchParams):
     """
-    Get client's installation details based on client id
-    :param params: { client_id: str }
+    Get client details together with all of their installations
+    :param params: {first_name: str, last_name: str, limit: int, fields: list[str] | None}
     """
 
-    if not isinstance(params, dict):
-        return {'error': 'Invalid params: expected object with client_id'}
+    try:
+        result = db_service.get_client_with_installations(params.first_name, params.last_name,
+                                                          limit=params.limit, fields=params.fields)
+        return {'data': result}
+    except Exception as e:
+        logger.exception("Exception during fetching client with installations from database: %s", e)
+        return {'error': str(e)}
 
-    client_id = params.get('client_id')
 
-    if not is_string_non_empty([client_id]):
-        return {'error': 'client_id should be a valid non-empty string'}
+def get_client_installation(params: InstallationParams):
+    """
+    Get client's installation details based on client id (or list of ids)
+    :param params: { client_id: str } or { client_ids: list[str] },
+    optional: fields: list[str], limit: int, cursor: str (next_cursor of previous page)
+    """
 
     try:
         result = db_service.get_installation_details(
-            client_id=client_id
+            client_id=params.clients, fields=params.fields, limit=params.limit, cursor=params.cursor
         )
         return {'data': result}
     except Exception as e:
-        logger.exception(f"Exception during fetching installaction data from database: {e}")
+        logger.exception("Exception during fetching installaction data from database: %s", e)
         return {'error': str(e)}
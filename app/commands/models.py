@@ -0,0 +1,268 @@
+"""
+Typed tool parameters. FastMCP publishes their JSON schema and validates
+arguments once, before a tool runs; commands receive parsed values
+(aware datetimes, normalized phone numbers, lists of e-mails).
+"""
+from datetime import date, datetime
+from typing import Annotated, Literal
+from zoneinfo import ZoneInfoNotFoundError
+import re
+
+from pydantic import (AfterValidator,
+                      BaseModel,
+                      BeforeValidator,
+                      ConfigDict,
+                      Field,
+                      StringConstraints,
+                      field_validator,
+                      model_validator)
+
+from config import CALENDAR_NAMES, CLIENT_SEARCH_LIMIT, DB_MAX_ROWS, EVENT_VERBOSITY, ROUTE_VISIT_MINUTES
+from services.time_engine import LOCAL_TZ, add_duration, day_start, get_zone, parse_range, to_local
+from services.event_shape import VERBOSITY_LEVELS
+from text_normalization import strip_diacritics
+
+MAX_CLIENT_SEARCH_LIMIT = 50
+MAX_BATCH_EVENTS = 100
+MAX_BULK_SMS = 100
+MAX_SMS_LENGTH = 1000
+MAX_ROUTE_CANDIDATES = 50
+
+# compiled once at import; pydantic's own `pattern` constraints are compiled with the schema
+PHONE_PATTERN = re.compile(r"[1-9]\d{7,14}")
+EMAIL_PATTERN = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+_PHONE_SEPARATORS = str.maketrans("", "", " -()")
+
+
+def _phone_number(value) -> str:
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        raise ValueError("phone_number must be a string or an integer")
+    value = value.translate(_PHONE_SEPARATORS).removeprefix("+")
+    if not PHONE_PATTERN.fullmatch(value):
+        raise ValueError("phone_number must be a valid international number, e.g. 48123123123")
+    return value
+
+
+def _email(value: str) -> str:
+    if not EMAIL_PATTERN.fullmatch(value):
+        raise ValueError(f"Invalid email address: {value}")
+    return value
+
+
+def _lower(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def _day(value):
+    # "2025-09-01", ale też "jutro" czy "friday"
+    return parse_range(value)[0].date() if isinstance(value, str) else value
+
+
+def _id_string(value):
+    return str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+
+NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+PhoneNumber = Annotated[str, BeforeValidator(_phone_number),
+                        Field(description="international number without +, e.g. 48123123123")]
+Email = Annotated[str, StringConstraints(strip_whitespace=True), AfterValidator(_email)]
+# czas bez przesunięcia traktujemy jako lokalny (TIMEZONE), pozostałe przeliczamy do TIMEZONE
+LocalDatetime = Annotated[datetime, AfterValidator(to_local),
+                          Field(description="ISO 8601 date or date and time, e.g. 2025-09-01T08:00:00; "
+                                            "without offset Europe/Warsaw")]
+CalendarName = Annotated[Literal[CALENDAR_NAMES], BeforeValidator(_lower)]
+Verbosity = Annotated[Literal[VERBOSITY_LEVELS], BeforeValidator(_lower)]
+ClientId = Annotated[str, BeforeValidator(_id_string), StringConstraints(strip_whitespace=True, min_length=1)]
+# pole EventTime nazywa się `date` i przesłania typ w ciele klasy
+AllDayDate = Annotated[date, Field(description="all-day events, YYYY-MM-DD; the end date is exclusive")]
+SmsText = Annotated[str, AfterValidator(strip_diacritics),
+                    StringConstraints(min_length=1, max_length=MAX_SMS_LENGTH, pattern=r"\S")]
+
+
+class ToolParams(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+# --- customers ---
+
+class ClientSearchParams(ToolParams):
+    first_name: NonEmptyStr
+    last_name: NonEmptyStr
+    limit: int = Field(CLIENT_SEARCH_LIMIT, ge=1, le=MAX_CLIENT_SEARCH_LIMIT)
+    fields: list[NonEmptyStr] | None = Field(None, description="only these columns are returned")
+
+
+class InstallationParams(ToolParams):
+    client_id: ClientId | None = None
+    client_ids: list[ClientId] | None = Field(None, min_length=1)
+    fields: list[NonEmptyStr] | None = Field(None, description="only these columns are returned")
+    limit: int = Field(DB_MAX_ROWS, ge=1, le=DB_MAX_ROWS)
+    cursor: NonEmptyStr | None = Field(None, description="next_cursor of the previous page")
+
+    @model_validator(mode="after")
+    def _one_client(self):
+        if self.client_id is None and self.client_ids is None:
+            raise ValueError("client_id or client_ids is required")
+        return self
+
+    @property
+    def clients(self) -> str | list[str]:
+        return self.client_ids if self.client_ids is not None else self.client_id
+
+
+# --- calendar ---
+
+class DateRangeParams(ToolParams):
+    start_date: LocalDatetime | None = None
+    end_date: LocalDatetime | None = None
+    range: str | None = Field(None, description='natural range instead of dates, e.g. "next week", "tomorrow", '
+                                                '"friday", "next 3 days", "2025-09-01..2025-09-05", "2025-09-01 +3d"')
+    range_length: str | None = Field(None, description='range length from start_date instead of end_date, '
+                                                       'e.g. "3 days", "2 weeks", "4h"')
+
+    @model_validator(mode="after")
+    def _resolve(self):
+        if self.range is not None:
+            self.start_date, self.end_date = parse_range(self.range)
+        elif self.start_date is not None and self.range_length is not None:
+            self.end_date = add_duration(self.start_date, self.range_length)
+        if self.start_date is None or self.end_date is None:
+            raise ValueError("range, start_date with end_date, or start_date with range_length is required")
+        if self.end_date <= self.start_date:
+            raise ValueError("end_date must be after start_date")
+        return self
+
+
+class CalendarEventsParams(DateRangeParams):
+    calendar: CalendarName | Literal["all"] | list[CalendarName] = Field(
+        description='calendar name, list of names or "all"')
+    verbosity: Verbosity = EVENT_VERBOSITY
+
+    @field_validator("calendar", mode="before")
+    @classmethod
+    def _lower_calendar(cls, value):
+        return [_lower(item) for item in value] if isinstance(value, list) else _lower(value)
+
+
+class AvailableSlotsParams(DateRangeParams):
+    duration_minutes: int = Field(gt=0)
+    calendars: list[CalendarName] = Field(default_factory=lambda: list(CALENDAR_NAMES), min_length=1)
+    limit: int = Field(10, gt=0)
+
+
+class SingleEventParams(ToolParams):
+    event_id: NonEmptyStr
+    calendar: CalendarName
+    verbosity: Verbosity = EVENT_VERBOSITY
+
+
+class EventTime(ToolParams):
+    """
+    Google event time: `dateTime` for timed events or `date` for all-day ones.
+    """
+    dateTime: datetime | None = None
+    date: AllDayDate | None = None
+    timeZone: str | None = Field(None, description="IANA zone, e.g. Europe/Warsaw")
+
+    @model_validator(mode="after")
+    def _aware(self):
+        if (self.dateTime is None) == (self.date is None):
+            raise ValueError("exactly one of dateTime or date is required")
+        if self.timeZone is not None:
+            try:
+                zone = get_zone(self.timeZone)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unknown timeZone: {self.timeZone}")
+        else:
+            zone = LOCAL_TZ
+        if self.dateTime is not None and self.dateTime.tzinfo is None:
+            self.dateTime = self.dateTime.replace(tzinfo=zone)
+        return self
+
+    @property
+    def instant(self) -> datetime:
+        # dzień całodniowego wydarzenia zaczyna się o północy w TIMEZONE
+        return self.dateTime if self.dateTime is not None else day_start(self.date)
+
+
+class EventParams(ToolParams):
+    # inne pola zasobu Google (np. colorId, reminders) przechodzą bez zmian
+    model_config = ConfigDict(extra="allow")
+
+    calendar: CalendarName
+    summary: NonEmptyStr
+    description: str | None = None
+    start: EventTime
+    end: EventTime
+    attendees: list[Email] = Field(default_factory=list)
+    location: str | None = None
+
+    @model_validator(mode="after")
+    def _ordered(self):
+        if (self.start.date is None) != (self.end.date is None):
+            raise ValueError("start and end must both be dateTime or both date")
+        if self.end.instant <= self.start.instant:
+            raise ValueError("end must be after start")
+        return self
+
+    def to_event_data(self) -> dict:
+        """
+        Event in the shape of Google event resource plus `calendar`, as expected by google_service.
+        """
+        return self.model_dump(mode="json", exclude_none=True)
+
+
+class BatchEventsParams(ToolParams):
+    events: list[EventParams] = Field(min_length=1, max_length=MAX_BATCH_EVENTS)
+    allow_conflicts: bool = False
+
+
+class CandidateVisit(ToolParams):
+    location: NonEmptyStr = Field(description="installation address, e.g. ul. Słoneczna 12, 43-100 Skoczów")
+    label: NonEmptyStr | None = Field(None, description="e.g. client name")
+    duration_minutes: int = Field(ROUTE_VISIT_MINUTES, gt=0, le=12 * 60)
+    earliest: LocalDatetime | None = Field(None, description="visit may not start earlier")
+    latest: LocalDatetime | None = Field(None, description="visit must start by then")
+
+
+class RoutePlanParams(ToolParams):
+    day: Annotated[date, BeforeValidator(_day)] = Field(description='e.g. "2025-09-01", "tomorrow", "friday"')
+    candidates: list[CandidateVisit] = Field(default_factory=list, max_length=MAX_ROUTE_CANDIDATES)
+    calendar: CalendarName = "service_calendar"
+    depot: NonEmptyStr | None = Field(None, description="start and end of the day, the office by default")
+    reorder_existing: bool = Field(False, description="existing visits may be moved within working hours")
+
+
+# --- notifications ---
+
+class SmsParams(ToolParams):
+    phone_number: PhoneNumber
+    message: SmsText
+    idempotency_key: NonEmptyStr | None = None
+
+
+class BulkSmsItem(ToolParams):
+    phone_number: PhoneNumber
+    message: SmsText
+
+
+class BulkSmsParams(ToolParams):
+    messages: list[BulkSmsItem] = Field(min_length=1, max_length=MAX_BULK_SMS)
+
+
+class EmailParams(ToolParams):
+    email: list[Email] = Field(min_length=1, description="address or list of addresses")
+    subject: NonEmptyStr
+    message: NonEmptyStr
+    idempotency_key: NonEmptyStr | None = None
+
+    @field_validator("email", mode="before")
+    @classmethod
+    def _as_list(cls, value):
+        return [value] if isinstance(value, str) else value
+
+
+class NotificationStatusParams(ToolParams):
+    message_id: NonEmptyStr
@@ -1,94 +1,80 @@
-from services import notification_service
+from commands.models import BulkSmsParams, EmailParams, NotificationStatusParams, SmsParams
+from services import outbox
+from text_normalization import sms_info
 import logging
-import re
 
 
 logger = logging.getLogger(__name__)
 
 
-def sms_notification(params):
+async def sms_notification(params: SmsParams):
     """
     Send SMS via SMSAPI to given phone number with given content.
-    You cannot add polish signs to the content of the message = replace them with corresponsing letters.
-    :param params: { phone_number: str | int, message: str }
+    Polish signs are removed from the content before sending.
+    Message is queued and sent in background, returned id can be checked with notification_status.
+    Result also tells the encoding and number of billed segments.
+    :param params: { phone_number: str, message: str, idempotency_key: str | None }
     """
 
-    # Basic shape validation
-    if not isinstance(params, dict):
-        return {'error': 'Invalid params: expected object with phone_number and message'}
-
-    phone_number = params.get('phone_number')
-    message = params.get('message')
-
-    # Normalize phone to string
-    if phone_number is None:
-        return {'error': 'phone_number is required'}
-    phone_number = str(phone_number).strip()
+    try:
+        queued = await outbox.enqueue("sms", {'phone_number': params.phone_number, 'message': params.message},
+                                      idempotency_key=params.idempotency_key)
+        logger.info("SMS notification queued as %s", queued['id'])
+        return {'data': {'message_id': queued['id'], 'status': queued['status'], **sms_info(params.message)}}
+    except Exception as e:
+        logger.exception("Exception during queueing SMS: %s", e)
+        return {'error': str(e)}
 
-    # E.164-like validation
-    if not re.fullmatch(r"^[1-9]\d{7,14}$", phone_number):
-        return {'error': 'phone_number must be a valid international number, e.g. +48123123123'}
 
-    if not isinstance(message, str) or not message.strip():
-        return {'error': 'message is required and must be a non-empty string'}
-    if len(message) > 1000:
-        return {'error': 'message is too long (max 1000 characters)'}
+async def bulk_sms_notification(params: BulkSmsParams):
+    """
+    Send many SMS at once - workers deliver them together in as few SMSAPI requests as possible.
+    :param params: { messages: list[{ phone_number: str, message: str }] }
+    """
 
     try:
-        result = notification_service.send_sms_notification(
-            phone_number=phone_number,
-            message=message
-        )
-        logger.info(f"SMS notification sent successfully to {phone_number}")
-        return {'data': result if result is not None else 'SMS sent'}
+        queued = await outbox.enqueue_many("sms", [{'phone_number': item.phone_number, 'message': item.message}
+                                                   for item in params.messages])
+        logger.info("Bulk SMS notification queued, %s messages", len(queued))
+        return {'data': [{'message_id': queued_item['id'], 'status': queued_item['status'], **sms_info(item.message)}
+                         for queued_item, item in zip(queued, params.messages)]}
     except Exception as e:
-        logger.exception(f"Exception during sending SMS: {e}")
+        logger.exception("Exception during queueing bulk SMS: %s", e)
         return {'error': str(e)}
 
 
-def email_notification(params):
+async def email_notification(params: EmailParams):
     """
     Send e-mail via SMTP server and Gmail account with neccessary content.
-    :param params: { email: str | list[str], subject: str, message: str }
+    Message is queued and sent in background, returned id can be checked with notification_status.
+    :param params: { email: list[str], subject: str, message: str, idempotency_key: str | None }
     """
 
-    if not isinstance(params, dict):
-        return {'error': 'Invalid params: expected object with email, subject and message'}
-
-    email_value = params.get("email")
-    subject = params.get("subject")
-    message = params.get("message")
-
-    # Normalize recipients to list[str]
-    if email_value is None:
-        return {'error': 'email is required'}
-    if isinstance(email_value, str):
-        recipients = [email_value.strip()]
-    elif isinstance(email_value, list):
-        recipients = [str(e).strip() for e in email_value]
-    else:
-        return {'error': 'email must be a string or a list of strings'}
+    try:
+        queued = await outbox.enqueue("email", {'email': params.email, 'subject': params.subject,
+                                                'message': params.message},
+                                      idempotency_key=params.idempotency_key)
+        logger.info("E-mail notification to %s recipient(s) queued as %s", len(params.email), queued['id'])
+        return {'data': {'message_id': queued['id'], 'status': queued['status']}}
+    except Exception as e:
+        logger.exception("Exception during queueing e-mail: %s", e)
+        return {'error': str(e)}
 
-    # Validate recipients
-    if not recipients:
-        return {'error': 'email must not be empty'}
-    email_regex = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
-    for e in recipients:
-        if not re.fullmatch(email_regex, e):
-            return {'error': f'Invalid email address: {e}'}
 
-    # Validate subject and message
-    if not isinstance(subject, str) or not subject.strip():
-        return {'error': 'subject is required and must be a non-empty string'}
-    if not isinstance(message, str) or not message.strip():
-        return {'error': 'message is required and must be a non-empty string'}
+async def notification_status(params: NotificationStatusParams):
+    """
+    Check delivery status of a queued SMS or e-mail.
+    :param params: { message_id: str }
+    """
 
-    try:
-        result = notification_service.send_email_notification(
-            email=recipients, subject=subject, message=message
-        )
-        logger.info(f"E-mail notification sent successfully to {', '.join(recipients)}")
-        return {'data': result if result is not None else 'Email sent'}
-    except Exception as e:
-        logger.exception(f"Exception during sending e-mail: {e}")
-        return {'error': str(e)}
\ No newline at end of file
+    outbox.outbox_worker.ensure_started()
+    message = await outbox.status(params.message_id)
+    if message is None:
+        return {'error': f'Message {params.message_id} not found'}
+    return {'data': {
+        'message_id': message['id'],
+        'kind': message['kind'],
+        'status': message['status'],
+        'attempts': message['attempts'],
+        'last_error': message['last_error'],
+    }}
@@ -0,0 +1,185 @@
+from datetime import datetime, time, timedelta, timezone
+import logging
+import re
+
+from commands.models import RoutePlanParams
+from config import (GEOCODER_PROVIDER,
+                    ROUTE_DEPOT,
+                    ROUTE_DETOUR_FACTOR,
+                    ROUTE_MAX_DEPOT_DISTANCE_KM,
+                    ROUTE_SPEED_KMH,
+                    WORKING_HOURS_END,
+                    WORKING_HOURS_START)
+from services import google_service
+from services.event_shape import STANDARD
+from services.geocoding import get_geocoder
+from services.routing import RoutePlanner, Schedule, Stop, haversine_km, travel_matrix
+from services.time_engine import day_start, parse_datetime, to_local
+
+logger = logging.getLogger(__name__)
+
+# "ul. Słoneczna 12, 43-100 Skoczów" - fragment z numerem, przecinek, kod pocztowy i miejscowość
+ADDRESS_PATTERN = re.compile(r"[^,:;\n]*\d[^,:;\n]*,\s*\d{2}-\d{3}\s+[^,;.\n]+")
+
+
+def visit_address(event: dict) -> str | None:
+    """
+    Installation address of a service visit: event location, or the address
+    written in its description when location is the office default.
+    """
+    location = (event.get("location") or "").strip()
+    if location and location != google_service.DEFAULT_LOCATION:
+        return location
+    match = ADDRESS_PATTERN.search(event.get("description") or "")
+    return match.group().strip() if match else None
+
+
+class _Clock:
+    """
+    Converts between aware datetimes and minutes from midnight of the planned day
+    (real elapsed minutes, also on DST change days).
+    """
+
+    def __init__(self, midnight: datetime):
+        self.midnight = midnight.astimezone(timezone.utc)
+
+    def minutes(self, value: datetime) -> float:
+        return (value.astimezone(timezone.utc) - self.midnight).total_seconds() / 60
+
+    def at(self, minutes: float) -> str:
+        return to_local(self.midnight + timedelta(minutes=minutes)).isoformat(timespec="minutes")
+
+
+def _visit_dict(visit, clock: _Clock, label: dict) -> dict:
+    return {
+        **label[visit.stop.key],
+        "arrival": clock.at(visit.arrival),
+        "start": clock.at(visit.start),
+        "end": clock.at(visit.end),
+        "travel_minutes": round(visit.travel),
+        **({"late_minutes": round(visit.lateness)} if visit.lateness >= 1 else {}),
+    }
+
+
+def _plan_dict(schedule: Schedule, clock: _Clock, label: dict) -> dict:
+    return {
+        "visits": [_visit_dict(visit, clock, label) for visit in schedule.visits],
+        "travel_minutes": round(schedule.travel),
+        "return_to_depot": clock.at(schedule.return_time),
+    }
+
+
+def plan_technician_route(params: RoutePlanParams):
+    """
+    Propose the order of a day's service visits and the cheapest slots for new ones.
+    :param params: { day: date, candidates: list[{ location: str, label: str, duration_minutes: int,
+    earliest: datetime, latest: datetime }], calendar: str, depot: str, reorder_existing: bool }
+    """
+
+    try:
+        midnight = day_start(params.day)
+        clock = _Clock(midnight)
+        work_start = clock.minutes(datetime.combine(params.day, time.fromisoformat(WORKING_HOURS_START),
+                                                    tzinfo=midnight.tzinfo))
+        work_end = clock.minutes(datetime.combine(params.day, time.fromisoformat(WORKING_HOURS_END),
+                                                  tzinfo=midnight.tzinfo))
+        events = google_service.get_many_events(midnight, day_start(params.day + timedelta(days=1)),
+                                                calendar=params.calendar, verbosity=STANDARD)
+
+        geocoder = get_geocoder()
+        depot = params.depot or ROUTE_DEPOT or google_service.DEFAULT_LOCATION
+        depot_point = geocoder.geocode(depot)
+        if depot_point is None:
+            return {'error': f"Depot address not found: {depot}"}
+        points = [depot_point]
+        label, skipped = {}, []
+
+        def add_point(address: str):
+            point = geocoder.geocode(address)
+            if point is None:
+                return None
+            points.append(point)
+            return len(points) - 1
+
+        existing = []
+        for event in events:
+            if "T" not in event.get("start", ""):
+                # wydarzenia całodniowe nie są wizytami
+                continue
+            address = visit_address(event)
+            node = add_point(address) if address else None
+            if node is None:
+                skipped.append({"event_id": event["id"], "summary": event.get("summary"),
+                                "reason": "address not found" if address else "no address"})
+                continue
+            start, end = parse_datetime(event["start"]), parse_datetime(event["end"])
+            begin, duration = clock.minutes(start), (end - start).total_seconds() / 60
+            window = (work_start, max(work_start, work_end - duration)) if params.reorder_existing else (begin, begin)
+            existing.append(Stop(event["id"], node, duration, *window))
+            label[event["id"]] = {"event_id": event["id"], "summary": event.get("summary"), "address": address}
+
+        candidates = []
+        for index, candidate in enumerate(params.candidates):
+            key = f"candidate:{index}"
+            node = add_point(candidate.location)
+            if node is None:
+                skipped.append({"candidate": index, "address": candidate.location, "reason": "address not found"})
+                continue
+            earliest = clock.minutes(candidate.earliest) if candidate.earliest else work_start
+            latest = clock.minutes(candidate.latest) if candidate.latest else work_end - candidate.duration_minutes
+            candidates.append(Stop(key, node, candidate.duration_minutes, earliest, max(earliest, latest)))
+            label[key] = {"candidate": index, "label": candidate.label, "address": candidate.location}
+
+        if len(points) > 1:
+            # baza setki kilometrów od wszystkich wizyt to źle podany albo źle zgeokodowany adres -
+            # każda trasa byłaby spóźniona, więc każde wstawienie wyglądałoby na dopuszczalne
+            nearest_km = min(haversine_km(depot_point, point) for point in points[1:])
+            if nearest_km > ROUTE_MAX_DEPOT_DISTANCE_KM:
+                return {'error': f"Depot {depot} is {nearest_km:.0f} km from the nearest visit, "
+                                 f"check the depot address (ROUTE_DEPOT)"}
+
+        matrix = travel_matrix(points, ROUTE_SPEED_KMH, ROUTE_DETOUR_FACTOR)
+        planner = RoutePlanner(matrix, day_start=work_start)
+
+        if params.reorder_existing:
+            base, unplaced = planner.nearest_insertion([], existing)
+            base = planner.two_opt(base) + unplaced
+        else:
+            base = sorted(existing, key=lambda stop: stop.earliest)
+        base_schedule = planner.schedule(base)
+        # wizyt już spóźnionych (np. za ciasno zaplanowanych) nie da się naprawić wstawianiem nowych
+        planner.allowed_lateness = base_schedule.lateness
+
+        slots = []
+        for stop in candidates:
+            insertion = planner.cheapest_insertion(base, stop)
+            if insertion is None:
+                slots.append({**label[stop.key], "slot": None})
+                continue
+            position, added = insertion
+            visit = planner.schedule(base[:position] + [stop] + base[position:]).visits[position]
+            slots.append({
+                **label[stop.key],
+                "slot": {"after": label[base[position - 1].key] if position > 0 else "depot",
+                         "start": clock.at(visit.start),
+                         "end": clock.at(visit.end),
+                         "added_travel_minutes": round(added)},
+            })
+
+        route, unassigned = planner.nearest_insertion(base, candidates)
+        route = planner.two_opt(route)
+        logger.debug("Route for %s planned: %s stops, %s unassigned", params.day, len(route), len(unassigned))
+        return {'data': {
+            "day": params.day.isoformat(),
+            "depot": depot,
+            # "stub" oznacza zmyślone współrzędne - kolejność i czasy dojazdu nic nie znaczą
+            "geocoder": GEOCODER_PROVIDER,
+            "existing": _plan_dict(base_schedule, clock, label),
+            "candidate_slots": slots,
+            "proposed": _plan_dict(planner.schedule(route), clock, label),
+            "unassigned": [label[stop.key] for stop in unassigned],
+            "skipped": skipped,
+        }}
+    except Exception as e:
+        logger.exception("Exception during route planning: %s", e)
+        return {'error': str(e)}
@@ -10,6 +10,19 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 API_ACCESS_TOKEN = os.getenv('API_ACCESS_TOKEN', False)
+MCP_HOST = os.getenv("MCP_HOST", "0.0.0.0")
+MCP_PORT = int(os.getenv("MCP_PORT", 8000))
+# "sse" - single process, stateful sessions; "streamable-http" - production mode, see README
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse")
+# stateless sessions let any worker serve any request (no sticky sessions behind a load balancer)
+MCP_STATELESS_HTTP = os.getenv("MCP_STATELESS_HTTP", "true").lower() == "true"
+MCP_JSON_RESPONSE = os.getenv("MCP_JSON_RESPONSE", "true").lower() == "true"
+# worker processes in streamable-http mode; every worker has its own pools
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", os.cpu_count() or 1))
+# seconds between retries of a failed startup warmup (dependency degraded at boot)
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 30))
+# seconds a stopping worker waits for in-flight tool calls
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 30))
 GOOGLE_CLIENT_ID = (
     os.getenv("GOOGLE_CALENDAR_CLIENT_ID")
     or os.getenv("GOOGLE_CLIENT_ID")
@@ -27,15 +40,38 @@ DEFAULT_TOKEN_FILE = os.path.join(os.path.dirname(__file__), "token.json")
 
 GOOGLE_CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", DEFAULT_CREDS_FILE)
 GOOGLE_TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", DEFAULT_TOKEN_FILE)
+# seconds before expiry when the cached Google token gets refreshed
+GOOGLE_TOKEN_REFRESH_MARGIN = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", 300))
+# Calendar API root URL override, e.g. a local mock used by benchmarks/load_test.py
+GOOGLE_API_ENDPOINT = os.getenv("GOOGLE_API_ENDPOINT")
 
 SERVICE_CALENDAR = os.getenv("SERVICE_CALENDAR")
 FORMALITIES_CALENDAR = os.getenv("FORMALITIES_CALENDAR")
 PRODUCT_MEETING_CALENDAR = os.getenv("PRODUCT_MEETING_CALENDAR")
+CALENDAR_NAMES = ("service_calendar", "formalities_calendar", "product_meeting_calendar")
 
 API_KEY = os.getenv("API_KEY", False)
 GOOGLE_EMAIL_PASSWORD = os.getenv("GOOGLE_EMAIL_PASSWORD", False)
 GOOGLE_EMAIL_USER = os.getenv("GOOGLE_EMAIL_USER", False)
 SMSAPI_TOKEN = os.getenv("SMSAPI_TOKEN", False)
+SMSAPI_URL = os.getenv("SMSAPI_URL", "https://api.smsapi.pl/sms.do")
+# seconds; no SMSAPI request may hang longer than this
+SMSAPI_TIMEOUT = float(os.getenv("SMSAPI_TIMEOUT", 10))
+SMSAPI_CONNECT_TIMEOUT = float(os.getenv("SMSAPI_CONNECT_TIMEOUT", 5))
+SMSAPI_MAX_CONNECTIONS = int(os.getenv("SMSAPI_MAX_CONNECTIONS", 10))
+# consecutive failures that open the circuit, and seconds it stays open
+SMSAPI_BREAKER_THRESHOLD = int(os.getenv("SMSAPI_BREAKER_THRESHOLD", 5))
+SMSAPI_BREAKER_RESET_SECONDS = float(os.getenv("SMSAPI_BREAKER_RESET_SECONDS", 30))
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+# max number of concurrent SMTP sessions
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 3))
+# idle sessions get a NOOP this often, so the server does not drop them
+SMTP_KEEPALIVE_SECONDS = float(os.getenv("SMTP_KEEPALIVE_SECONDS", 60))
+# idle sessions older than this are closed
+SMTP_MAX_IDLE_SECONDS = float(os.getenv("SMTP_MAX_IDLE_SECONDS", 300))
 
 SUPABASE_HOST = os.getenv("SUPABASE_HOST", "localhost")
 SUPABASE_PORT = int(os.getenv("SUPABASE_PORT", 5432))
@@ -43,8 +79,109 @@ SUPABASE_USER = os.getenv("SUPABASE_USER", "postgres")
 SUPABASE_PASSWORD = os.getenv("SUPABASE_PASSWORD", False)
 SUPABASE_DB = os.getenv("SUPABASE_DB", "postgres")
 
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+# seconds a tool call waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# connections are replaced after this many seconds (Supabase pooler rotation)
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 1800))
+# connections idle longer than this are validated before reuse
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 60))
+
+TIMEZONE = os.getenv("TIMEZONE", "Europe/Warsaw")
+# default shape of calendar events returned to the agent: minimal, standard or full
+EVENT_VERBOSITY = os.getenv("EVENT_VERBOSITY", "standard")
+WORKING_HOURS_START = os.getenv("WORKING_HOURS_START", "08:00")
+WORKING_HOURS_END = os.getenv("WORKING_HOURS_END", "16:00")
+# ISO weekdays, 1 = Monday
+WORKING_DAYS = {int(day) for day in os.getenv("WORKING_DAYS", "1,2,3,4,5").split(",")}
+
+EVENT_CACHE_ENABLED = os.getenv("EVENT_CACHE_ENABLED", "true").lower() == "true"
+# how often cached calendars pull changes with sync token
+EVENT_CACHE_REFRESH_SECONDS = int(os.getenv("EVENT_CACHE_REFRESH_SECONDS", 30))
+# how far into the past the initial full sync reaches
+EVENT_CACHE_LOOKBACK_DAYS = int(os.getenv("EVENT_CACHE_LOOKBACK_DAYS", 30))
+
+# default number of candidates returned by client search
+CLIENT_SEARCH_LIMIT = int(os.getenv("CLIENT_SEARCH_LIMIT", 5))
+# minimal trigram similarity (0-1) of a candidate to be returned
+CLIENT_SEARCH_THRESHOLD = float(os.getenv("CLIENT_SEARCH_THRESHOLD", 0.3))
+
+# columns returned by DB tools, comma separated; unset = all columns
+def _columns(value: str | None) -> list[str] | None:
+    return [column.strip() for column in value.split(",") if column.strip()] if value else None
+
+CLIENT_COLUMNS = _columns(os.getenv("CLIENT_COLUMNS"))
+INSTALLATION_COLUMNS = _columns(os.getenv("INSTALLATION_COLUMNS"))
+# max rows returned by a single DB tool call
+DB_MAX_ROWS = int(os.getenv("DB_MAX_ROWS", 50))
+# DB queries run as prepared statements, parsed and planned once per connection;
+# set to false behind pgbouncer in transaction mode (e.g. Supabase pooler on port 6543)
+DB_PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "true").lower() == "true"
+
 COMPANY_HEADQUARTERS = os.getenv("COMPANY_HEADQUARTERS", "Plein 2A, 3861 AJ Nijkerk, Holandia")
 
+# technician route planning (plan_technician_route)
+# "nominatim" - OpenStreetMap search API; "stub" - made-up offline coordinates, tests and benchmarks only;
+# no default - unset makes plan_technician_route fail instead of planning on fake coordinates
+GEOCODER_PROVIDER = os.getenv("GEOCODER_PROVIDER")
+GEOCODER_URL = os.getenv("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_TIMEOUT = float(os.getenv("GEOCODER_TIMEOUT", 5))
+# geocoded addresses are kept here, every address is sent to the provider once
+DEFAULT_GEOCODER_CACHE_FILE = os.path.join(os.path.dirname(__file__), "geocode_cache.sqlite3")
+GEOCODER_CACHE_PATH = os.getenv("GEOCODER_CACHE_PATH", DEFAULT_GEOCODER_CACHE_FILE)
+# where technicians start and end the day; unset = the office (default location of created events)
+ROUTE_DEPOT = os.getenv("ROUTE_DEPOT")
+# a depot farther than this from every visit of the day is treated as a wrong address
+ROUTE_MAX_DEPOT_DISTANCE_KM = float(os.getenv("ROUTE_MAX_DEPOT_DISTANCE_KM", 150))
+# travel time = straight-line distance * detour factor at average speed
+ROUTE_SPEED_KMH = float(os.getenv("ROUTE_SPEED_KMH", 50))
+ROUTE_DETOUR_FACTOR = float(os.getenv("ROUTE_DETOUR_FACTOR", 1.3))
+# default length of a new service visit
+ROUTE_VISIT_MINUTES = int(os.getenv("ROUTE_VISIT_MINUTES", 60))
+
+
+DEFAULT_OUTBOX_FILE = os.path.join(os.path.dirname(__file__), "outbox.sqlite3")
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", DEFAULT_OUTBOX_FILE)
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", 2))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+# first retry delay, doubled with every attempt
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 5))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 5))
+# identical messages queued within this many seconds are sent once
+OUTBOX_DEDUP_WINDOW = int(os.getenv("OUTBOX_DEDUP_WINDOW", 300))
+# messages stuck in "sending" longer than this (worker killed mid-send) are queued again
+OUTBOX_STALE_SECONDS = float(os.getenv("OUTBOX_STALE_SECONDS", 120))
+
+# per-process cache of read-only tool results (seconds); 0 disables caching of given group
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_CLIENT_TTL = float(os.getenv("RESPONSE_CACHE_CLIENT_TTL", 300))
+RESPONSE_CACHE_EVENT_TTL = float(os.getenv("RESPONSE_CACHE_EVENT_TTL", 60))
+RESPONSE_CACHE_RANGE_TTL = float(os.getenv("RESPONSE_CACHE_RANGE_TTL", 30))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 256))
+
+# max number of blocking tool calls running at once
+TOOL_THREAD_POOL_SIZE = int(os.getenv("TOOL_THREAD_POOL_SIZE", 16))
+# threads fetching calendars in parallel; every tool thread may query all calendars at once
+CALENDAR_THREAD_POOL_SIZE = int(os.getenv("CALENDAR_THREAD_POOL_SIZE", TOOL_THREAD_POOL_SIZE * len(CALENDAR_NAMES)))
+
+# telemetry - calls slower than these thresholds (seconds) are logged as warnings
+SLOW_TOOL_SECONDS = float(os.getenv("SLOW_TOOL_SECONDS", 2))
+SLOW_DEPENDENCY_SECONDS = float(os.getenv("SLOW_DEPENDENCY_SECONDS", 1))
+# number of finished spans kept in memory
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 1000))
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" - one object per line for log collectors; "text" - human readable, local development
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# fraction (0-1) of DEBUG records that are written, the rest is dropped before formatting
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.1))
+# masks phone numbers, e-mails and message bodies in log output
+LOG_REDACT_PII = os.getenv("LOG_REDACT_PII", "true").lower() == "true"
+# records waiting for the writer thread; when full, new records are dropped and counted
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
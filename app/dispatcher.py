@@ -1,25 +1,180 @@
+import asyncio
+import contextvars
+import functools
+import inspect
 import logging
-from commands import  calendar, notification, customers
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import ValidationError
+from commands import  calendar, notification, customers, models, routing
+from services import google_service
+from config import (TOOL_THREAD_POOL_SIZE,
+                    RESPONSE_CACHE_ENABLED,
+                    RESPONSE_CACHE_CLIENT_TTL,
+                    RESPONSE_CACHE_EVENT_TTL,
+                    RESPONSE_CACHE_RANGE_TTL,
+                    RESPONSE_CACHE_MAX_ENTRIES)
+from response_cache import (CachePolicy,
+                            ResponseCache,
+                            calendar_event_scopes,
+                            calendar_range_scopes,
+                            client_scopes,
+                            created_event_scopes,
+                            created_events_scopes)
+from telemetry import span, record_tool_call
 
 logger = logging.getLogger(__name__)
 
 COMMANDS = {
     "get_client_details": customers.client_details,
     "get_client_installation_details": customers.get_client_installation,
+    "get_client_with_installations": customers.client_with_installations,
     "get_single_calendar_event": calendar.get_single_event,
     "get_calendar_events": calendar.list_future_events,
     "create_calendar_event": calendar.create_event,
+    "create_calendar_events": calendar.create_events,
+    "find_available_slots": calendar.find_available_slots,
+    "plan_technician_route": routing.plan_technician_route,
     "send_sms": notification.sms_notification,
+    "send_bulk_sms": notification.bulk_sms_notification,
     "send_email": notification.email_notification,
+    "get_notification_status": notification.notification_status,
 }
 
+# parameter model of every tool; main.py tools receive instances already validated by FastMCP
+PARAMS = {
+    "get_client_details": models.ClientSearchParams,
+    "get_client_installation_details": models.InstallationParams,
+    "get_client_with_installations": models.ClientSearchParams,
+    "get_single_calendar_event": models.SingleEventParams,
+    "get_calendar_events": models.CalendarEventsParams,
+    "create_calendar_event": models.EventParams,
+    "create_calendar_events": models.BatchEventsParams,
+    "find_available_slots": models.AvailableSlotsParams,
+    "plan_technician_route": models.RoutePlanParams,
+    "send_sms": models.SmsParams,
+    "send_bulk_sms": models.BulkSmsParams,
+    "send_email": models.EmailParams,
+    "get_notification_status": models.NotificationStatusParams,
+}
+
+_CACHE_POLICIES = {
+    "get_client_details": CachePolicy(RESPONSE_CACHE_CLIENT_TTL, RESPONSE_CACHE_MAX_ENTRIES, client_scopes),
+    "get_client_with_installations": CachePolicy(RESPONSE_CACHE_CLIENT_TTL, RESPONSE_CACHE_MAX_ENTRIES, client_scopes),
+    "get_client_installation_details": CachePolicy(RESPONSE_CACHE_CLIENT_TTL, RESPONSE_CACHE_MAX_ENTRIES, client_scopes),
+    "get_single_calendar_event": CachePolicy(RESPONSE_CACHE_EVENT_TTL, RESPONSE_CACHE_MAX_ENTRIES, calendar_event_scopes),
+    "get_calendar_events": CachePolicy(RESPONSE_CACHE_RANGE_TTL, RESPONSE_CACHE_MAX_ENTRIES, calendar_range_scopes),
+    "find_available_slots": CachePolicy(RESPONSE_CACHE_RANGE_TTL, RESPONSE_CACHE_MAX_ENTRIES, calendar_range_scopes),
+}
+
+# reads used to pick a time to book; see use_multiple_workers
+BOOKING_READS = ("get_calendar_events", "find_available_slots")
+
+# write tools -> scopes of cached data they change
+INVALIDATIONS = {
+    "create_calendar_event": created_event_scopes,
+    "create_calendar_events": created_events_scopes,
+}
+
+response_cache = ResponseCache({tool: policy for tool, policy in _CACHE_POLICIES.items()
+                                if RESPONSE_CACHE_ENABLED and policy.ttl > 0})
+
+def use_multiple_workers():
+    """
+    Called in every worker of a multi-process deployment. A booking invalidates
+    caches of the worker that made it only, so other workers could still offer the
+    booked slot: booking reads are not cached and busy time is synced before use.
+    """
+    for tool in BOOKING_READS:
+        response_cache.disable(tool)
+    google_service.sync_before_busy_query = True
+    logger.info("Multiple workers: %s not cached, calendars synced before slot search", ", ".join(BOOKING_READS))
+
+
+# blocking commands (psycopg2, Google API client) run here, off the event loop
+executor = ThreadPoolExecutor(max_workers=TOOL_THREAD_POOL_SIZE, thread_name_prefix="tool")
+
+
+async def run_blocking(func, *args):
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(ctx.run, func, *args))
 
-def dispatch_tool(command: str, params: dict) -> dict:
-    logger.info(f"Dispatching {command}, params={params}")
+
+_in_flight = 0
+_draining = False
+
+
+async def drain(timeout: float) -> bool:
+    """
+    Refuse new tool calls and wait up to `timeout` seconds for the running ones.
+    Returns False when some calls were still running at the deadline.
+    """
+    global _draining
+    _draining = True
+    deadline = time.monotonic() + timeout
+    if _in_flight:
+        logger.info("Draining %s in-flight tool calls", _in_flight)
+    while _in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if _in_flight:
+        logger.warning("%s tool calls still running after %ss drain", _in_flight, timeout)
+    return not _in_flight
+
+
+async def _call(handler, params):
+    if inspect.iscoroutinefunction(handler):
+        return await handler(params)
+    return await run_blocking(handler, params)
+
+
+def _invalidate(command: str, params):
+    try:
+        scopes = INVALIDATIONS[command](params)
+    except Exception:
+        # niepoprawne parametry - zapis i tak nie doszedł do skutku
+        return
+    response_cache.invalidate(scopes)
+
+
+async def dispatch_tool(command: str, params: models.ToolParams | dict) -> dict:
+    global _in_flight
     if command not in COMMANDS:
         return {"error": f"Unknown tool: {command}"}
-    try:
-        return {"result": COMMANDS[command](params)}
-    except Exception as e:
-        logger.exception(f"Error in tool {command}")
-        return {"error": str(e)}
+    if not isinstance(params, models.ToolParams):
+        try:
+            params = PARAMS[command].model_validate(params)
+        except ValidationError as e:
+            return {"error": str(e)}
+    if _draining:
+        return {"error": "Server is shutting down, retry the call"}
+    handler = COMMANDS[command]
+    started = time.perf_counter()
+    status = "ok"
+    _in_flight += 1
+    with span(f"tool.{command}", tool=command) as current:
+        try:
+            if command in response_cache.policies:
+                result = await response_cache.get_or_call(command, params, lambda: _call(handler, params))
+            else:
+                result = await _call(handler, params)
+            if isinstance(result, dict) and "error" in result:
+                # komendy zgłaszają błędy wynikiem {'error': ...}, nie wyjątkiem
+                status = "error"
+                current.status = "ERROR"
+                current.error = str(result["error"])
+            return {"result": result}
+        except Exception as e:
+            logger.exception("Error in tool %s", command)
+            status = "error"
+            current.status = "ERROR"
+            current.error = str(e)
+            return {"error": str(e)}
+        finally:
+            if command in INVALIDATIONS:
+                _invalidate(command, params)
+            _in_flight -= 1
+            duration = time.perf_counter() - started
+            record_tool_call(command, duration, status)
+            # parametry nie są logowane - zawierają dane osobowe i treści wiadomości
+            logger.debug("Tool %s finished in %.3fs (%s)", command, duration, status)
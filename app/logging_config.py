@@ -1,9 +1,172 @@
+"""
+Logging setup. Request threads only put records on an in-memory queue;
+formatting, PII redaction and writing to stderr happen in a QueueListener thread.
+"""
+from datetime import datetime, timezone
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import re
 import sys
 
+from config import LOG_DEBUG_SAMPLE_RATE, LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_REDACT_PII
+from telemetry import Counter, current_span, registry
+
+LOG_RECORDS_DROPPED = registry.register(Counter(
+    "log_records_dropped_total", "Log records dropped before writing", ("reason",)))
+
+# pola rekordu LogRecord - wszystko inne przekazane przez `extra` trafia do JSON-a
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+# treści wiadomości nigdy nie trafiają do logów, nawet przekazane w `extra`
+REDACTED_FIELDS = frozenset({"message_body", "body", "content", "subject", "text", "params"})
+
+# 48500100200, +48 500 100 200, 500-100-200; daty i godziny (2025-09-01 08:00) nie pasują
+PHONE_PATTERN = re.compile(r"(?<![\w+:-])(?:\+?\d{9,15}|\+?\d{2}[ -]\d{3}[ -]\d{3}[ -]\d{3}|\d{3}[ -]\d{3}[ -]\d{3})(?![\w:-])")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@([\w-]+\.[\w.-]+)")
+
+
+def _mask_phone(match: re.Match) -> str:
+    return f"***{match.group()[-3:]}"
+
+
+def redact(text: str) -> str:
+    """
+    Masks e-mail addresses (keeps the domain) and phone numbers (keeps last 3 digits).
+    """
+    if "@" in text:
+        text = EMAIL_PATTERN.sub(r"***@\1", text)
+    return PHONE_PATTERN.sub(_mask_phone, text)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drops DEBUG records except a random `rate` fraction of them. Runs on the
+    calling thread, so sampled-out records are never formatted.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        if random.random() < self.rate:
+            return True
+        LOG_RECORDS_DROPPED.inc(reason="sampled")
+        return False
+
+
+class ContextFilter(logging.Filter):
+    """
+    Copies trace and span id of the current span onto the record - contextvars
+    are not visible from the listener thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        current = current_span()
+        record.trace_id = current.trace_id if current else None
+        record.span_id = current.span_id if current else None
+        return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler which leaves formatting to the listener thread and never blocks:
+    when the queue is full the record is dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # standardowy QueueHandler formatuje tu wiadomość (na wątku żądania);
+        # kolejka jest w tym samym procesie, więc wystarczy przekazać rekord dalej
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, redact_pii: bool = True):
+        super().__init__()
+        self.redact_pii = redact_pii
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(message) if self.redact_pii else message,
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+            entry["span_id"] = record.span_id
+        for key, value in record.__dict__.items():
+            if key in _RECORD_ATTRIBUTES or key in entry or key in ("trace_id", "span_id"):
+                continue
+            if self.redact_pii and key in REDACTED_FIELDS:
+                value = "[redacted]"
+            elif self.redact_pii and isinstance(value, str):
+                value = redact(value)
+            entry[key] = value
+        if record.exc_info:
+            exception = self.formatException(record.exc_info)
+            entry["exc"] = redact(exception) if self.redact_pii else exception
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, redact_pii: bool = True):
+        super().__init__("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+        self.redact_pii = redact_pii
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if self.redact_pii:
+            record.message = redact(record.message)
+        return super().formatMessage(record)
+
+    def formatException(self, exc_info) -> str:
+        text = super().formatException(exc_info)
+        return redact(text) if self.redact_pii else text
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        stream=sys.stderr
-    )
\ No newline at end of file
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter(LOG_REDACT_PII) if LOG_FORMAT == "json" else TextFormatter(LOG_REDACT_PII)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = AsyncQueueHandler(records)
+    queue_handler.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_RATE))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(records, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """
+    Writes out queued records and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,14 +1,37 @@
+from contextlib import asynccontextmanager
 import logging
 from mcp.server import FastMCP
 from mcp.server.auth.settings import AuthSettings
 from pydantic import AnyHttpUrl
-import unicodedata
-from dispatcher import dispatch_tool
-from services.db_service import connection_pool
-from services.utils import check_connection
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from commands.models import (AvailableSlotsParams,
+                             BatchEventsParams,
+                             BulkSmsParams,
+                             CalendarEventsParams,
+                             ClientSearchParams,
+                             EmailParams,
+                             EventParams,
+                             InstallationParams,
+                             NotificationStatusParams,
+                             RoutePlanParams,
+                             SingleEventParams,
+                             SmsParams)
+from dispatcher import dispatch_tool, response_cache, use_multiple_workers
 from logging_config import setup_logging
-from refresh_token import refresh_token
-from config import API_ACCESS_TOKEN
+from services import notification_service
+from services.outbox import outbox_worker
+from startup import readiness, shutdown, start_warmups
+from telemetry import render_metrics, span_exporter
+from config import (API_ACCESS_TOKEN,
+                    MCP_HOST,
+                    MCP_PORT,
+                    MCP_TRANSPORT,
+                    MCP_STATELESS_HTTP,
+                    MCP_JSON_RESPONSE,
+                    MCP_WORKERS,
+                    SHUTDOWN_DRAIN_SECONDS,
+                    TRACE_BUFFER_SIZE)
 from mcp.server.auth.provider import AccessToken, TokenVerifier
 from mcp.server.fastmcp import FastMCP
 
@@ -18,7 +41,7 @@ logger = logging.getLogger(__name__)
 class SimpleTokenVerifier(TokenVerifier):
     async def verify_token(self, token: str) -> AccessToken | None:
         if token == API_ACCESS_TOKEN:
-            logger.info("Token verified")
+            logger.debug("Token verified")
             return AccessToken(
                 token=token,
                 client_id="my-client-id",
@@ -34,8 +57,10 @@ mcp = FastMCP(
     name="my_mcp_server",
     version="0.1.0",
     description="MCP server exposing access to database, calendar and notifications",
-    host="0.0.0.0",
-    port=8000,
+    host=MCP_HOST,
+    port=MCP_PORT,
+    stateless_http=MCP_STATELESS_HTTP,
+    json_response=MCP_JSON_RESPONSE,
     token_verifier=SimpleTokenVerifier(),
     auth=AuthSettings(
         issuer_url=AnyHttpUrl("https://elevenlabs.io/app/talk-to?agent_id=agent_2301k360t7jrf13thvd4mwesv0am"),
@@ -44,68 +69,154 @@ mcp = FastMCP(
 )
 
 
-def check_db_connection():
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> JSONResponse:
     """
-    Check connection to db on server start
+    Liveness - server is up, dependencies may still be warming up or degraded.
+    """
+    return JSONResponse(readiness.snapshot())
+
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(request: Request) -> JSONResponse:
+    """
+    Readiness - 503 until all dependencies are warmed up.
+    """
+    snapshot = readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["status"] == "ready" else 503)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """
+    Tool and dependency latency metrics in Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@mcp.custom_route("/traces", methods=["GET"])
+async def traces(request: Request) -> JSONResponse:
+    """
+    Most recent finished spans, newest last.
     """
-    conn = connection_pool.getconn()
     try:
-        if not check_connection(conn=conn, logger=logger):
-            logger.error("Connection with Postgres failed.")
-        else:
-            logger.info("Connection with Postgres established successfully")
-    finally:
-        connection_pool.putconn(conn)
+        limit = int(request.query_params.get("limit", 100))
+    except ValueError:
+        return JSONResponse({"error": "limit must be an integer"}, status_code=400)
+    limit = min(max(limit, 1), TRACE_BUFFER_SIZE)
+    spans = span_exporter.get_finished_spans()[-limit:]
+    return JSONResponse([finished.to_dict() for finished in spans])
+
+
+@mcp.custom_route("/cache", methods=["GET"])
+async def cache_stats(request: Request) -> JSONResponse:
+    """
+    Response cache hit/miss statistics of this worker.
+    """
+    return JSONResponse(response_cache.stats())
 
 
 @mcp.tool(name="get_client_details")
-def get_client_details(params: dict) -> dict:
+async def get_client_details(params: ClientSearchParams) -> dict:
     """
     Get client details from the database.
-    :param params: { first_name: string, last_name: string}
+    Names do not have to be exact - polish signs and small typos are tolerated.
+    Returns best matching clients first, each with score (1.0 = exact match).
+    :param params: { first_name: string, last_name: string, limit: int optional (default 5),
+    fields: list[str] optional - only these columns are returned }
     """
-    logger.info(f"get_client_details called -> ({params})")
-    return dispatch_tool("get_client_details", params)
+    return await dispatch_tool("get_client_details", params)
+
+
+@mcp.tool(name="get_client_with_installations")
+async def get_client_with_installations(params: ClientSearchParams) -> dict:
+    """
+    Get client details together with all of their installations in one call.
+    Prefer this over get_client_details followed by get_client_installation_details.
+    :param params: { first_name: string, last_name: string, limit: int optional (default 5),
+    fields: list[str] optional - only these client columns are returned }
+    """
+    return await dispatch_tool("get_client_with_installations", params)
 
 
 @mcp.tool(name="get_client_installation_details")
-def get_client_installation_details(params: dict) -> dict:
+async def get_client_installation_details(params: InstallationParams) -> dict:
     """
-    Get client's installation details based on client id
-    :param params: { client_id: str }
+    Get client's installation details based on client id.
+    Installations of several clients can be fetched at once with client_ids.
+    Results are paged: if has_more is true, call again with cursor set to next_cursor.
+    :param params: { client_id: str } or { client_ids: list[str] },
+    optional: fields: list[str], limit: int, cursor: str }
     """
-    logger.info(f"get_client_installation_details called -> ({params})")
-    return dispatch_tool("get_client_installation_details", params)
+    return await dispatch_tool("get_client_installation_details", params)
 
 
 @mcp.tool(name="get_single_calendar_event")
-def get_single_calendar_event(params: dict) -> dict:
+async def get_single_calendar_event(params: SingleEventParams) -> dict:
     """
     Get calendar event details based on its ID.
     :param params: { event_id: str,
-    calendar: str one of [product_meeting_calendar, service_calendar, formalities_calendar] }
+    calendar: str one of [product_meeting_calendar, service_calendar, formalities_calendar],
+    verbosity: str optional one of [minimal, standard, full] - standard by default, use full only when needed }
     """
-    logger.info(f"get_single_calendar_event called -> ({params})")
-    return dispatch_tool("get_single_calendar_event", params)
+    return await dispatch_tool("get_single_calendar_event", params)
 
 
 @mcp.tool(name="get_calendar_events")
-def get_calendar_events(params: dict) -> dict:
+async def get_calendar_events(params: CalendarEventsParams) -> dict:
     """
     Get calendar events for a given date range.
-    The date range must be in format YYYY-MM-DDTHH:MM:SS+02:00.
-    The end date must be at least a day after the start date.
-    :param params: { start_date: str, end_date: str,
-    calendar: str one of [product_meeting_calendar, service_calendar, formalities_calendar]
+    Give either range (e.g. "next week", "tomorrow", "friday", "next 3 days", "2025-09-01..2025-09-05"),
+    or start_date with end_date or range_length ("3 days") - dates as YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS,
+    Europe/Warsaw time, no offset needed.
+    Several calendars can be checked in one call - pass a list of names or "all".
+    Every returned event has `calendar` field with its source calendar, events are sorted by start time.
+    Times are returned in Europe/Warsaw, recurring events as separate occurrences.
+    :param params: { range: str | start_date: str, end_date: str | range_length: str,
+    calendar: str one of [product_meeting_calendar, service_calendar, formalities_calendar, all]
+    or list of calendar names,
+    verbosity: str optional one of [minimal (id, summary, start, end), standard (+ location, description,
+    attendees), full (raw Google event)] - standard by default
     }
     results of the tool are TAKEN days of the calendar - you cannot use them as available
+    To look for free time use find_available_slots instead.
+    """
+    return await dispatch_tool("get_calendar_events", params)
+
+
+@mcp.tool(name="find_available_slots")
+async def find_available_slots(params: AvailableSlotsParams) -> dict:
+    """
+    Find free time windows (within working hours) long enough for a meeting of given duration.
+    Busy time of all calendars is taken into account unless calendars are given.
+    Range as in get_calendar_events: range ("next week") or start_date with end_date / range_length.
+    :param params: { range: str | start_date: str, end_date: str | range_length: str, duration_minutes: int,
+    calendars: list[str] optional, any of [product_meeting_calendar, service_calendar, formalities_calendar],
+    limit: int optional - max number of windows returned (default 10) }
+    results are AVAILABLE windows, earliest first - the meeting can start at any time
+    between window start and (window end - duration)
+    """
+    return await dispatch_tool("find_available_slots", params)
+
+
+@mcp.tool(name="plan_technician_route")
+async def plan_technician_route(params: RoutePlanParams) -> dict:
+    """
+    Plan a technician's day of service visits by travel time between installation addresses.
+    Proposes the cheapest slot for each new visit among the existing ones and the visiting
+    order of the whole day. Existing visits keep their times unless reorder_existing is true.
+    :param params: { day: str e.g. "2025-09-01", "tomorrow", "friday",
+    candidates: list[{ location: str installation address, label: str optional e.g. client name,
+    duration_minutes: int optional (default 60), earliest: str optional, latest: str optional - latest start }],
+    calendar: str optional (default "service_calendar"), depot: str optional - start and end of the day,
+    reorder_existing: bool optional (default false) }
+    results are PROPOSALS only - book the chosen slots with create_calendar_event
     """
-    logger.info(f"get_calendar_events called -> ({params})")
-    return dispatch_tool("get_calendar_events", params)
+    return await dispatch_tool("plan_technician_route", params)
 
 
 @mcp.tool(name="create_calendar_event")
-def create_calendar_event(params: dict) -> dict:
+async def create_calendar_event(params: EventParams) -> dict:
     """
     Create a new calendar event.
     Summary and description can be the same.
@@ -117,40 +228,131 @@ def create_calendar_event(params: dict) -> dict:
     "spotkanie produktowe", "spotkanie w sprawie dofinansowania"),
     start: { dateTime: dateTime(in format YYYY-MM-DDTHH:MM:SS), timeZone: timeZone in format Europe/Warsaw},
     end: { dateTime: dateTime(in format YYYY-MM-DDTHH:MM:SS), timeZone: timeZone in format Europe/Warsaw},
+    all-day events use { date: YYYY-MM-DD } instead of dateTime (end date is exclusive),
     attendees: list[string], location: string - if not provided, the event will take place in "ul. Wałowa 3, 43-100 Skoczów" }
     """
-    logger.info(f"create_calendar_event called -> ({params})")
-    return dispatch_tool("create_calendar_event", params)
+    return await dispatch_tool("create_calendar_event", params)
+
+
+@mcp.tool(name="create_calendar_events")
+async def create_calendar_events(params: BatchEventsParams) -> dict:
+    """
+    Create several calendar events in one call (e.g. a series of service visits).
+    Every event is checked against existing events first - colliding ones are NOT created.
+    Calling again with the same events does not create duplicates.
+    :param params: { events: list of objects with the same fields as in create_calendar_event,
+    allow_conflicts: bool optional (default false) - create events even if they collide }
+    result for every event (same order): { index, event_id, status: created | conflict | already_exists | error,
+    conflicts_with: list of colliding event ids (for conflict) }
+    """
+    return await dispatch_tool("create_calendar_events", params)
 
 
 @mcp.tool(name="send_sms")
-def send_sms(params: dict) -> dict:
+async def send_sms(params: SmsParams) -> dict:
     """
-    Send SMS via SMSAPI to given phone number with given content
-    :param params: { phone_number: str | int, message: str }
+    Send SMS via SMSAPI to given phone number with given content.
+    Polish (and other accented) letters are replaced with plain ones, so the SMS stays in GSM-7.
+    SMS is queued and sent in background - returns message_id, delivery can be checked
+    with get_notification_status, and number of billed segments (160 characters each, 153 when split).
+    :param params: { phone_number: str | int, message: str,
+    idempotency_key: str optional - repeated calls with the same key send only one SMS }
     """
-    logger.info(f"send_sms called -> ({params})")
-    params['message'] = "".join(
-        c for c in unicodedata.normalize("NFKD", params['message'])
-        if not unicodedata.combining(c)
-    )
+    return await dispatch_tool("send_sms", params)
 
-    return dispatch_tool("send_sms", params)
+
+@mcp.tool(name="send_bulk_sms")
+async def send_bulk_sms(params: BulkSmsParams) -> dict:
+    """
+    Send many SMS at once (e.g. the same reminder to several clients, or different texts to different numbers).
+    Messages are queued and sent together - returns message_id for every message, in the same order.
+    :param params: { messages: list[{ phone_number: str | int, message: str }] }
+    """
+    return await dispatch_tool("send_bulk_sms", params)
 
 
 @mcp.tool(name="send_email")
-def send_email(params: dict) -> dict:
+async def send_email(params: EmailParams) -> dict:
     """
     Send e-mail via SMTP server and Gmail account with neccessary content.
-    :param params: { email: str | list[str], subject: str, message: str }
+    E-mail is queued and sent in background - returns message_id, delivery can be checked
+    with get_notification_status.
+    :param params: { email: str | list[str], subject: str, message: str,
+    idempotency_key: str optional - repeated calls with the same key send only one e-mail }
     """
 
-    logger.info(f"send_email called -> ({params})")
-    return dispatch_tool("send_email", params)
+    return await dispatch_tool("send_email", params)
+
+
+@mcp.tool(name="get_notification_status")
+async def get_notification_status(params: NotificationStatusParams) -> dict:
+    """
+    Check delivery status of SMS or e-mail sent with send_sms / send_email.
+    Status is one of: queued, sending, sent, failed.
+    :param params: { message_id: str }
+    """
+    return await dispatch_tool("get_notification_status", params)
+
+
+@asynccontextmanager
+async def worker_lifespan():
+    """
+    Background work of one server process: warmups and outbox workers start with
+    the server's event loop, pools are released on stop.
+    """
+    start_warmups()
+    # semafor i keepalive puli SMTP należą do pętli zdarzeń serwera
+    notification_service.smtp_pool.start()
+    # kolejka wysyłana od startu, także wiadomości pozostawione przez poprzedni proces
+    outbox_worker.ensure_started()
+    try:
+        yield
+    finally:
+        await shutdown(SHUTDOWN_DRAIN_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # in-flight calls finish before the session manager cancels its tasks
+    async with mcp.session_manager.run(), worker_lifespan():
+        yield
+
+
+@asynccontextmanager
+async def sse_lifespan(app):
+    async with worker_lifespan():
+        yield
+
+
+def create_app():
+    """
+    Streamable HTTP ASGI app for multi-worker deployments, one per worker process.
+
+        uvicorn main:create_app --factory --workers 4
+        gunicorn 'main:create_app()' -k uvicorn.workers.UvicornWorker -w 4 --graceful-timeout 30
+
+    Pools, credentials and caches are created lazily after the worker starts,
+    so nothing is shared across processes.
+    """
+    if MCP_WORKERS > 1:
+        use_multiple_workers()
+    app = mcp.streamable_http_app()
+    app.router.lifespan_context = lifespan
+    return app
 
 
 if __name__ == "__main__":
-    refresh_token()
-    logger.info(f"Starting MCP SSE server on {mcp.settings.host}:{mcp.settings.port}")
-    check_db_connection()
-    mcp.run(transport="sse")
+    if MCP_TRANSPORT == "streamable-http":
+        import uvicorn
+
+        logger.info("Starting MCP Streamable HTTP server on %s:%s with %s workers", MCP_HOST, MCP_PORT, MCP_WORKERS)
+        uvicorn.run("main:create_app", factory=True, host=MCP_HOST, port=MCP_PORT, workers=MCP_WORKERS,
+                    timeout_graceful_shutdown=int(SHUTDOWN_DRAIN_SECONDS), log_config=None)
+    else:
+        import uvicorn
+
+        logger.info("Starting MCP SSE server on %s:%s", mcp.settings.host, mcp.settings.port)
+        app = mcp.sse_app()
+        app.router.lifespan_context = sse_lifespan
+        uvicorn.run(app, host=mcp.settings.host, port=mcp.settings.port,
+                    timeout_graceful_shutdown=int(SHUTDOWN_DRAIN_SECONDS), log_config=None)
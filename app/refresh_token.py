@@ -47,3 +47,7 @@ def refresh_token():
             print("[DEBUG] New token.json saved", file=sys.stderr)
 
     return creds
+
+
+if __name__ == "__main__":
+    refresh_token()
@@ -0,0 +1,244 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+import asyncio
+import json
+import logging
+import time
+
+from config import CALENDAR_NAMES
+from telemetry import Counter, Gauge, registry
+from text_normalization import fold_search_key
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = registry.register(Counter(
+    "response_cache_requests_total", "Response cache lookups by tool and result (hit, miss, coalesced)",
+    ("tool", "result")))
+CACHE_EVICTIONS = registry.register(Counter(
+    "response_cache_evictions_total", "Entries dropped by LRU, TTL or invalidation", ("tool", "reason")))
+
+_STAT_NAMES = {"hit": "hits", "miss": "misses", "coalesced": "coalesced"}
+
+# values compared exactly; other strings are compared case- and whitespace-insensitively
+CASE_SENSITIVE_PARAMS = {"cursor", "event_id"}
+# wyszukiwanie klientów ignoruje polskie znaki - "Łukasz" i "lukasz" to ten sam wynik
+SEARCH_KEY_PARAMS = {"first_name", "last_name"}
+
+
+@dataclass(frozen=True, slots=True)
+class Scope:
+    """
+    Part of the data a cached response depends on, e.g. a calendar time range.
+    `start` / `end` of None mean an unbounded range.
+    """
+    resource: str
+    start: datetime | None = None
+    end: datetime | None = None
+
+    def overlaps(self, other: "Scope") -> bool:
+        if self.resource != other.resource:
+            return False
+        if None in (self.start, self.end, other.start, other.end):
+            return True
+        return self.start < other.end and other.start < self.end
+
+
+@dataclass(slots=True)
+class CachePolicy:
+    ttl: float
+    max_entries: int = 256
+    # params -> scopes the response depends on; invalidated when a write touches them
+    scopes: object = None
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: object
+    expires_at: float
+    scopes: tuple = field(default_factory=tuple)
+
+
+def normalize_params(value, key: str | None = None):
+    """
+    Canonical form of tool params: keys sorted, empty values dropped,
+    strings trimmed and case-folded (except CASE_SENSITIVE_PARAMS), names folded like
+    client search keys, numbers as strings.
+    """
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {k: normalize_params(v, k) for k, v in sorted(value.items()) if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize_params(item, key) for item in value]
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        if key in SEARCH_KEY_PARAMS:
+            return fold_search_key(value)
+        return value if key in CASE_SENSITIVE_PARAMS else value.casefold()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def cache_key(tool: str, params) -> str:
+    return f"{tool}:{json.dumps(normalize_params(params), sort_keys=True, ensure_ascii=False, default=str)}"
+
+
+class ResponseCache:
+    """
+    Per-tool TTL + LRU cache of tool results in front of dispatcher.COMMANDS.
+
+    Concurrent calls with the same normalized params share one execution
+    (single-flight). Error results are never stored. Write tools invalidate
+    entries whose scopes overlap what they changed. Used from the event loop
+    only, so it needs no locking.
+    """
+
+    def __init__(self, policies: dict[str, CachePolicy]):
+        self.policies = policies
+        self._entries: dict[str, OrderedDict[str, _Entry]] = {tool: OrderedDict() for tool in policies}
+        self._pending: dict[str, asyncio.Future] = {}
+        # bumped by every invalidation; results fetched across one are not stored
+        self._generation = 0
+        self._stats = {tool: {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0}
+                       for tool in policies}
+        registry.register(Gauge("response_cache_entries", "Cached responses per tool", ("tool",),
+                                lambda: {(tool,): len(entries) for tool, entries in self._entries.items()}))
+
+    def _count(self, tool: str, result: str):
+        self._stats[tool][_STAT_NAMES[result]] += 1
+        CACHE_REQUESTS.inc(tool=tool, result=result)
+
+    def _evict(self, tool: str, key: str, reason: str):
+        del self._entries[tool][key]
+        self._stats[tool]["invalidations" if reason == "invalidated" else "evictions"] += 1
+        CACHE_EVICTIONS.inc(tool=tool, reason=reason)
+
+    async def get_or_call(self, tool: str, params, call):
+        """
+        Cached result of `await call()` for given tool params.
+        """
+        policy = self.policies[tool]
+        entries = self._entries[tool]
+        key = cache_key(tool, params)
+
+        entry = entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                entries.move_to_end(key)
+                self._count(tool, "hit")
+                return entry.value
+            self._evict(tool, key, "expired")
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._count(tool, "coalesced")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    # anulowano to wywołanie, nie lidera
+                    raise
+            # lider został anulowany (np. klient się rozłączył) - oczekujący wykonują wywołanie od nowa
+            return await self.get_or_call(tool, params, call)
+
+        self._count(tool, "miss")
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        generation = self._generation
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # wyjątek odbierają oczekujący; bez nich asyncio zgłasza "never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if generation == self._generation and not (isinstance(value, dict) and "error" in value):
+                self._store(tool, policy, key, params, value)
+            return value
+        finally:
+            del self._pending[key]
+
+    def disable(self, tool: str):
+        """
+        Stop caching responses of a tool.
+        """
+        self.policies.pop(tool, None)
+        self._entries.pop(tool, None)
+        self._stats.pop(tool, None)
+
+    def _store(self, tool: str, policy: CachePolicy, key: str, params, value):
+        try:
+            scopes = tuple(policy.scopes(params)) if policy.scopes else ()
+        except Exception as e:
+            # bez zakresu nie da się unieważnić wpisu - lepiej go nie zapisywać
+            logger.warning("Not caching %s response, scope resolution failed: %s", tool, e)
+            return
+        entries = self._entries[tool]
+        entries[key] = _Entry(value, time.monotonic() + policy.ttl, scopes)
+        entries.move_to_end(key)
+        while len(entries) > policy.max_entries:
+            self._evict(tool, next(iter(entries)), "lru")
+
+    def invalidate(self, scopes: list[Scope]) -> int:
+        """
+        Drop every cached response depending on any of the scopes.
+        """
+        self._generation += 1
+        dropped = 0
+        for tool, entries in self._entries.items():
+            for key in [key for key, entry in entries.items()
+                        if any(cached.overlaps(scope) for cached in entry.scopes for scope in scopes)]:
+                self._evict(tool, key, "invalidated")
+                dropped += 1
+        if dropped:
+            logger.debug("Response cache: %s entries invalidated", dropped)
+        return dropped
+
+    def clear(self):
+        for entries in self._entries.values():
+            entries.clear()
+
+    def stats(self) -> dict:
+        return {tool: {**stats, "size": len(self._entries[tool])} for tool, stats in self._stats.items()}
+
+
+# --- scopes ---
+
+def _calendar_names(calendar) -> list[str]:
+    if isinstance(calendar, str):
+        return list(CALENDAR_NAMES) if calendar == "all" else [calendar]
+    return list(calendar)
+
+
+def calendar_range_scopes(params) -> list[Scope]:
+    """
+    Scopes of get_calendar_events / find_available_slots: requested range of every calendar.
+    """
+    calendars = params.calendars if hasattr(params, "calendars") else params.calendar
+    return [Scope(f"calendar:{name}", params.start_date, params.end_date) for name in _calendar_names(calendars)]
+
+
+def calendar_event_scopes(params) -> list[Scope]:
+    return [Scope(f"event:{params.calendar}:{params.event_id}")]
+
+
+def client_scopes(params) -> list[Scope]:
+    return [Scope("clients")]
+
+
+def created_event_scopes(event) -> list[Scope]:
+    """
+    Calendar range taken by a new event (create_calendar_event params).
+    """
+    return [Scope(f"calendar:{event.calendar}", event.start.instant, event.end.instant)]
+
+
+def created_events_scopes(params) -> list[Scope]:
+    return [scope for event in params.events for scope in created_event_scopes(event)]
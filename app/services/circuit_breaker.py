@@ -0,0 +1,68 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for `reset_timeout` seconds after
+    `failure_threshold` consecutive failures, then lets a single trial call through.
+    A trial call that ends without a verdict (cancelled, unexpected error) is
+    released with `record_aborted`; one that never reports back stops blocking
+    calls after another `reset_timeout`.
+    Used from the event loop only, so it needs no locking.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    def before_call(self):
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open), try again later")
+            self.state = HALF_OPEN
+            self._probe_started = time.monotonic()
+            logger.info("Circuit `%s` half-open, trying a call", self.name)
+        elif self.state == HALF_OPEN:
+            if time.monotonic() - self._probe_started < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} is being probed (circuit half-open), try again later")
+            # próba nie zgłosiła wyniku - kolejne wywołanie staje się nową próbą
+            self._probe_started = time.monotonic()
+            logger.warning("Circuit `%s` trial call timed out, trying another call", self.name)
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info("Circuit `%s` closed", self.name)
+        self.state = CLOSED
+        self._failures = 0
+
+    def record_aborted(self):
+        """
+        Call ended without telling whether the dependency works; a trial call
+        is given back, so the next call may probe again right away.
+        """
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+            self._opened_at = time.monotonic() - self.reset_timeout
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            logger.error("Circuit `%s` opened after %s failures", self.name, self._failures)
@@ -0,0 +1,300 @@
+from collections import deque
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class _Waiter:
+    __slots__ = ("event", "item", "may_create")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.item: _PooledConnection | None = None
+        self.may_create = False
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    Callers that find the pool exhausted wait in FIFO order for a connection
+    handed over by putconn (up to `timeout` seconds) instead of failing.
+    Connections idle longer than `max_idle` are validated before reuse and
+    connections older than `max_lifetime` are replaced, so server-side poolers
+    (Supabase/pgbouncer) can rotate their backends.
+    """
+
+    def __init__(self, min_size: int, max_size: int, timeout: float,
+                 max_lifetime: float, max_idle: float, **conn_kwargs):
+        if min_size > max_size:
+            raise ValueError("min_size cannot be greater than max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self._conn_kwargs = conn_kwargs
+
+        self._lock = threading.Lock()
+        self._idle: deque[_PooledConnection] = deque()
+        self._waiters: deque[_Waiter] = deque()
+        self._in_use: dict[int, _PooledConnection] = {}
+        self._size = 0
+
+        self._acquired = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # --- connection lifecycle ---
+
+    def _connect(self) -> _PooledConnection:
+        conn = psycopg2.connect(**self._conn_kwargs)
+        with self._lock:
+            self._created += 1
+        return _PooledConnection(conn)
+
+    def _close(self, item: _PooledConnection):
+        try:
+            item.conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, item: _PooledConnection) -> bool:
+        if item.conn.closed:
+            return False
+        now = time.monotonic()
+        if now - item.created_at >= self.max_lifetime:
+            logger.debug("Connection reached max lifetime, recycling.")
+            return False
+        if now - item.last_used >= self.max_idle:
+            try:
+                with item.conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                item.conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning("Idle connection failed validation: %s", e)
+                return False
+        return True
+
+    # --- public API ---
+
+    def getconn(self, timeout: float | None = None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+
+        item = None
+        create = False
+        waiter = None
+        with self._lock:
+            if self._idle and not self._waiters:
+                item = self._idle.pop()
+            elif self._size < self.max_size and not self._waiters:
+                self._size += 1
+                create = True
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            with span("db_pool.wait", pool_size=self.max_size):
+                handed_over = waiter.event.wait(timeout)
+            if not handed_over:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"Timed out after {timeout}s waiting for a database connection "
+                            f"(pool size {self.max_size})"
+                        )
+                # połączenie przekazane dokładnie w chwili timeoutu
+            item = waiter.item
+            create = waiter.may_create
+
+        if not create and not self._is_usable(item):
+            # zastąp połączenie nowym, zachowując jego miejsce w puli
+            self._close(item)
+            with self._lock:
+                self._discarded += 1
+            create = True
+        if create:
+            try:
+                item = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._in_use[id(item.conn)] = item
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return item.conn
+
+    def putconn(self, conn):
+        with self._lock:
+            item = self._in_use.pop(id(conn), None)
+        if item is None:
+            raise ValueError("Connection does not belong to this pool")
+
+        if not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                self._close(item)
+
+        if conn.closed or time.monotonic() - item.created_at >= self.max_lifetime:
+            self._close(item)
+            with self._lock:
+                self._discarded += 1
+            self._release_slot()
+            return
+
+        item.last_used = time.monotonic()
+        self._release(item)
+
+    def _release(self, item: _PooledConnection):
+        """
+        Hand connection to the first waiter or put it back to idle ones; close it
+        when the pool was shrunk below the number of open connections.
+        """
+        with self._lock:
+            surplus = self._size > self.max_size
+            if surplus:
+                self._size -= 1
+            elif self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.item = item
+                waiter.event.set()
+            else:
+                self._idle.append(item)
+        if surplus:
+            self._close(item)
+
+    def _release_slot(self):
+        """
+        Free a pool slot, letting the first waiter (if any) open a new connection in it.
+        """
+        with self._lock:
+            if self._waiters and self._size <= self.max_size:
+                waiter = self._waiters.popleft()
+                waiter.may_create = True
+                waiter.event.set()
+            else:
+                self._size -= 1
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            logger.debug("Returning connection to pool.")
+            self.putconn(conn)
+
+    def prefill(self):
+        """
+        Open connections up to min_size.
+        """
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                item = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+            self._release(item)
+
+    def resize(self, min_size: int, max_size: int):
+        """
+        Change pool limits at runtime. Surplus idle connections are closed at once,
+        connections in use over the new limit when they are returned; new slots
+        go to waiting callers first.
+        """
+        if min_size > max_size:
+            raise ValueError("min_size cannot be greater than max_size")
+        with self._lock:
+            self.min_size = min_size
+            self.max_size = max_size
+            surplus = []
+            while self._idle and self._size > max_size:
+                surplus.append(self._idle.popleft())
+                self._size -= 1
+            # oczekujący dostają nowe miejsca od razu, nie dopiero po zwrocie cudzego połączenia
+            while self._waiters and self._size < max_size:
+                waiter = self._waiters.popleft()
+                waiter.may_create = True
+                self._size += 1
+                waiter.event.set()
+        for item in surplus:
+            self._close(item)
+        logger.info("Connection pool resized to min=%s, max=%s", min_size, max_size)
+
+    def check(self) -> bool:
+        """
+        Check that a connection can be acquired and is alive.
+        """
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.error("Connection check failed: %s", e)
+            return False
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for item in idle:
+            self._close(item)
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_use = len(self._in_use)
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "waiting": len(self._waiters),
+                "max_size": self.max_size,
+                # resize(0, 0) opróżnia pulę - /metrics i /ready muszą dalej działać
+                "utilization": in_use / self.max_size if self.max_size else 0.0,
+                "acquired_total": self._acquired,
+                "timeouts_total": self._timeouts,
+                "created_total": self._created,
+                "discarded_total": self._discarded,
+                "wait_seconds_total": self._wait_total,
+                "wait_seconds_max": self._wait_max,
+            }
@@ -0,0 +1,165 @@
+"""
+Named SQL queries executed as server-side prepared statements.
+
+Every query is PREPAREd once per pooled connection, on first use, and then run
+with EXECUTE, so Postgres parses and plans it once per connection instead of on
+every call. The SQL is written with psycopg2 placeholders (%(name)s) and the
+same text runs unprepared when preparing is disabled (pgbouncer in transaction
+mode hands every transaction to a different backend, where the statement
+does not exist).
+
+Rows come back as plain tuples and are turned into dicts with one shared list
+of column names, which is cheaper than RealDictCursor building every row key
+by key.
+"""
+from dataclasses import dataclass
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from psycopg2 import errors, extensions
+
+from telemetry import Counter, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_LATENCY = registry.register(Histogram(
+    "db_query_duration_seconds", "Database query latency by query and execution mode", ("query", "mode"),
+    buckets=QUERY_BUCKETS))
+STATEMENTS_PREPARED = registry.register(Counter(
+    "db_statements_prepared_total", "Statements prepared on pooled connections", ("query",)))
+
+PLACEHOLDER_PATTERN = re.compile(r"%\((\w+)\)s|%%")
+# wariantów jednego zapytania (np. różne listy kolumn) zapamiętujemy najwyżej tyle, reszta idzie jako tekst
+MAX_VARIANTS = 32
+
+
+class PreparingConnection(extensions.connection):
+    """
+    psycopg2 connection remembering which statements were prepared on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: set[str] = set()
+
+
+@dataclass(frozen=True, slots=True)
+class Query:
+    label: str
+    text: str
+    statement: str
+    prepare_sql: str
+    execute_sql: str
+    prepared: bool
+
+    @classmethod
+    def compile(cls, label: str, text: str, prepared: bool = True) -> "Query":
+        params: list[str] = []
+
+        def number(match):
+            if match.group() == "%%":
+                return "%"
+            if match.group(1) not in params:
+                params.append(match.group(1))
+            return f"${params.index(match.group(1)) + 1}"
+
+        body = PLACEHOLDER_PATTERN.sub(number, text)
+        statement = f"{label}_{hashlib.sha1(text.encode()).hexdigest()[:12]}"
+        arguments = ", ".join(f"%({param})s" for param in params)
+        return cls(
+            label=label,
+            text=text,
+            statement=statement,
+            prepare_sql=f"PREPARE {statement} AS {body}",
+            execute_sql=f"EXECUTE {statement} ({arguments})" if params else f"EXECUTE {statement}",
+            prepared=prepared,
+        )
+
+
+class QueryRegistry:
+    """
+    Queries by name and variant. A variant is a hashable key of whatever changes
+    the SQL text of a query (projection, filters); `build` renders the text - a
+    string or psycopg2.sql object. A variant is registered only after it ran
+    successfully, and at most MAX_VARIANTS of one query are kept; others are
+    rendered on every call and run as text.
+    """
+
+    def __init__(self, prepare: bool):
+        self.prepare = prepare
+        self._lock = threading.Lock()
+        self._queries: dict[tuple, Query] = {}
+        self._variants: dict[str, int] = {}
+
+    def _query(self, conn, name: str, variant, build) -> tuple[Query, bool]:
+        query = self._queries.get((name, variant))
+        if query is not None:
+            return query, True
+        text = build()
+        if not isinstance(text, str):
+            text = text.as_string(conn)
+        prepared = self.prepare and self._variants.get(name, 0) < MAX_VARIANTS
+        return Query.compile(name, text, prepared), False
+
+    def _register(self, name: str, variant, query: Query):
+        with self._lock:
+            if (name, variant) in self._queries or self._variants.get(name, 0) >= MAX_VARIANTS:
+                return
+            self._variants[name] = self._variants.get(name, 0) + 1
+            self._queries[(name, variant)] = query
+
+    def fetch(self, conn, name: str, variant, build, params: dict,
+              setup: str = "") -> tuple[list[str], list[tuple]]:
+        """
+        Run the query and return its column names and row tuples. `setup` (e.g. SET LOCAL)
+        is sent in the same round trip, before the query, and shares its params.
+
+        A statement whose result type changed since it was prepared (SELECT * after
+        ALTER TABLE ... ADD COLUMN) is deallocated and prepared again once.
+        """
+        query, registered = self._query(conn, name, variant, build)
+        try:
+            result = self._execute(conn, query, params, setup)
+        except errors.FeatureNotSupported as e:
+            if not (query.prepared and query.statement in getattr(conn, "prepared", ())):
+                raise
+            logger.info("Statement %s is stale (%s), preparing it again", query.statement, str(e).strip())
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute(f"DEALLOCATE {query.statement}")
+            conn.prepared.discard(query.statement)
+            result = self._execute(conn, query, params, setup)
+        if not registered:
+            self._register(name, variant, query)
+        return result
+
+    def _execute(self, conn, query: Query, params: dict, setup: str) -> tuple[list[str], list[tuple]]:
+        started = time.perf_counter()
+        prepared = query.prepared and isinstance(conn, PreparingConnection)
+        mode = "prepared" if prepared else "text"
+        with conn.cursor() as cur:
+            if prepared and query.statement not in conn.prepared:
+                cur.execute(query.prepare_sql)
+                # przygotowana instrukcja żyje do końca sesji, także po rollbacku transakcji
+                conn.prepared.add(query.statement)
+                STATEMENTS_PREPARED.inc(query=query.label)
+                logger.debug("Prepared statement %s", query.statement)
+                # pierwsze wywołanie liczone osobno, żeby nie zawyżać czasów wykonania
+                mode = "prepare"
+            cur.execute(setup + (query.execute_sql if prepared else query.text), params)
+            rows = cur.fetchall()
+            columns = [column.name for column in cur.description]
+        QUERY_LATENCY.observe(time.perf_counter() - started, query=query.label, mode=mode)
+        return columns, rows
+
+
+def as_dicts(columns: list[str], rows: list[tuple], skip: set[str] | frozenset = frozenset()) -> list[dict]:
+    if skip:
+        keep = [index for index, column in enumerate(columns) if column not in skip]
+        columns = [columns[index] for index in keep]
+        return [dict(zip(columns, [row[index] for index in keep])) for row in rows]
+    return [dict(zip(columns, row)) for row in rows]
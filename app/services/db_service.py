@@ -1,81 +1,243 @@
-from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+import base64
+import json
+import re
+
+from psycopg2 import sql
 
 from config import (SUPABASE_DB,
                         SUPABASE_HOST,
                         SUPABASE_PORT,
                         SUPABASE_USER,
-                        SUPABASE_PASSWORD)
-from .utils import check_connection
+                        SUPABASE_PASSWORD,
+                        DB_POOL_MIN_SIZE,
+                        DB_POOL_MAX_SIZE,
+                        DB_POOL_TIMEOUT,
+                        DB_POOL_MAX_LIFETIME,
+                        DB_POOL_MAX_IDLE,
+                        CLIENT_SEARCH_LIMIT,
+                        CLIENT_SEARCH_THRESHOLD,
+                        CLIENT_COLUMNS,
+                        INSTALLATION_COLUMNS,
+                        DB_MAX_ROWS,
+                        DB_PREPARE_STATEMENTS)
+from telemetry import Gauge, registry, traced
+from text_normalization import fold_search_key
+from .db_pool import ConnectionPool
+from .db_queries import PreparingConnection, QueryRegistry, as_dicts
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-connection_pool = pool.SimpleConnectionPool(
-    minconn=1,
-    maxconn=5,
+# połączenia otwierane są dopiero przy pierwszym użyciu (albo w warmupie przy starcie)
+connection_pool = ConnectionPool(
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    max_idle=DB_POOL_MAX_IDLE,
     dbname=SUPABASE_DB,
     user=SUPABASE_USER,
     password=SUPABASE_PASSWORD,
     host=SUPABASE_HOST,
-    port=5432
+    port=SUPABASE_PORT,
+    connection_factory=PreparingConnection
 )
+queries = QueryRegistry(prepare=DB_PREPARE_STATEMENTS)
+
+registry.register(Gauge(
+    "db_pool", "Database connection pool state", ("stat",),
+    lambda: {(name,): value for name, value in connection_pool.stats().items()}
+))
+
+
+# kolumna klucza używana do stronicowania (keyset) tabeli objects
+INSTALLATION_KEY = "id"
+
+
+# nazwy kolumn sprawdzane także bez skonfigurowanej listy - trafiają do tekstu zapytania
+COLUMN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def _columns(fields: list[str] | None, allowed: list[str] | None) -> tuple[str, ...] | None:
+    """
+    Validated columns for requested fields. `allowed` is the configured projection of
+    the tool (None = every column); requested fields must be a subset of it and are
+    sorted, so every spelling of the same projection is one query variant.
+    """
+    if not fields:
+        return tuple(allowed) if allowed is not None else None
+    unknown = [field for field in fields
+               if not COLUMN_PATTERN.fullmatch(field) or (allowed is not None and field not in allowed)]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}" + (f", allowed: {allowed}" if allowed is not None else ""))
+    return tuple(sorted(set(fields)))
+
+
+def _projection(columns: tuple[str, ...] | None, table_alias: str | None = None):
+    """
+    SELECT list of validated columns (None = every column).
+    """
+    if columns is None:
+        return sql.SQL(f"{table_alias}.*" if table_alias else "*")
+    if table_alias:
+        return sql.SQL(", ").join(sql.Identifier(table_alias, column) for column in columns)
+    return sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+
+
+def encode_cursor(last_key) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_key}, default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+CLIENT_SEARCH_QUERY = """
+    SELECT {columns}, 1 - (c.search_key <-> q.key) AS score{extra_columns}
+    FROM clients c, (SELECT public.search_fold(%(name)s) AS key) AS q
+    WHERE c.search_key %% q.key
+    ORDER BY c.search_key <-> q.key
+    LIMIT %(limit)s
+"""
 
-conn=connection_pool.getconn()
+INSTALLATIONS_COLUMN = """,
+    COALESCE((SELECT json_agg({row} ORDER BY o.{key}) FROM (
+        SELECT * FROM objects WHERE client_id = c.id ORDER BY {key} LIMIT %(installations_limit)s
+    ) o), '[]'::json) AS installations"""
 
-try:
-    if not check_connection(conn=conn, logger=logger):
-        logger.error("Connection with Postgres failed.")
+
+def _installations_column(columns: tuple[str, ...] | None):
+    """
+    Nested installations of client `c`: configured columns only, at most DB_MAX_ROWS per client.
+    """
+    if columns is None:
+        row = sql.SQL("to_json(o)")
     else:
-        logger.info("Connection with Postgres established successfully")
-finally:
-    connection_pool.putconn(conn)
+        row = sql.SQL("json_build_object({})").format(sql.SQL(", ").join(
+            sql.SQL("{}, {}").format(sql.Literal(column), sql.Identifier("o", column)) for column in columns
+        ))
+    return sql.SQL(INSTALLATIONS_COLUMN).format(row=row, key=sql.Identifier(INSTALLATION_KEY))
+
+
+SIMILARITY_THRESHOLD_SETUP = "SET LOCAL pg_trgm.similarity_threshold = %(threshold)s; "
+# kolumna indeksu wyszukiwania, nie zwracana klientom
+HIDDEN_CLIENT_COLUMNS = frozenset({"search_key"})
+
 
+def _search_clients(name: str, first_name: str, last_name: str, limit: int,
+                    fields: list[str] | None = None, extra_columns: sql.Composable = sql.SQL("")):
+    selected = _columns(fields, CLIENT_COLUMNS)
+    with connection_pool.connection() as conn:
+        def build():
+            return sql.SQL(CLIENT_SEARCH_QUERY).format(columns=_projection(selected, table_alias="c"),
+                                                       extra_columns=extra_columns)
 
+        # klucz składany już w Pythonie; search_fold w SQL jest idempotentny i pokrywa resztę znaków unaccent
+        columns, rows = queries.fetch(conn, name, selected, build, {
+            'threshold': CLIENT_SEARCH_THRESHOLD,
+            'name': fold_search_key(f"{first_name} {last_name}"),
+            'limit': min(limit, DB_MAX_ROWS),
+            'installations_limit': DB_MAX_ROWS,
+        }, setup=SIMILARITY_THRESHOLD_SETUP)
+    return as_dicts(columns, rows, skip=HIDDEN_CLIENT_COLUMNS)
+
+
+@traced("postgres", "search_clients")
 def get_client_details(first_name: str,
-                       last_name: str):
+                       last_name: str,
+                       limit: int = CLIENT_SEARCH_LIMIT,
+                       fields: list[str] | None = None):
     """
     Get client details from client database using first_name and last_name parameter.
+    Matching is accent- and case-insensitive and tolerates small spelling errors;
+    best candidates come first, each with similarity `score` (1.0 = exact match).
+    Only configured columns (CLIENT_COLUMNS) or requested `fields` are returned.
+    Requires migrations/001_client_search.sql.
     """
-    logger.info(f"Getting client information from the database ({first_name, last_name})")
-    conn = connection_pool.getconn()
+    logger.debug("Getting client information from the database")
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-            "SELECT * FROM clients WHERE first_name ILIKE %(first_name)s AND last_name ILIKE %(last_name)s",
-            {'first_name': first_name, 'last_name': last_name}
-            )
-
-            records = cur.fetchall()
-        return records
+        return _search_clients("client_search", first_name, last_name, limit, fields)
     except Exception as e:
-        logger.error(f"Error fetching clients: {e}")
+        logger.error("Error fetching clients: %s", e)
         raise Exception(f"Error fetching clients: {e}")
-    finally:
-        logger.debug("Returning connection to pool.")
-        connection_pool.putconn(conn)
 
 
-def get_installation_details(client_id: int):
+@traced("postgres", "search_clients_with_installations")
+def get_client_with_installations(first_name: str,
+                                  last_name: str,
+                                  limit: int = CLIENT_SEARCH_LIMIT,
+                                  fields: list[str] | None = None):
+    """
+    Same search as get_client_details, every client comes with nested list of
+    their installations (`installations`) - fetched in the same query, limited
+    to INSTALLATION_COLUMNS and DB_MAX_ROWS like get_installation_details.
+    """
+    logger.debug("Getting client with installations from the database")
+    try:
+        return _search_clients("client_search_installations", first_name, last_name, limit, fields,
+                               extra_columns=_installations_column(_columns(None, INSTALLATION_COLUMNS)))
+    except Exception as e:
+        logger.error("Error fetching clients with installations: %s", e)
+        raise Exception(f"Error fetching clients with installations: {e}")
+
+
+def _array_literal(values: list) -> str:
+    # nietypowany literał '{1,2}' przyjmuje typ kolumny client_id, tak jak wcześniej IN ('1', '2')
+    return "{" + ",".join('"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+                          for value in values) + "}"
+
+
+def _installations_query(selected: tuple[str, ...] | None, many: bool, after: bool):
+    columns = _projection(selected)
+    if selected is not None and INSTALLATION_KEY not in selected:
+        columns = sql.SQL(", ").join([columns, sql.Identifier(INSTALLATION_KEY)])
+    condition = sql.SQL("client_id = ANY(%(client_id)s)" if many else "client_id = %(client_id)s")
+    if after:
+        condition = sql.SQL("{} AND {} > %(after)s").format(condition, sql.Identifier(INSTALLATION_KEY))
+    return sql.SQL("SELECT {columns} FROM objects WHERE {condition} ORDER BY {key} LIMIT %(limit)s").format(
+        columns=columns, condition=condition, key=sql.Identifier(INSTALLATION_KEY)
+    )
+
+
+@traced("postgres", "installations")
+def get_installation_details(client_id: int | str | list,
+                             fields: list[str] | None = None,
+                             limit: int = DB_MAX_ROWS,
+                             cursor: str | None = None):
     """
     Fetch instalation details based on client's id.
+    Accepts a list of ids as well - all installations are then fetched in one query.
+
+    Results are paginated by installation id: at most `limit` rows (capped by
+    DB_MAX_ROWS) are returned together with `has_more` and `next_cursor`, which
+    is passed back as `cursor` to get the next page. The query itself is limited
+    to one row past the page, so only the requested page leaves the database.
     """
-    logger.info(f"Getting client installation information from the database ({client_id})")
-    conn = connection_pool.getconn()
+    logger.debug("Getting client installation information from the database (%s)", client_id)
+    limit = min(limit, DB_MAX_ROWS)
+    selected = _columns(fields, INSTALLATION_COLUMNS)
+    many = isinstance(client_id, list)
+    query_params = {"client_id": _array_literal(client_id) if many else client_id, "limit": limit + 1}
+    if cursor:
+        query_params["after"] = decode_cursor(cursor)
+
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT * FROM objects WHERE client_id = %(client_id)s",
-                {"client_id": client_id}
-            )
-
-            records = cur.fetchall()
-        logger.info("Successfully fetched installation details by client id.")
-        return records
+        with connection_pool.connection() as conn:
+            columns, rows = queries.fetch(conn, "installations", (selected, many, bool(cursor)),
+                                          lambda: _installations_query(selected, many, bool(cursor)),
+                                          query_params)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][columns.index(INSTALLATION_KEY)]) if has_more else None
+        # klucz stronicowania jest zawsze pobierany, ale zwracany tylko gdy należy do projekcji
+        hidden = {INSTALLATION_KEY} if selected is not None and INSTALLATION_KEY not in selected else frozenset()
+        logger.debug("Successfully fetched installation details by client id.")
+        return {"items": as_dicts(columns, rows, skip=hidden), "has_more": has_more, "next_cursor": next_cursor}
     except Exception as e:
-        logger.error(f"Error fetching installation details by client id: {e}")
+        logger.error("Error fetching installation details by client id: %s", e)
         raise Exception(f"Error fetching installation details by client id: {e}")
-    finally:
-        logger.debug("Returning connection to pool.")
-        connection_pool.putconn(conn)
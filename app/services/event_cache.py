@@ -0,0 +1,220 @@
+from datetime import datetime, timedelta, timezone
+import logging
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from config import EVENT_CACHE_LOOKBACK_DAYS, EVENT_CACHE_REFRESH_SECONDS
+from telemetry import traced
+from .interval_index import IntervalIndex
+from .event_shape import INSTANCES_FIELDS, LIST_FIELDS
+from .time_engine import (RecurrenceError,
+                          event_bounds,
+                          expand_recurring,
+                          normalize_event,
+                          original_start,
+                          series_events)
+
+logger = logging.getLogger(__name__)
+
+
+@traced("google_calendar", "events.instances")
+def fetch_series_instances(service, calendar_id: str, series_id: str, start: datetime, end: datetime,
+                           fields: str | None = INSTANCES_FIELDS) -> list[dict]:
+    """
+    Instances of one recurring event within [start, end) as expanded by Google -
+    used for series whose rule cannot be expanded locally.
+    """
+    instances = []
+    page_token = None
+    while True:
+        result = service.events().instances(
+            calendarId=calendar_id,
+            eventId=series_id,
+            timeMin=start.isoformat(),
+            timeMax=end.isoformat(),
+            maxResults=2500,
+            pageToken=page_token,
+            fields=fields
+        ).execute()
+        instances.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return instances
+
+
+class EventStore:
+    """
+    Local copy of a single calendar kept current with Calendar incremental sync.
+
+    The first query runs a full sync of events starting from
+    EVENT_CACHE_LOOKBACK_DAYS ago and stores nextSyncToken. Later queries only
+    pull changes (at most once per EVENT_CACHE_REFRESH_SECONDS), so repeated
+    range lookups are answered from the interval index without network calls.
+
+    Recurring events are synced as masters (singleEvents=False) and expanded
+    locally for the queried range; modified and cancelled instances come as
+    separate exception events and replace their slot of the series. A series
+    whose rule cannot be parsed is taken from events.instances instead.
+    """
+
+    def __init__(self, calendar_id: str, service_factory):
+        self.calendar_id = calendar_id
+        self._service_factory = service_factory
+        self._lock = threading.Lock()
+        self._events: dict[str, dict] = {}
+        self._index = IntervalIndex()
+        self._masters: dict[str, dict] = {}
+        # id serii -> znaczniki czasu slotów zastąpionych wyjątkami (zmienione lub odwołane instancje)
+        self._overridden: dict[str, set[float]] = {}
+        self._sync_token: str | None = None
+        self._last_sync = 0.0
+        self.window_start: datetime | None = None
+
+    def _list_pages(self, **kwargs):
+        service = self._service_factory()
+        page_token = None
+        while True:
+            result = service.events().list(
+                calendarId=self.calendar_id,
+                singleEvents=False,
+                pageToken=page_token,
+                fields=LIST_FIELDS,
+                **kwargs
+            ).execute()
+            yield result
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return
+
+    def _apply(self, event: dict):
+        event_id = event["id"]
+        if event.get("recurringEventId") and event.get("originalStartTime"):
+            self._overridden.setdefault(event["recurringEventId"], set()).add(original_start(event))
+        if event.get("status") == "cancelled":
+            self._events.pop(event_id, None)
+            self._index.remove(event_id)
+            if self._masters.pop(event_id, None) is not None:
+                self._overridden.pop(event_id, None)
+            return
+        if event.get("recurrence"):
+            # master w swojej strefie - instancje są normalizowane przy rozwijaniu
+            self._masters[event_id] = event
+            self._events.pop(event_id, None)
+            self._index.remove(event_id)
+            return
+        self._masters.pop(event_id, None)
+        event = normalize_event(event)
+        start, end = event_bounds(event)
+        self._events[event_id] = event
+        self._index.add(event_id, start, end)
+
+    @traced("google_calendar", "sync.full")
+    def _full_sync(self):
+        window_start = datetime.now(timezone.utc) - timedelta(days=EVENT_CACHE_LOOKBACK_DAYS)
+        logger.info("Full sync of calendar `%s` from %s", self.calendar_id, window_start)
+        self._events.clear()
+        self._index.clear()
+        self._masters.clear()
+        self._overridden.clear()
+        sync_token = None
+        for page in self._list_pages(timeMin=window_start.isoformat(), maxResults=2500):
+            for event in page.get("items", []):
+                self._apply(event)
+            sync_token = page.get("nextSyncToken", sync_token)
+        self._sync_token = sync_token
+        self.window_start = window_start
+        logger.info("Calendar `%s` synced, %s events and %s recurring series cached",
+                    self.calendar_id, len(self._events), len(self._masters))
+
+    @traced("google_calendar", "sync.incremental")
+    def _incremental_sync(self):
+        changed = 0
+        sync_token = self._sync_token
+        try:
+            for page in self._list_pages(syncToken=self._sync_token, maxResults=2500):
+                for event in page.get("items", []):
+                    self._apply(event)
+                    changed += 1
+                sync_token = page.get("nextSyncToken", sync_token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            # token wygasł - Google wymaga pełnej synchronizacji
+            logger.info("Sync token for `%s` expired, running full sync", self.calendar_id)
+            self._full_sync()
+            return
+        self._sync_token = sync_token
+        if changed:
+            logger.debug("Calendar `%s` incremental sync: %s changes", self.calendar_id, changed)
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            if self._sync_token is None:
+                self._full_sync()
+            elif force or time.monotonic() - self._last_sync >= EVENT_CACHE_REFRESH_SECONDS:
+                self._incremental_sync()
+            else:
+                return
+            self._last_sync = time.monotonic()
+
+    def covers(self, start: datetime) -> bool:
+        return self.window_start is not None and start >= self.window_start
+
+    def query(self, start: datetime, end: datetime) -> list[dict]:
+        """
+        Events overlapping [start, end) in the canonical zone, recurring ones
+        expanded into instances, ordered by start time.
+        """
+        self.refresh()
+        instances, unexpanded = [], []
+        with self._lock:
+            events = [self._events[event_id] for event_id in self._index.overlapping(start, end)]
+            for master_id, master in self._masters.items():
+                try:
+                    instances.extend(expand_recurring(master, start, end,
+                                                      self._overridden.get(master_id, frozenset())))
+                except RecurrenceError as e:
+                    logger.warning("%s, fetching its instances", e)
+                    unexpanded.append(master_id)
+        if unexpanded:
+            # poza blokadą - zapytania do API nie wstrzymują synchronizacji ani innych odczytów
+            known = {event["id"] for event in events}
+            for master_id in unexpanded:
+                instances.extend(
+                    instance for instance in series_events(
+                        fetch_series_instances(self._service_factory(), self.calendar_id, master_id, start, end),
+                        start, end)
+                    if instance["id"] not in known)
+        if instances:
+            events.extend(instances)
+            events.sort(key=lambda event: event_bounds(event)[0])
+        return events
+
+    def upsert(self, event: dict):
+        with self._lock:
+            self._apply(event)
+
+
+class EventCache:
+    """
+    Registry of per-calendar event stores.
+    """
+
+    def __init__(self, service_factory):
+        self._service_factory = service_factory
+        self._lock = threading.Lock()
+        self._stores: dict[str, EventStore] = {}
+
+    def store(self, calendar_id: str) -> EventStore:
+        with self._lock:
+            store = self._stores.get(calendar_id)
+            if store is None:
+                store = EventStore(calendar_id, self._service_factory)
+                self._stores[calendar_id] = store
+            return store
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
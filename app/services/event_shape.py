@@ -0,0 +1,68 @@
+from dataclasses import dataclass, fields
+
+MINIMAL = "minimal"
+STANDARD = "standard"
+FULL = "full"
+VERBOSITY_LEVELS = (MINIMAL, STANDARD, FULL)
+
+# partial response masks - only these parts of the event resource leave Google
+EVENT_FIELDS = ("id,status,summary,description,location,start,end,transparency,"
+                "recurrence,recurringEventId,originalStartTime,attendees(email,responseStatus)")
+LIST_FIELDS = f"items({EVENT_FIELDS}),nextPageToken,nextSyncToken"
+INSTANCES_FIELDS = f"items({EVENT_FIELDS}),nextPageToken"
+
+
+def _time(value: dict | None) -> str | None:
+    if not value:
+        return None
+    return value.get("dateTime") or value.get("date")
+
+
+@dataclass(slots=True)
+class CompactEvent:
+    """
+    Event representation handed to the LLM - only fields it actually reasons about.
+    """
+    id: str
+    summary: str | None
+    start: str | None
+    end: str | None
+    calendar: str | None = None
+    location: str | None = None
+    description: str | None = None
+    attendees: list[str] | None = None
+
+    @classmethod
+    def from_resource(cls, event: dict, verbosity: str = STANDARD, calendar: str | None = None):
+        compact = cls(id=event["id"],
+                      summary=event.get("summary"),
+                      start=_time(event.get("start")),
+                      end=_time(event.get("end")),
+                      calendar=calendar)
+        if verbosity != MINIMAL:
+            compact.location = event.get("location")
+            compact.description = event.get("description")
+            if event.get("attendees"):
+                compact.attendees = [attendee["email"] for attendee in event["attendees"] if "email" in attendee]
+        return compact
+
+    def to_dict(self) -> dict:
+        result = {}
+        for name in _COMPACT_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        return result
+
+
+_COMPACT_FIELDS = tuple(field.name for field in fields(CompactEvent))
+
+
+def shape_event(event: dict, verbosity: str = STANDARD, calendar: str | None = None) -> dict:
+    """
+    Event resource reduced to the requested verbosity level.
+    `full` keeps the resource as returned by the API.
+    """
+    if verbosity == FULL:
+        return {**event, "calendar": calendar} if calendar else event
+    return CompactEvent.from_resource(event, verbosity, calendar).to_dict()
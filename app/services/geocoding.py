@@ -0,0 +1,174 @@
+"""
+Address geocoding for route planning. The provider is pluggable (GEOCODER_PROVIDER);
+results are cached in memory and in a SQLite file keyed by the folded address,
+so every address reaches the provider once.
+"""
+from dataclasses import dataclass
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+import httpx
+
+from config import GEOCODER_CACHE_PATH, GEOCODER_PROVIDER, GEOCODER_TIMEOUT, GEOCODER_URL
+from telemetry import traced
+from text_normalization import fold_search_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Coordinates:
+    lat: float
+    lon: float
+
+
+def address_key(address: str) -> str:
+    # "ul. Słoneczna 12,43-100 Skoczów" i "UL. SLONECZNA 12, 43-100 SKOCZOW" to ten sam adres
+    return " ".join(fold_search_key(address).replace(",", " ").split())
+
+
+class StubGeocoder:
+    """
+    Offline provider for tests and benchmarks: addresses from `places` get their
+    coordinates, any other address a stable pseudo-random point within `radius_km`
+    of `center`.
+    """
+    name = "stub"
+
+    def __init__(self, places: dict[str, Coordinates] | None = None,
+                 center: Coordinates = Coordinates(49.7737, 18.8066), radius_km: float = 30):
+        self.places = {address_key(address): point for address, point in (places or {}).items()}
+        self.center = center
+        self.radius_km = radius_km
+
+    def geocode(self, address: str) -> Coordinates | None:
+        key = address_key(address)
+        if key in self.places:
+            return self.places[key]
+        digest = hashlib.sha256(key.encode()).digest()
+        # punkt równomiernie rozłożony w kole wokół środka
+        distance = self.radius_km * math.sqrt(int.from_bytes(digest[:4], "big") / 2 ** 32)
+        angle = 2 * math.pi * int.from_bytes(digest[4:8], "big") / 2 ** 32
+        return Coordinates(
+            lat=self.center.lat + distance * math.cos(angle) / 111.32,
+            lon=self.center.lon + distance * math.sin(angle) / (111.32 * math.cos(math.radians(self.center.lat))),
+        )
+
+    def close(self):
+        pass
+
+
+class NominatimGeocoder:
+    """
+    OpenStreetMap Nominatim search. The public instance allows one request per
+    second and requires an identifying User-Agent.
+    """
+    name = "nominatim"
+    MIN_INTERVAL = 1.0
+
+    def __init__(self, url: str, timeout: float, user_agent: str = "optimalit-mcp"):
+        self.url = url
+        self._client = httpx.Client(timeout=timeout, headers={"User-Agent": user_agent})
+        self._lock = threading.Lock()
+        self._last_request = 0.0
+
+    @traced("geocoder", "search")
+    def geocode(self, address: str) -> Coordinates | None:
+        with self._lock:
+            wait = self._last_request + self.MIN_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = self._client.get(self.url, params={"q": address, "format": "jsonv2", "limit": 1})
+            finally:
+                self._last_request = time.monotonic()
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return Coordinates(float(results[0]["lat"]), float(results[0]["lon"]))
+
+    def close(self):
+        self._client.close()
+
+
+class CachedGeocoder:
+    """
+    Memory + SQLite cache in front of a provider. Addresses the provider could not
+    find are cached too (as None), so they are not looked up again on every call.
+    Provider errors (timeouts, rate limiting) make the address unknown for this
+    call only and are not cached.
+    """
+
+    def __init__(self, provider, path: str):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._memory: dict[str, Coordinates | None] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes (key TEXT PRIMARY KEY, lat REAL, lon REAL, created_at REAL NOT NULL)"
+        )
+
+    def geocode(self, address: str) -> Coordinates | None:
+        # wpisy różnych dostawców się nie mieszają (np. punkty z atrapy)
+        key = f"{self.provider.name}:{address_key(address)}"
+        if key in self._memory:
+            return self._memory[key]
+        with self._lock:
+            row = self._conn.execute("SELECT lat, lon FROM geocodes WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            point = Coordinates(row[0], row[1]) if row[0] is not None else None
+        else:
+            try:
+                point = self.provider.geocode(address)
+            except Exception as e:
+                logger.warning("Geocoding %s with %s failed: %s", address, self.provider.name, e)
+                return None
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO geocodes (key, lat, lon, created_at) VALUES (?, ?, ?, ?)",
+                    (key, point.lat if point else None, point.lon if point else None, time.time())
+                )
+        self._memory[key] = point
+        return point
+
+    def close(self):
+        self.provider.close()
+        with self._lock:
+            self._conn.close()
+
+
+PROVIDERS = {
+    "stub": StubGeocoder,
+    "nominatim": lambda: NominatimGeocoder(GEOCODER_URL, GEOCODER_TIMEOUT),
+}
+
+_geocoder: CachedGeocoder | None = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> CachedGeocoder:
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            if not GEOCODER_PROVIDER:
+                raise ValueError(f"GEOCODER_PROVIDER is not set, available: {list(PROVIDERS)}")
+            if GEOCODER_PROVIDER not in PROVIDERS:
+                raise ValueError(f"Unknown GEOCODER_PROVIDER {GEOCODER_PROVIDER}, available: {list(PROVIDERS)}")
+            if GEOCODER_PROVIDER == "stub":
+                logger.warning("Using the stub geocoder - route plans are based on made-up coordinates")
+            _geocoder = CachedGeocoder(PROVIDERS[GEOCODER_PROVIDER](), GEOCODER_CACHE_PATH)
+        return _geocoder
+
+
+def close_geocoder():
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is not None:
+            _geocoder.close()
+            _geocoder = None
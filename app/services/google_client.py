@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+import json
+import logging
+import threading
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from config import GOOGLE_API_ENDPOINT, GOOGLE_TOKEN_FILE, GOOGLE_TOKEN_REFRESH_MARGIN, load_credentials
+from telemetry import dependency_span, span
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleServiceManager:
+    """
+    Process-wide holder of Google credentials and Calendar API clients.
+
+    Credentials are loaded from the token file once and kept in memory. They are
+    refreshed under a lock shortly before expiry and written back to the token
+    file only when their content actually changed.
+
+    googleapiclient resources are not thread-safe (httplib2 underneath), so every
+    worker thread gets its own client, built once from the discovery document
+    bundled with the library - no discovery request goes over the network and
+    the document is parsed only once per process.
+    """
+
+    def __init__(self, token_path: str = GOOGLE_TOKEN_FILE,
+                 refresh_margin: int = GOOGLE_TOKEN_REFRESH_MARGIN):
+        self.token_path = token_path
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds: Credentials | None = None
+        self._persisted_token: str | None = None
+        self._discovery_doc: dict | None = None
+
+    def _needs_refresh(self, creds: Credentials) -> bool:
+        if not creds.valid:
+            return True
+        if creds.expiry is None:
+            return False
+        # google-auth keeps expiry as naive UTC datetime
+        return creds.expiry - datetime.utcnow() <= self.refresh_margin
+
+    def _persist(self, creds: Credentials):
+        token_json = creds.to_json()
+        if token_json == self._persisted_token:
+            return
+        with open(self.token_path, "w") as token_file:
+            token_file.write(token_json)
+        self._persisted_token = token_json
+        logger.info("Google token saved to %s", self.token_path)
+
+    def get_credentials(self) -> Credentials:
+        creds = self._creds
+        if creds is not None and not self._needs_refresh(creds):
+            return creds
+
+        with self._lock:
+            # inny wątek mógł już odświeżyć token
+            if self._creds is None:
+                self._creds = load_credentials(self.token_path)
+                self._persisted_token = self._creds.to_json()
+
+            creds = self._creds
+            if self._needs_refresh(creds):
+                if not creds.refresh_token:
+                    raise Exception("Token expired and no refresh token — you have authorize again.")
+                logger.info("Google token close to expiry, refreshing...")
+                with dependency_span("google_oauth", "token_refresh"):
+                    creds.refresh(Request())
+                self._persist(creds)
+            return creds
+
+    def load_discovery(self) -> dict:
+        if self._discovery_doc is None:
+            doc = get_static_doc("calendar", "v3")
+            if doc is None:
+                raise Exception("Static discovery document for calendar v3 not found")
+            discovery = json.loads(doc)
+            if GOOGLE_API_ENDPOINT:
+                # batch requests are sent to rootUrl, so the document itself is rewritten
+                root = GOOGLE_API_ENDPOINT.rstrip("/") + "/"
+                discovery["rootUrl"] = root
+                discovery["baseUrl"] = root + discovery["servicePath"]
+            self._discovery_doc = discovery
+        return self._discovery_doc
+
+    def get_service(self):
+        """
+        Return Calendar API client bound to the current thread.
+        """
+        creds = self.get_credentials()
+        service = getattr(self._local, "service", None)
+        if service is None:
+            with span("google.discovery_build"):
+                service = build_from_document(self.load_discovery(), credentials=creds)
+            self._local.service = service
+        return service
+
+    def reset(self):
+        """
+        Drop cached credentials, e.g. after token.json was replaced by refresh_token().
+        """
+        with self._lock:
+            self._creds = None
+            self._persisted_token = None
+            self._local = threading.local()
+
+
+service_manager = GoogleServiceManager()
@@ -1,69 +1,349 @@
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+import base64
+import hashlib
+import heapq
 import logging
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from config import load_credentials, get_calendar_id
-from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
+
+from config import (get_calendar_id,
+                    CALENDAR_NAMES,
+                    CALENDAR_THREAD_POOL_SIZE,
+                    EVENT_CACHE_ENABLED,
+                    TIMEZONE,
+                    WORKING_DAYS,
+                    WORKING_HOURS_START,
+                    WORKING_HOURS_END)
+from telemetry import dependency_span, traced
+from .google_client import service_manager
+from .event_cache import EventCache, fetch_series_instances
+from .interval_index import IntervalIndex, merge_intervals, subtract_intervals
+from .event_shape import EVENT_FIELDS, FULL, INSTANCES_FIELDS, LIST_FIELDS, STANDARD, shape_event
+from .time_engine import LOCAL_TZ, event_bounds, expand_events, normalize_event, parse_datetime, to_local
 
 logger = logging.getLogger(__name__)
 
 
 def get_service():
     """
-    Tworzy klienta Google Calendar API przy użyciu wczytanych poświadczeń.
+    Zwraca współdzielonego klienta Google Calendar API (poświadczenia trzymane w pamięci).
     """
-    creds: Credentials = load_credentials()  # zakładam, że zwraca już obiekt google.oauth2.credentials.Credentials
-    service = build("calendar", "v3", credentials=creds)
-    return service
+    return service_manager.get_service()
+
+
+event_cache = EventCache(service_factory=get_service)
 
+# zapytania do kilku kalendarzy naraz - każdy wątek ma własnego klienta API
+calendar_executor = ThreadPoolExecutor(max_workers=CALENDAR_THREAD_POOL_SIZE, thread_name_prefix="calendar")
 
-def get_many_events(start_date: str, end_date: str, calendar: str):
+
+def resolve_calendars(calendar: str | list[str]) -> list[str]:
+    """
+    Calendar names for a single name, list of names or "all".
+    """
+    if isinstance(calendar, str):
+        return list(CALENDAR_NAMES) if calendar.lower() == "all" else [calendar.lower()]
+    return [name.lower() for name in calendar]
+
+
+@traced("google_calendar", "events.list")
+def _list_events(calendar_id: str, start: datetime, end: datetime, fields: str | None = LIST_FIELDS) -> list[dict]:
+    """
+    All events of the range from the API, following nextPageToken.
+    Recurring events come as masters and are expanded locally - Google does not
+    have to return every instance of long series page by page.
+    """
     service = get_service()
+    events = []
+    page_token = None
+    while True:
+        events_result = service.events().list(
+            calendarId=calendar_id,
+            timeMin=start.isoformat(),
+            timeMax=end.isoformat(),
+            singleEvents=False,
+            maxResults=2500,
+            pageToken=page_token,
+            fields=fields
+        ).execute()
+        events.extend(events_result.get("items", []))
+        page_token = events_result.get("nextPageToken")
+        if not page_token:
+            instance_fields = None if fields is None else INSTANCES_FIELDS
+            return expand_events(events, start, end, series_instances=lambda series_id: fetch_series_instances(
+                service, calendar_id, series_id, start, end, fields=instance_fields))
+
+
+def _calendar_events(calendar: str, start: datetime, end: datetime, verbosity: str,
+                     fresh: bool = False) -> list[dict]:
+    """
+    Events of one calendar; `fresh` pulls changes into the cache first, even
+    within EVENT_CACHE_REFRESH_SECONDS of the last sync.
+    """
     calendar_id = get_calendar_id(calendar)
 
-    if start_date is None:
-        start_date = datetime.utcnow().isoformat() + "Z"
-    if end_date is None:
-        end_date = (datetime.utcnow() + timedelta(days=1)).isoformat() + "Z"
+    # cache trzyma zdarzenia okrojone maską pól, pełne zasoby idą prosto z API
+    if EVENT_CACHE_ENABLED and verbosity != FULL:
+        store = event_cache.store(calendar_id)
+        store.refresh(force=fresh)
+        if store.covers(start):
+            events = store.query(start, end)
+            logger.debug("Fetched %s `%s` events from cache", len(events), calendar)
+            return events
 
-    logger.info(f"Getting `{calendar}` calendar events for {start_date} - {end_date}")
+    events = _list_events(calendar_id, start, end, fields=None if verbosity == FULL else LIST_FIELDS)
+    logger.debug("Fetched %s `%s` events", len(events), calendar)
+    return events
 
-    events_result = service.events().list(
-        calendarId=calendar_id,
-        timeMin=start_date,
-        timeMax=end_date,
-        singleEvents=True,
-        orderBy="startTime"
-    ).execute()
 
-    events = events_result.get("items", [])
-    logger.info(f"Fetched {len(events)} events")
+def get_many_events(start: datetime, end: datetime, calendar: str | list[str],
+                    verbosity: str = STANDARD):
+    """
+    Events of one or more calendars (list of names or "all"), fetched concurrently
+    and merged into one stream ordered by start time. Every event is labelled
+    with its source `calendar` and reduced to the requested verbosity.
+    Times are in TIMEZONE, recurring events come as single instances.
+    """
+    calendars = resolve_calendars(calendar)
+    logger.debug("Getting `%s` calendar events for %s - %s", calendars, start, end)
+
+    futures = {name: calendar_executor.submit(_calendar_events, name, start, end, verbosity)
+               for name in calendars}
+    streams = [[(event, name) for event in future.result()] for name, future in futures.items()]
+
+    merged = heapq.merge(*streams, key=lambda item: event_bounds(item[0])[0])
+    events = [shape_event(event, verbosity, calendar=name) for event, name in merged]
+    logger.debug("Fetched %s events", len(events))
     return events
 
 
-def get_calendar_event(event_id: str, calendar: str):
+@traced("google_calendar", "events.get")
+def get_calendar_event(event_id: str, calendar: str, verbosity: str = STANDARD):
     service = get_service()
     calendar_id = get_calendar_id(calendar)
 
-    logger.info(f"Getting event {event_id} from calendar `{calendar}`")
-    event = service.events().get(calendarId=calendar_id, eventId=event_id).execute()
-    return event
+    logger.debug("Getting event %s from calendar `%s`", event_id, calendar)
+    request_fields = None if verbosity == FULL else EVENT_FIELDS
+    event = service.events().get(calendarId=calendar_id, eventId=event_id, fields=request_fields).execute()
+    return shape_event(normalize_event(event), verbosity)
 
 
-def create_calendar_event(event_data: dict):
-    service = get_service()
+DEFAULT_LOCATION = "ul. Wałowa 3, 43-100 Skoczów"
+# Google przyjmuje maksymalnie 50 zapytań w jednym batchu
+BATCH_SIZE = 50
+
+
+def _prepare_event(event_data: dict) -> tuple[str, dict]:
+    """
+    Calendar id and insert body for tool params; the params dict is not modified.
+    """
+    body = {key: value for key, value in event_data.items() if key != "calendar"}
     calendar_id = get_calendar_id(event_data["calendar"])
-    del event_data["calendar"]
 
-    if "location" not in event_data:
-        event_data["location"] = "ul. Wałowa 3, 43-100 Skoczów"
+    if "location" not in body:
+        body["location"] = DEFAULT_LOCATION
 
-    if "reminders" not in event_data:
-        event_data["reminders"] = {"useDefault": False}
+    if "reminders" not in body:
+        body["reminders"] = {"useDefault": False}
 
-    logger.info(f"Creating event in `{calendar_id}`")
+    if body.get("attendees"):
+        body["attendees"] = [{"email": attendee} if isinstance(attendee, str) else attendee
+                             for attendee in body["attendees"]]
+    return calendar_id, body
+
+
+def deterministic_event_id(calendar: str, body: dict) -> str:
+    """
+    Event id derived from calendar, time and summary - inserting the same event
+    twice fails with 409 instead of creating a duplicate.
+    Google accepts base32hex characters (0-9, a-v) only.
+    """
+    key = "|".join([calendar, body["start"].get("dateTime") or body["start"].get("date"),
+                    body["end"].get("dateTime") or body["end"].get("date"), body.get("summary", "")])
+    digest = hashlib.sha256(key.encode()).digest()
+    return base64.b32hexencode(digest).decode().rstrip("=").lower()
+
+
+@traced("google_calendar", "events.insert")
+def create_calendar_event(event_data: dict):
+    service = get_service()
+    calendar_id, event_data = _prepare_event(event_data)
+
+    logger.debug("Creating event in `%s`", calendar_id)
     created_event = service.events().insert(calendarId=calendar_id, body=event_data).execute()
-    logger.info(f"Event created: {created_event.get('id')}")
+    logger.info("Event created: %s", created_event.get('id'))
+    if EVENT_CACHE_ENABLED:
+        event_cache.store(calendar_id).upsert(created_event)
     return created_event
 
+
+def _existing_events(calendars: list[str], start: datetime, end: datetime) -> list[dict]:
+    # sprawdzenie kolizji przed zapisem - rezerwacje innych workerów i spoza serwera muszą być widoczne
+    futures = [calendar_executor.submit(_calendar_events, name, start, end, STANDARD, True)
+               for name in calendars]
+    return [event for future in futures for event in future.result()]
+
+
+@traced("google_calendar", "events.batch_insert")
+def create_calendar_events(events_data: list[dict], allow_conflicts: bool = False):
+    """
+    Create many events at once.
+
+    All proposed slots are checked against existing events of the involved
+    calendars (fetched once for the whole time span) and against each other.
+    Non-conflicting events are inserted with one Google batch request per 50
+    events. Event ids are deterministic, so retrying the same batch reports
+    `already_exists` instead of creating duplicates.
+    Returns per-item results in input order.
+    """
+    items = []
+    for index, event_data in enumerate(events_data):
+        calendar_id, body = _prepare_event(event_data)
+        body["id"] = deterministic_event_id(calendar_id, body)
+        start, end = event_bounds(body)
+        items.append({"index": index, "calendar": event_data["calendar"], "calendar_id": calendar_id,
+                      "body": body, "start": start, "end": end})
+
+    results = {item["index"]: {"index": item["index"], "event_id": item["body"]["id"]} for item in items}
+    batch_ids = {item["body"]["id"] for item in items}
+
+    span_start = min(item["start"] for item in items)
+    span_end = max(item["end"] for item in items)
+    calendars = sorted({item["calendar"] for item in items})
+    logger.debug("Checking %s proposed events against `%s` %s - %s",
+                 len(items), calendars, span_start, span_end)
+
+    busy = IntervalIndex()
+    existing = {}
+    for event in _existing_events(calendars, span_start, span_end):
+        if event["id"] in batch_ids:
+            # utworzone przy wcześniejszej próbie
+            existing[event["id"]] = event
+            continue
+        if event.get("transparency") != "transparent":
+            event_start, event_end = event_bounds(event)
+            busy.add(event["id"], event_start, event_end)
+
+    to_insert = []
+    for item in items:
+        result = results[item["index"]]
+        event_id = item["body"]["id"]
+        if event_id in existing:
+            result["status"] = "already_exists"
+            continue
+        conflicts = busy.overlapping(item["start"], item["end"])
+        if conflicts and not allow_conflicts:
+            result["status"] = "conflict"
+            result["conflicts_with"] = conflicts
+            continue
+        busy.add(event_id, item["start"], item["end"])
+        to_insert.append(item)
+
+    service = get_service()
+    for chunk_start in range(0, len(to_insert), BATCH_SIZE):
+        chunk = {str(item["index"]): item for item in to_insert[chunk_start:chunk_start + BATCH_SIZE]}
+
+        def callback(request_id, response, exception):
+            item = chunk[request_id]
+            result = results[item["index"]]
+            if exception is None:
+                result["status"] = "created"
+                if EVENT_CACHE_ENABLED:
+                    event_cache.store(item["calendar_id"]).upsert(response)
+            elif isinstance(exception, HttpError) and exception.resp.status == 409:
+                result["status"] = "already_exists"
+            else:
+                result["status"] = "error"
+                result["error"] = str(exception)
+
+        batch = service.new_batch_http_request(callback=callback)
+        for request_id, item in chunk.items():
+            batch.add(service.events().insert(calendarId=item["calendar_id"], body=item["body"]),
+                      request_id=request_id)
+        batch.execute()
+
+    ordered = [results[index] for index in sorted(results)]
+    created = sum(1 for result in ordered if result["status"] == "created")
+    logger.info("Batch create finished: %s/%s events created", created, len(ordered))
+    return ordered
+
+
+# ustawiane przy wielu workerach - rezerwacja z innego procesu musi być widoczna od razu
+sync_before_busy_query = False
+
+
+def get_busy_intervals(start: datetime, end: datetime, calendars: list[str]):
+    """
+    Merged busy intervals of given calendars within [start, end).
+    Uses cached events when every calendar is synced for the range, freeBusy otherwise.
+    """
+    calendar_ids = [get_calendar_id(calendar) for calendar in calendars]
+    busy = []
+
+    if EVENT_CACHE_ENABLED:
+        stores = [event_cache.store(calendar_id) for calendar_id in calendar_ids]
+        for future in [calendar_executor.submit(store.refresh, sync_before_busy_query) for store in stores]:
+            future.result()
+        if all(store.covers(start) for store in stores):
+            for store in stores:
+                for event in store.query(start, end):
+                    if event.get("transparency") == "transparent":
+                        continue
+                    busy.append(event_bounds(event))
+            return merge_intervals(busy)
+
+    logger.debug("Querying freeBusy for %s %s - %s", calendars, start, end)
+    with dependency_span("google_calendar", "freebusy.query"):
+        result = get_service().freebusy().query(body={
+            "timeMin": start.isoformat(),
+            "timeMax": end.isoformat(),
+            "timeZone": TIMEZONE,
+            "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+        }).execute()
+
+    for calendar_id, data in result.get("calendars", {}).items():
+        if data.get("errors"):
+            raise Exception(f"freeBusy failed for calendar {calendar_id}: {data['errors']}")
+        for period in data.get("busy", []):
+            busy.append((parse_datetime(period["start"]), parse_datetime(period["end"])))
+    return merge_intervals(busy)
+
+
+def _working_windows(start: datetime, end: datetime):
+    day = start.astimezone(LOCAL_TZ).date()
+    last_day = end.astimezone(LOCAL_TZ).date()
+    while day <= last_day:
+        if day.isoweekday() in WORKING_DAYS:
+            day_start = datetime.combine(day, time.fromisoformat(WORKING_HOURS_START), tzinfo=LOCAL_TZ)
+            day_end = datetime.combine(day, time.fromisoformat(WORKING_HOURS_END), tzinfo=LOCAL_TZ)
+            window = (max(day_start, start), min(day_end, end))
+            if window[0] < window[1]:
+                yield window
+        day += timedelta(days=1)
+
+
+def find_available_slots(start: datetime, end: datetime, duration_minutes: int,
+                         calendars: list[str] | None = None, limit: int = 10):
+    """
+    Free windows of at least duration_minutes within working hours, earliest first.
+    """
+    calendars = calendars or list(CALENDAR_NAMES)
+    duration = timedelta(minutes=duration_minutes)
+    busy = get_busy_intervals(start, end, calendars)
+
+    slots = []
+    for window in _working_windows(start, end):
+        for free_start, free_end in subtract_intervals(window, busy):
+            if free_end - free_start < duration:
+                continue
+            slots.append({
+                "start": to_local(free_start).isoformat(),
+                "end": to_local(free_end).isoformat(),
+                "free_minutes": int((free_end - free_start).total_seconds() // 60),
+            })
+            if len(slots) >= limit:
+                logger.debug("Found %s available slots (limit reached)", len(slots))
+                return slots
+    logger.debug("Found %s available slots", len(slots))
+    return slots
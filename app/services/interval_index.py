@@ -0,0 +1,89 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+
+class IntervalIndex:
+    """
+    In-memory index of [start, end) intervals keyed by id.
+
+    Intervals are kept sorted by start time. Together with the longest interval
+    stored so far this bounds an overlap query to a single bisect window, so
+    range lookups are O(log n + k).
+    """
+
+    def __init__(self):
+        self._bounds: dict[str, tuple[float, float]] = {}
+        self._starts: list[tuple[float, str]] = []
+        self._max_span = 0.0
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, key: str):
+        return key in self._bounds
+
+    def clear(self):
+        self._bounds.clear()
+        self._starts.clear()
+        self._max_span = 0.0
+
+    def add(self, key: str, start: datetime, end: datetime):
+        self.remove(key)
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        self._bounds[key] = (start_ts, end_ts)
+        insort(self._starts, (start_ts, key))
+        self._max_span = max(self._max_span, end_ts - start_ts)
+
+    def remove(self, key: str):
+        bounds = self._bounds.pop(key, None)
+        if bounds is None:
+            return
+        pos = bisect_left(self._starts, (bounds[0], key))
+        if pos < len(self._starts) and self._starts[pos][1] == key:
+            del self._starts[pos]
+
+    def overlapping(self, start: datetime, end: datetime) -> list[str]:
+        """
+        Ids of intervals overlapping [start, end), ordered by start time.
+        """
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        lo = bisect_left(self._starts, (start_ts - self._max_span,))
+        hi = bisect_right(self._starts, (end_ts,))
+        return [key for interval_start, key in self._starts[lo:hi]
+                if interval_start < end_ts and self._bounds[key][1] > start_ts]
+
+
+def merge_intervals(intervals: list[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """
+    Merge overlapping or touching intervals into disjoint, sorted ones.
+    """
+    merged: list[tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(window: tuple[datetime, datetime],
+                       busy: list[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """
+    Free parts of window not covered by busy intervals (busy must be merged and sorted).
+    """
+    window_start, window_end = window
+    free = []
+    cursor = window_start
+    lo = bisect_right(busy, (window_start,)) - 1
+    for start, end in busy[max(lo, 0):]:
+        if start >= window_end:
+            break
+        if end <= cursor:
+            continue
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
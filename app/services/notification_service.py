@@ -1,63 +1,173 @@
-import requests
+import importlib.util
+import httpx
 from config import (SMSAPI_TOKEN,
+                        SMSAPI_URL,
+                        SMSAPI_TIMEOUT,
+                        SMSAPI_CONNECT_TIMEOUT,
+                        SMSAPI_MAX_CONNECTIONS,
+                        SMSAPI_BREAKER_THRESHOLD,
+                        SMSAPI_BREAKER_RESET_SECONDS,
                         GOOGLE_EMAIL_PASSWORD,
-                        GOOGLE_EMAIL_USER)
-import smtplib
+                        GOOGLE_EMAIL_USER,
+                        SMTP_HOST,
+                        SMTP_PORT,
+                        SMTP_USE_TLS,
+                        SMTP_POOL_SIZE,
+                        SMTP_KEEPALIVE_SECONDS,
+                        SMTP_MAX_IDLE_SECONDS)
 from email.mime.text import MIMEText
+from telemetry import traced
+from .smtp_pool import SMTPPool
+from .circuit_breaker import CircuitBreaker
 import logging
 
 logger = logging.getLogger(__name__)
 
-def send_sms_notification(phone_number: str, message: str):
+smtp_pool = SMTPPool(
+    hostname=SMTP_HOST,
+    port=SMTP_PORT,
+    username=GOOGLE_EMAIL_USER,
+    password=GOOGLE_EMAIL_PASSWORD,
+    use_tls=SMTP_USE_TLS,
+    max_size=SMTP_POOL_SIZE,
+    keepalive=SMTP_KEEPALIVE_SECONDS,
+    max_idle=SMTP_MAX_IDLE_SECONDS
+)
+
+sms_breaker = CircuitBreaker("SMSAPI",
+                             failure_threshold=SMSAPI_BREAKER_THRESHOLD,
+                             reset_timeout=SMSAPI_BREAKER_RESET_SECONDS)
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared keep-alive client for SMSAPI, created on first use.
+    HTTP/2 is used when the `h2` package is installed.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(SMSAPI_TIMEOUT, connect=SMSAPI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=SMSAPI_MAX_CONNECTIONS,
+                                max_keepalive_connections=SMSAPI_MAX_CONNECTIONS),
+            headers={"Authorization": f"Bearer {SMSAPI_TOKEN}"},
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+@traced("smsapi", "sms.do")
+async def _post_sms(payload: dict) -> httpx.Response:
+    sms_breaker.before_call()
+    try:
+        response = await get_http_client().post(SMSAPI_URL, json={**payload, "normalize": 1, "nounicode": 1})
+    except httpx.TransportError:
+        sms_breaker.record_failure()
+        raise
+    except BaseException:
+        # np. anulowanie przy zamykaniu workera - wywołanie próbne nie może zablokować obwodu
+        sms_breaker.record_aborted()
+        raise
+    if response.status_code >= 500:
+        sms_breaker.record_failure()
+    else:
+        sms_breaker.record_success()
+    response.raise_for_status()
+    return response
+
+
+async def send_sms_notification(phone_number: str, message: str):
     """
     Send an SMS notification to a given phone number.
     The phone_number should be a string in the format "123456789".
     The message should be a string with no special characters.
     """
-    logger.info(f"Sending SMS notification to {phone_number} with message: {message}")
-
-    response = requests.post(
-        "https://api.smsapi.pl/sms.do",
-        headers={
-            "Authorization": f"Bearer {SMSAPI_TOKEN}",
-            },
-        json={
-            "to": phone_number,
-            "message": message,
-            "normalize": 1,
-            "nounicode": 1
-            }
-    )
 
-    response.raise_for_status()
-    if response.status_code == 200:
-        logger.info(f"SMS notification sent successfully to {phone_number}")
-        return response.content
+    response = await _post_sms({"to": phone_number, "message": message})
+    logger.info("SMS notification sent successfully to %s", phone_number)
+    return response.content
+
+
+def _is_rejected(error: Exception) -> bool:
+    # 4xx (poza 429) - SMSAPI odrzucił treść żądania, np. jeden błędny numer w liście `to`
+    return (isinstance(error, httpx.HTTPStatusError)
+            and 400 <= error.response.status_code < 500 and error.response.status_code != 429)
+
+
+async def send_bulk_sms_notification(messages: list[dict]) -> list[dict]:
+    """
+    Send many SMS in as few SMSAPI requests as possible.
+    :param messages: [{phone_number: str, message: str}, ...]
+    :return: outcome of every request: {indexes: [positions in messages], response: bytes}
+    or {indexes: [...], error: Exception} - a failed request does not stop the others
+
+    Recipients of the same text share one request (`to` list). Different texts
+    go out together as one templated request - "[%1%]" with per-recipient
+    param1 values separated by "|" - unless a text itself contains "|".
+    A request rejected with 4xx is sent again one message at a time, so a single
+    invalid number does not fail the rest of the batch.
+    """
+    logger.debug("Sending bulk SMS notification to %s recipients", len(messages))
+
+    texts = {item["message"] for item in messages}
+    if len(texts) == 1:
+        batches = [(list(range(len(messages))), {"message": texts.pop()})]
+    elif not any("|" in text for text in texts):
+        batches = [(list(range(len(messages))), {
+            "message": "[%1%]",
+            "param1": "|".join(item["message"] for item in messages),
+        })]
     else:
-        logger.error(f"Failed to send SMS notification to {phone_number}")
-        raise Exception(f"Failed to send SMS notification to {phone_number}")
+        batches = [([index for index, item in enumerate(messages) if item["message"] == text], {"message": text})
+                   for text in texts]
 
+    outcomes = []
+    for indexes, payload in batches:
+        payload["to"] = ",".join(messages[index]["phone_number"] for index in indexes)
+        try:
+            response = await _post_sms(payload)
+            outcomes.append({"indexes": indexes, "response": response.content})
+        except Exception as e:
+            if len(indexes) == 1 or not _is_rejected(e):
+                outcomes.append({"indexes": indexes, "error": e})
+                continue
+            logger.warning("SMS request for %s recipients rejected (%s), sending one by one", len(indexes), e)
+            for index in indexes:
+                try:
+                    response = await _post_sms({"to": messages[index]["phone_number"],
+                                                "message": messages[index]["message"]})
+                    outcomes.append({"indexes": [index], "response": response.content})
+                except Exception as single_error:
+                    outcomes.append({"indexes": [index], "error": single_error})
+    failed = sum(len(outcome["indexes"]) for outcome in outcomes if "error" in outcome)
+    logger.info("Bulk SMS sent in %s request(s), %s of %s messages failed", len(outcomes), failed, len(messages))
+    return outcomes
 
-def send_email_notification(email: str, subject: str, message: str):
+
+async def send_email_notification(email: str, subject: str, message: str):
     """
     Send an email notification to a given email address.
     The email should be a string in the format "testmail.cage@gmail.com".
     The subject and message should be a string.
     """
-    logger.info(f"Sending email notification to {email} with subject: {subject} and message: {message}")
 
     msg = MIMEText(message)
     msg['Subject'] = subject
     msg['From'] = GOOGLE_EMAIL_USER
     msg['To'] = ', '.join(email)
 
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp_server:
-        try:
-            logger.info("Logging in to Gmail...")
-            smtp_server.login(GOOGLE_EMAIL_USER, GOOGLE_EMAIL_PASSWORD)
-            logger.info("Sending email...")
-            smtp_server.sendmail(GOOGLE_EMAIL_USER, email, msg.as_string())
-            logger.info("Email sent!")
-        except Exception as e:
-            logger.error(f"Error sending email: {e}")
-            raise Exception(f"Error sending email: {e}")
+    try:
+        await smtp_pool.send_message(msg, sender=GOOGLE_EMAIL_USER, recipients=email)
+        logger.info("Email sent to %s recipient(s)", len(email))
+    except Exception as e:
+        logger.error("Error sending email: %s", e)
+        raise Exception(f"Error sending email: {e}")
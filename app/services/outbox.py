@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+import httpx
+
+from config import (OUTBOX_PATH,
+                    OUTBOX_WORKERS,
+                    OUTBOX_BATCH_SIZE,
+                    OUTBOX_MAX_ATTEMPTS,
+                    OUTBOX_RETRY_BASE_SECONDS,
+                    OUTBOX_POLL_SECONDS,
+                    OUTBOX_DEDUP_WINDOW,
+                    OUTBOX_STALE_SECONDS)
+from . import notification_service
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_due_idx ON messages (status, kind, next_attempt_at);
+"""
+
+
+class Outbox:
+    """
+    Durable SQLite queue of outgoing notifications.
+
+    Messages with the same idempotency key are stored once; without an explicit
+    key, identical messages (same kind and payload) enqueued within
+    OUTBOX_DEDUP_WINDOW seconds are treated as duplicates.
+    The file may be shared by several server workers - claims take the SQLite
+    write lock, so a message is never claimed twice.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        # several server workers may share the file; they wait for each other's write locks
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def enqueue(self, kind: str, payload: dict, idempotency_key: str | None = None) -> dict:
+        payload_json = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        if idempotency_key is None:
+            bucket = int(time.time() // OUTBOX_DEDUP_WINDOW)
+            idempotency_key = hashlib.sha256(f"{kind}:{payload_json}:{bucket}".encode()).hexdigest()
+        now = time.time()
+        message_id = uuid.uuid4().hex
+        with self._lock:
+            # OR IGNORE - another worker process may insert the same key concurrently
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO messages (id, kind, payload, idempotency_key, status, next_attempt_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (message_id, kind, payload_json, idempotency_key, QUEUED, now, now, now)
+            ).rowcount
+            row = self._conn.execute(
+                "SELECT * FROM messages WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        if not inserted:
+            logger.info("Duplicate %s message, returning existing %s", kind, row['id'])
+        return self._to_dict(row)
+
+    def get(self, message_id: str) -> dict | None:
+        row = self._conn.execute("SELECT * FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def status(self, message_id: str) -> dict | None:
+        with self._lock:
+            return self.get(message_id)
+
+    def claim(self, kind: str, limit: int) -> list[dict]:
+        """
+        Mark up to `limit` due messages of given kind as being sent and return them.
+        """
+        now = time.time()
+        with self._lock:
+            # write lock taken up front, so two worker processes never claim the same message
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # wiadomości przerwane restartem albo awarią workera wracają do kolejki
+                self._conn.execute(
+                    "UPDATE messages SET status = ? WHERE status = ? AND updated_at < ?",
+                    (QUEUED, SENDING, now - OUTBOX_STALE_SECONDS)
+                )
+                rows = self._conn.execute(
+                    "SELECT * FROM messages WHERE status = ? AND kind = ? AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (QUEUED, kind, now, limit)
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE messages SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        [(SENDING, now, row["id"]) for row in rows]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._to_dict(row, attempts_offset=1) for row in rows]
+
+    def mark_sent(self, message_ids: list[str], result=None):
+        now = time.time()
+        result_json = json.dumps(result, default=str) if result is not None else None
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE messages SET status = ?, result = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                [(SENT, result_json, now, message_id) for message_id in message_ids]
+            )
+
+    def mark_failed(self, message: dict, error: str, retry: bool = True):
+        """
+        Schedule a retry with exponential backoff, or fail for good after OUTBOX_MAX_ATTEMPTS.
+        """
+        now = time.time()
+        if retry and message["attempts"] < OUTBOX_MAX_ATTEMPTS:
+            status = QUEUED
+            next_attempt_at = now + OUTBOX_RETRY_BASE_SECONDS * 2 ** (message["attempts"] - 1)
+        else:
+            status = FAILED
+            next_attempt_at = now
+        with self._lock:
+            self._conn.execute(
+                "UPDATE messages SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (status, error, next_attempt_at, now, message["id"])
+            )
+
+    def next_due_in(self) -> float | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM messages WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        return None if row[0] is None else max(row[0] - time.time(), 0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, attempts_offset: int = 0) -> dict:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "status": SENDING if attempts_offset else row["status"],
+            "attempts": row["attempts"] + attempts_offset,
+            "last_error": row["last_error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+
+def _is_retryable(error: Exception) -> bool:
+    # błędy 4xx od SMSAPI nie znikną po ponowieniu
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return True
+
+
+class OutboxWorker:
+    """
+    Background asyncio workers draining the outbox.
+
+    Due SMS messages are sent together with a single bulk SMSAPI request where
+    possible; e-mails reuse pooled SMTP sessions.
+    """
+
+    def __init__(self, outbox: Outbox, workers: int = OUTBOX_WORKERS):
+        self.outbox = outbox
+        self.workers = workers
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+
+    def ensure_started(self):
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.get_running_loop().create_task(self._run(), name=f"outbox-{i}")
+                       for i in range(self.workers)]
+        logger.info("Started %s outbox workers", self.workers)
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self._process_sms() + await self._process_email()
+            except Exception:
+                logger.exception("Outbox worker iteration failed")
+                processed = 0
+            if processed:
+                continue
+            self._wakeup.clear()
+            due_in = await asyncio.to_thread(self.outbox.next_due_in)
+            timeout = OUTBOX_POLL_SECONDS if due_in is None else min(due_in, OUTBOX_POLL_SECONDS)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process_sms(self) -> int:
+        messages = await asyncio.to_thread(self.outbox.claim, "sms", OUTBOX_BATCH_SIZE)
+        if not messages:
+            return 0
+        try:
+            outcomes = await notification_service.send_bulk_sms_notification(
+                [message["payload"] for message in messages]
+            )
+        except Exception as e:
+            logger.error("Sending SMS batch of %s failed: %s", len(messages), e)
+            outcomes = [{"indexes": list(range(len(messages))), "error": e}]
+        # każde żądanie rozliczane osobno - wysłane wcześniej SMS-y nie wracają do kolejki
+        for outcome in outcomes:
+            batch = [messages[index] for index in outcome["indexes"]]
+            if "error" not in outcome:
+                await asyncio.to_thread(self.outbox.mark_sent, [message["id"] for message in batch],
+                                        outcome["response"])
+                continue
+            error = outcome["error"]
+            logger.error("Sending SMS to %s recipient(s) failed: %s", len(batch), error)
+            for message in batch:
+                await asyncio.to_thread(self.outbox.mark_failed, message, str(error), _is_retryable(error))
+        return len(messages)
+
+    async def _process_email(self) -> int:
+        messages = await asyncio.to_thread(self.outbox.claim, "email", OUTBOX_BATCH_SIZE)
+
+        async def send(message):
+            payload = message["payload"]
+            try:
+                await notification_service.send_email_notification(
+                    email=payload["email"], subject=payload["subject"], message=payload["message"]
+                )
+                await asyncio.to_thread(self.outbox.mark_sent, [message["id"]])
+            except Exception as e:
+                await asyncio.to_thread(self.outbox.mark_failed, message, str(e), _is_retryable(e))
+
+        await asyncio.gather(*(send(message) for message in messages))
+        return len(messages)
+
+
+outbox = Outbox(OUTBOX_PATH)
+outbox_worker = OutboxWorker(outbox)
+
+
+async def enqueue(kind: str, payload: dict, idempotency_key: str | None = None) -> dict:
+    """
+    Store message in the outbox and wake up workers.
+    """
+    return (await enqueue_many(kind, [payload], idempotency_key))[0]
+
+
+async def enqueue_many(kind: str, payloads: list[dict], idempotency_key: str | None = None) -> list[dict]:
+    """
+    Store messages in the outbox and wake up workers. SQLite calls run in a thread -
+    the file is shared by all server processes and a write lock held by another
+    one must not stall the event loop.
+    """
+    outbox_worker.ensure_started()
+    messages = await asyncio.to_thread(
+        lambda: [outbox.enqueue(kind, payload, idempotency_key) for payload in payloads])
+    outbox_worker.notify()
+    return messages
+
+
+async def status(message_id: str) -> dict | None:
+    return await asyncio.to_thread(outbox.status, message_id)
@@ -0,0 +1,188 @@
+"""
+Single-technician day routing with time windows: travel-time matrix from
+coordinates, nearest insertion followed by 2-opt, and cheapest insertion of new
+visits. Times are minutes from midnight of the planned day; node 0 is the depot.
+"""
+from dataclasses import dataclass
+import math
+
+from .geocoding import Coordinates
+
+EARTH_RADIUS_KM = 6371.0088
+# różnice poniżej tej wartości (w minutach) traktujemy jako równe
+EPSILON = 1e-6
+
+
+def haversine_km(a: Coordinates, b: Coordinates) -> float:
+    lat1, lat2 = math.radians(a.lat), math.radians(b.lat)
+    dlat, dlon = lat2 - lat1, math.radians(b.lon - a.lon)
+    h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def travel_matrix(points: list[Coordinates], speed_kmh: float, detour_factor: float) -> list[list[float]]:
+    """
+    Travel minutes between every pair of points (symmetric).
+    """
+    minutes_per_km = 60 * detour_factor / speed_kmh
+    size = len(points)
+    matrix = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(i + 1, size):
+            matrix[i][j] = matrix[j][i] = haversine_km(points[i], points[j]) * minutes_per_km
+    return matrix
+
+
+@dataclass(slots=True)
+class Stop:
+    key: str
+    node: int
+    duration: float
+    # okno czasowe rozpoczęcia wizyty
+    earliest: float
+    latest: float
+
+
+@dataclass(slots=True)
+class Visit:
+    stop: Stop
+    travel: float
+    arrival: float
+    start: float
+    end: float
+
+    @property
+    def lateness(self) -> float:
+        return max(0.0, self.start - self.stop.latest)
+
+
+@dataclass(slots=True)
+class Schedule:
+    visits: list[Visit]
+    travel: float
+    lateness: float
+    return_time: float
+
+
+class RoutePlanner:
+    """
+    Heuristics over a fixed travel matrix. A route is a list of stops visited
+    after leaving the depot at `day_start` and before returning to it.
+
+    Time windows are soft: a route may start a visit after its `latest` time,
+    but a change is only accepted when it does not add lateness beyond
+    `allowed_lateness` - existing visits that already cannot be reached on time
+    do not block planning the rest of the day.
+    """
+
+    def __init__(self, matrix: list[list[float]], day_start: float, allowed_lateness: float = 0.0):
+        self.matrix = matrix
+        self.day_start = day_start
+        self.allowed_lateness = allowed_lateness
+
+    def schedule(self, route: list[Stop]) -> Schedule:
+        matrix = self.matrix
+        time = self.day_start
+        node = 0
+        travel = lateness = 0.0
+        visits = []
+        for stop in route:
+            leg = matrix[node][stop.node]
+            arrival = time + leg
+            start = max(arrival, stop.earliest)
+            visit = Visit(stop, leg, arrival, start, start + stop.duration)
+            visits.append(visit)
+            travel += leg
+            lateness += visit.lateness
+            time = visit.end
+            node = stop.node
+        travel += matrix[node][0]
+        return Schedule(visits, travel, lateness, time + matrix[node][0])
+
+    def _lateness(self, route: list[Stop]) -> float:
+        # wersja schedule() bez budowania wizyt - wywoływana w pętlach heurystyk
+        matrix = self.matrix
+        time = self.day_start
+        node = 0
+        lateness = 0.0
+        for stop in route:
+            start = max(time + matrix[node][stop.node], stop.earliest)
+            if start > stop.latest:
+                lateness += start - stop.latest
+            time = start + stop.duration
+            node = stop.node
+        return lateness
+
+    def feasible(self, route: list[Stop]) -> bool:
+        return self._lateness(route) <= self.allowed_lateness + EPSILON
+
+    def travel(self, route: list[Stop]) -> float:
+        nodes = [0, *(stop.node for stop in route), 0]
+        return sum(self.matrix[a][b] for a, b in zip(nodes, nodes[1:]))
+
+    def cheapest_insertion(self, route: list[Stop], stop: Stop) -> tuple[int, float] | None:
+        """
+        Position in `route` where inserting `stop` adds the least travel without
+        breaking time windows, with the added travel minutes; None when there is none.
+        """
+        matrix = self.matrix
+        best = None
+        previous = 0
+        for position in range(len(route) + 1):
+            following = route[position].node if position < len(route) else 0
+            added = matrix[previous][stop.node] + matrix[stop.node][following] - matrix[previous][following]
+            if (best is None or added < best[1] - EPSILON) and \
+                    self.feasible(route[:position] + [stop] + route[position:]):
+                best = (position, added)
+            previous = following
+        return best
+
+    def nearest_insertion(self, route: list[Stop], stops: list[Stop]) -> tuple[list[Stop], list[Stop]]:
+        """
+        Adds `stops` to `route` one by one - always the stop closest to the route
+        so far, at its cheapest position. Returns the route and stops that fit nowhere.
+        """
+        route = list(route)
+        remaining = list(stops)
+        unassigned = []
+        # odległość każdego punktu od najbliższego węzła trasy, aktualizowana po każdym wstawieniu
+        distance = {id(stop): min([self.matrix[0][stop.node]] + [self.matrix[other.node][stop.node]
+                                                                 for other in route])
+                    for stop in remaining}
+        while remaining:
+            stop = min(remaining, key=lambda candidate: distance[id(candidate)])
+            remaining.remove(stop)
+            insertion = self.cheapest_insertion(route, stop)
+            if insertion is None:
+                unassigned.append(stop)
+                continue
+            route.insert(insertion[0], stop)
+            for other in remaining:
+                distance[id(other)] = min(distance[id(other)], self.matrix[stop.node][other.node])
+        return route, unassigned
+
+    def two_opt(self, route: list[Stop]) -> list[Stop]:
+        """
+        Reverses route segments while that shortens the route and keeps time windows.
+        """
+        matrix = self.matrix
+        route = list(route)
+        improved = True
+        while improved:
+            improved = False
+            for i in range(len(route) - 1):
+                before = route[i - 1].node if i > 0 else 0
+                for j in range(i + 1, len(route)):
+                    after = route[j + 1].node if j + 1 < len(route) else 0
+                    # macierz jest symetryczna - odwrócony odcinek ma tę samą długość
+                    delta = (matrix[before][route[j].node] + matrix[route[i].node][after]
+                             - matrix[before][route[i].node] - matrix[route[j].node][after])
+                    if delta < -EPSILON:
+                        candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                        if self.feasible(candidate):
+                            route = candidate
+                            improved = True
+                            break
+                if improved:
+                    break
+        return route
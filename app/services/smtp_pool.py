@@ -0,0 +1,173 @@
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+
+import aiosmtplib
+
+from telemetry import traced
+
+logger = logging.getLogger(__name__)
+
+
+class _Session:
+    __slots__ = ("client", "last_used", "last_checked")
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.last_used = time.monotonic()
+        # ostatni dowód, że serwer trzyma sesję (wysyłka albo NOOP)
+        self.last_checked = self.last_used
+
+
+class SMTPPool:
+    """
+    Pool of long-lived, authenticated SMTP sessions.
+
+    At most `max_size` sessions exist at once. start() binds the pool to the
+    serving event loop and starts a keepalive task sending NOOP every
+    `keepalive` seconds on idle sessions, so Gmail does not drop them between
+    messages; a session idle longer than `max_idle` is closed. A message that
+    fails on a broken session is retried once on a fresh one.
+    """
+
+    def __init__(self, hostname: str, port: int, username: str | None, password: str | None,
+                 use_tls: bool = True, max_size: int = 3, keepalive: float = 60,
+                 max_idle: float = 300, timeout: float = 30):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.keepalive = keepalive
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle: list[_Session] = []
+        # wszystkie otwarte sesje: wolne, w użyciu i sprawdzane przez keepalive
+        self._open = 0
+        self._semaphore: asyncio.Semaphore | None = None
+        self._keepalive_task: asyncio.Task | None = None
+
+    def start(self):
+        """
+        Bind the pool to the running event loop; called when the server starts.
+        """
+        self._semaphore = asyncio.Semaphore(self.max_size)
+        self._keepalive_task = asyncio.get_running_loop().create_task(self._keep_alive(), name="smtp-keepalive")
+
+    @traced("smtp", "connect")
+    async def _connect(self) -> _Session:
+        logger.info("Opening SMTP session to %s:%s", self.hostname, self.port)
+        client = aiosmtplib.SMTP(hostname=self.hostname, port=self.port,
+                                 use_tls=self.use_tls, timeout=self.timeout)
+        await client.connect()
+        if self.username:
+            try:
+                await client.login(self.username, self.password)
+            except BaseException:
+                client.close()
+                raise
+        self._open += 1
+        return _Session(client)
+
+    async def _close(self, session: _Session):
+        self._open -= 1
+        try:
+            await session.client.quit()
+        except Exception:
+            pass
+        finally:
+            # po QUIT no-op; po anulowaniu albo błędzie zamyka gniazdo
+            session.client.close()
+
+    def _discard(self, session: _Session):
+        """
+        Drop a session without QUIT; used when its protocol state is unknown.
+        """
+        self._open -= 1
+        session.client.close()
+
+    async def _is_alive(self, session: _Session) -> bool:
+        if not session.client.is_connected:
+            return False
+        now = time.monotonic()
+        if now - session.last_used >= self.max_idle:
+            return False
+        if now - session.last_checked >= self.keepalive:
+            try:
+                await session.client.noop()
+            except (aiosmtplib.SMTPException, ConnectionError) as e:
+                logger.info("SMTP session failed keepalive check: %s", e)
+                return False
+            session.last_checked = time.monotonic()
+        return True
+
+    async def _keep_alive(self):
+        while True:
+            await asyncio.sleep(self.keepalive)
+            # sprawdzane sesje są wyjęte z puli, więc nie trafią w tym czasie do wysyłki
+            sessions, self._idle = self._idle, []
+            while sessions:
+                session = sessions.pop()
+                try:
+                    # w trakcie sprawdzania _acquire mógł otworzyć nowe sesje - nadmiarowe zamykamy
+                    alive = self._open <= self.max_size and await self._is_alive(session)
+                except BaseException:
+                    # close() w trakcie NOOP - niesprawdzone sesje wracają, żeby close() je zamknął
+                    self._discard(session)
+                    self._idle.extend(sessions)
+                    raise
+                if alive:
+                    self._idle.append(session)
+                else:
+                    await self._close(session)
+
+    async def _acquire(self) -> _Session:
+        while self._idle:
+            session = self._idle.pop()
+            if await self._is_alive(session):
+                return session
+            await self._close(session)
+        return await self._connect()
+
+    def _release(self, session: _Session):
+        if self._open > self.max_size:
+            self._discard(session)
+            return
+        session.last_used = session.last_checked = time.monotonic()
+        self._idle.append(session)
+
+    @asynccontextmanager
+    async def session(self):
+        if self._semaphore is None:
+            raise RuntimeError("SMTP pool is not started")
+        async with self._semaphore:
+            session = await self._acquire()
+            try:
+                yield session.client
+            except BaseException:
+                # błąd w trakcie wysyłki (także anulowanie) zostawia protokół w nieznanym stanie
+                self._discard(session)
+                raise
+            else:
+                self._release(session)
+
+    @traced("smtp", "send")
+    async def send_message(self, message, sender: str, recipients: list[str]):
+        try:
+            async with self.session() as client:
+                return await client.send_message(message, sender=sender, recipients=recipients)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as e:
+            logger.info("SMTP session lost (%s), retrying on a new one", e)
+            async with self.session() as client:
+                return await client.send_message(message, sender=sender, recipients=recipients)
+
+    async def close(self):
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            await asyncio.gather(self._keepalive_task, return_exceptions=True)
+            self._keepalive_task = None
+        sessions, self._idle = self._idle, []
+        for session in sessions:
+            await self._close(session)
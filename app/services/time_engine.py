@@ -0,0 +1,332 @@
+"""
+Time handling in one place: zone rules of TIMEZONE (loaded once), natural date
+ranges ("next week", "2025-09-01 +3d"), events normalized to the canonical zone
+and local expansion of recurring events from their masters.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import logging
+import re
+
+from dateutil.rrule import rrulestr
+
+from config import TIMEZONE
+from text_normalization import fold_search_key
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=32)
+def get_zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+LOCAL_TZ = get_zone(TIMEZONE)
+
+
+def now() -> datetime:
+    return datetime.now(LOCAL_TZ)
+
+
+def to_local(value: datetime) -> datetime:
+    """
+    Aware datetime in the canonical zone; naive values are taken as local time.
+    """
+    return value.replace(tzinfo=LOCAL_TZ) if value.tzinfo is None else value.astimezone(LOCAL_TZ)
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=LOCAL_TZ)
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parse RFC3339 / ISO8601 string into timezone-aware datetime.
+    Values without offset are treated as local (TIMEZONE) time.
+    """
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=LOCAL_TZ)
+    return parsed
+
+
+def _event_time(value: dict) -> datetime:
+    if "dateTime" in value:
+        parsed = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            # czas bez przesunięcia obowiązuje w strefie podanej obok
+            parsed = parsed.replace(tzinfo=get_zone(value["timeZone"]) if "timeZone" in value else LOCAL_TZ)
+        return parsed
+    # wydarzenia całodniowe mają tylko pole "date"
+    return day_start(date.fromisoformat(value["date"]))
+
+
+def event_bounds(event: dict) -> tuple[datetime, datetime]:
+    return _event_time(event["start"]), _event_time(event["end"])
+
+
+def _time_value(value: datetime, all_day: bool) -> dict:
+    if all_day:
+        return {"date": value.date().isoformat()}
+    return {"dateTime": value.astimezone(LOCAL_TZ).isoformat(), "timeZone": TIMEZONE}
+
+
+def normalize_event(event: dict) -> dict:
+    """
+    Copy of the event with timed start/end (and originalStartTime) in the canonical zone.
+    All-day events keep their dates.
+    """
+    normalized = dict(event)
+    for key in ("start", "end", "originalStartTime"):
+        value = event.get(key)
+        if value and "dateTime" in value:
+            normalized[key] = _time_value(_event_time(value), all_day=False)
+    return normalized
+
+
+# --- natural ranges ---
+
+_WEEKDAYS = {
+    "monday": 0, "poniedzialek": 0, "tuesday": 1, "wtorek": 1, "wednesday": 2, "sroda": 2, "srode": 2,
+    "thursday": 3, "czwartek": 3, "friday": 4, "piatek": 4, "saturday": 5, "sobota": 5, "sobote": 5,
+    "sunday": 6, "niedziela": 6, "niedziele": 6,
+}
+_NEXT = ("next ", "przyszly ", "przyszla ", "przyszle ", "nastepny ", "nastepna ")
+_DURATION_UNITS = {
+    "m": "minutes", "min": "minutes", "mins": "minutes", "minute": "minutes", "minutes": "minutes",
+    "minut": "minutes", "minuta": "minutes", "minuty": "minutes",
+    "h": "hours", "hour": "hours", "hours": "hours", "godz": "hours", "godzina": "hours",
+    "godziny": "hours", "godzin": "hours",
+    "d": "days", "day": "days", "days": "days", "dzien": "days", "dni": "days",
+    "w": "weeks", "week": "weeks", "weeks": "weeks", "tydzien": "weeks", "tygodnie": "weeks", "tygodni": "weeks",
+}
+_DURATION_PART = re.compile(r"(\d+)\s*([a-z]+)")
+_PLUS_DURATION = re.compile(r"^(\S+(?:[ t]\d{1,2}:\d{2}(?::\d{2})?)?)\s*(?:\+|for |na |przez )\s*(.+)$")
+_DATE_SPAN = re.compile(r"^(\d{4}-\d{2}-\d{2})\s*(?:\.\.|to |do )\s*(\d{4}-\d{2}-\d{2})$")
+_NEXT_DAYS = re.compile(r"^(?:next |najblizsze |najblizszy |najblizsza |kolejne )?(\d+) "
+                        r"(days|dni|weeks|tygodnie|tygodni)$")
+
+RANGE_EXAMPLES = ("today", "tomorrow", "this week", "next week", "next month", "friday", "next 3 days",
+                  "2025-09-01", "2025-09-01..2025-09-05", "2025-09-01 +3d", "2025-09-01T08:00 for 2h",
+                  "jutro", "przyszły tydzień", "najbliższe 5 dni")
+
+
+def add_duration(start: datetime, duration: str) -> datetime:
+    """
+    `start` moved by a duration like "90 min", "2h", "3 days", "1 week" or "1d 4h".
+    Days and weeks keep the wall-clock time across DST changes, minutes and hours are exact.
+    """
+    text = fold_search_key(duration).replace(",", " ").strip()
+    parts = _DURATION_PART.findall(text)
+    if not parts or _DURATION_PART.sub("", text).strip():
+        raise ValueError(f"Unrecognized duration: {duration}")
+    amounts = {"minutes": 0, "hours": 0, "days": 0, "weeks": 0}
+    for amount, unit in parts:
+        if unit not in _DURATION_UNITS:
+            raise ValueError(f"Unrecognized duration unit: {unit}")
+        amounts[_DURATION_UNITS[unit]] += int(amount)
+    start = to_local(start)
+    # arytmetyka na strefie ZoneInfo jest "ścienna" - dzień po 08:00 to znowu 08:00, także przy zmianie czasu
+    shifted = start + timedelta(days=amounts["days"], weeks=amounts["weeks"])
+    exact = timedelta(hours=amounts["hours"], minutes=amounts["minutes"])
+    return (shifted.astimezone(timezone.utc) + exact).astimezone(LOCAL_TZ)
+
+
+def _day_range(first: date, days: int = 1) -> tuple[datetime, datetime]:
+    return day_start(first), day_start(first + timedelta(days=days))
+
+
+def _month_start(day: date, months: int = 0) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def parse_range(text: str, reference: datetime | None = None) -> tuple[datetime, datetime]:
+    """
+    [start, end) in TIMEZONE for a natural range - see RANGE_EXAMPLES.
+    English and Polish phrases are accepted, with or without diacritics.
+    """
+    key = " ".join(fold_search_key(text).split())
+    today = to_local(reference or now()).date()
+    monday = today - timedelta(days=today.weekday())
+
+    fixed = {
+        ("today", "dzis", "dzisiaj"): lambda: _day_range(today),
+        ("tomorrow", "jutro"): lambda: _day_range(today + timedelta(days=1)),
+        ("day after tomorrow", "pojutrze"): lambda: _day_range(today + timedelta(days=2)),
+        ("yesterday", "wczoraj"): lambda: _day_range(today - timedelta(days=1)),
+        ("this week", "ten tydzien", "w tym tygodniu"): lambda: _day_range(monday, 7),
+        ("next week", "przyszly tydzien", "nastepny tydzien", "w przyszlym tygodniu"):
+            lambda: _day_range(monday + timedelta(weeks=1), 7),
+        ("last week", "previous week", "zeszly tydzien", "poprzedni tydzien", "w zeszlym tygodniu"):
+            lambda: _day_range(monday - timedelta(weeks=1), 7),
+        ("weekend", "this weekend", "ten weekend", "w ten weekend", "w weekend"):
+            lambda: _day_range(monday + timedelta(days=5), 2),
+        ("this month", "ten miesiac", "w tym miesiacu"):
+            lambda: (day_start(_month_start(today)), day_start(_month_start(today, 1))),
+        ("next month", "przyszly miesiac", "nastepny miesiac", "w przyszlym miesiacu"):
+            lambda: (day_start(_month_start(today, 1)), day_start(_month_start(today, 2))),
+    }
+    for phrases, resolve in fixed.items():
+        if key in phrases:
+            return resolve()
+
+    weekday_key = key.removeprefix("w ").removeprefix("we ")
+    next_week = weekday_key.startswith(_NEXT)
+    for prefix in _NEXT:
+        weekday_key = weekday_key.removeprefix(prefix)
+    if weekday_key in _WEEKDAYS:
+        # "piątek" - najbliższy (także dzisiejszy), "przyszły piątek" - piątek w przyszłym tygodniu
+        if next_week:
+            return _day_range(monday + timedelta(weeks=1, days=_WEEKDAYS[weekday_key]))
+        return _day_range(today + timedelta(days=(_WEEKDAYS[weekday_key] - today.weekday()) % 7))
+
+    if match := _NEXT_DAYS.match(key):
+        count, unit = int(match.group(1)), match.group(2)
+        return _day_range(today, count if unit in ("days", "dni") else count * 7)
+
+    if match := _DATE_SPAN.match(key):
+        first, last = date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+        if last < first:
+            raise ValueError(f"Range ends before it starts: {text}")
+        return _day_range(first, (last - first).days + 1)
+
+    if match := _PLUS_DURATION.match(key):
+        start = parse_datetime(match.group(1).upper().replace(" ", "T"))
+        return start, add_duration(start, match.group(2))
+
+    try:
+        return _day_range(date.fromisoformat(key))
+    except ValueError:
+        pass
+    raise ValueError(f"Unrecognized date range: {text!r}, use e.g. {', '.join(RANGE_EXAMPLES)}")
+
+
+# --- recurring events ---
+
+class RecurrenceError(ValueError):
+    """
+    Recurrence rule that cannot be expanded locally; instances of the series
+    have to come from the API.
+    """
+
+
+def original_start(event: dict) -> float:
+    """
+    Timestamp of the series slot an exception (modified or cancelled instance) replaces.
+    """
+    return _event_time(event["originalStartTime"]).timestamp()
+
+
+@lru_cache(maxsize=1024)
+def _rule_set(recurrence: tuple[str, ...], dtstart: datetime):
+    # reguła parsowana raz na serię (i zmianę jej reguły), kolejne zapytania tylko ją iterują
+    return rrulestr("\n".join(recurrence), dtstart=dtstart, forceset=True)
+
+
+def _instance_id(master_id: str, start: datetime, all_day: bool) -> str:
+    # format identyczny z Google, więc id instancji działa też w events.get
+    if all_day:
+        return f"{master_id}_{start:%Y%m%d}"
+    return f"{master_id}_{start.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+
+
+def expand_recurring(master: dict, start: datetime, end: datetime,
+                     overridden: set[float] | frozenset = frozenset()) -> list[dict]:
+    """
+    Instances of a recurring event (master with `recurrence`) overlapping [start, end),
+    in the canonical zone. Slots listed in `overridden` (original start timestamps of
+    modified or cancelled instances) are skipped - those exceptions are separate events.
+    Raises RecurrenceError when the rule cannot be parsed.
+    """
+    first_start, first_end = event_bounds(master)
+    if first_start >= end:
+        return []
+    duration = first_end - first_start
+    all_day = "date" in master["start"]
+    if all_day:
+        # reguły wydarzeń całodniowych operują na datach (UNTIL bez strefy)
+        dtstart = datetime.combine(first_start.date(), time.min)
+    else:
+        # powtórzenia liczone w czasie ściennym strefy wydarzenia - godzina nie przesuwa się przy zmianie czasu
+        dtstart = first_start.astimezone(get_zone(master["start"].get("timeZone", TIMEZONE)))
+    try:
+        rules = _rule_set(tuple(master["recurrence"]), dtstart)
+        window_start = start - duration
+        if all_day:
+            occurrences = [day_start(occurrence.date()) for occurrence in rules.between(
+                window_start.astimezone(LOCAL_TZ).replace(tzinfo=None),
+                end.astimezone(LOCAL_TZ).replace(tzinfo=None), inc=True)]
+        else:
+            occurrences = rules.between(window_start, end, inc=True)
+    except (ValueError, TypeError) as e:
+        # nie zgadujemy - pierwsze wystąpienie zamiast całej serii ukryłoby zajęte terminy
+        raise RecurrenceError(f"Cannot expand recurring event {master.get('id')}: {e}") from e
+
+    template = {key: value for key, value in master.items() if key != "recurrence"}
+    instances = []
+    for occurrence in occurrences:
+        occurrence_end = occurrence + duration
+        if occurrence >= end or occurrence_end <= start or occurrence.timestamp() in overridden:
+            continue
+        instance = dict(template)
+        instance["id"] = _instance_id(master["id"], occurrence, all_day)
+        instance["recurringEventId"] = master["id"]
+        instance["start"] = _time_value(occurrence, all_day)
+        instance["end"] = _time_value(occurrence_end, all_day)
+        instance["originalStartTime"] = instance["start"]
+        instances.append(instance)
+    return instances
+
+
+def series_events(instances: list[dict], start: datetime, end: datetime) -> list[dict]:
+    """
+    Instances of one series returned by the API (events.instances), normalized,
+    without cancelled ones and those outside [start, end).
+    """
+    result = []
+    for instance in instances:
+        if instance.get("status") == "cancelled":
+            continue
+        instance_start, instance_end = event_bounds(instance)
+        if instance_start < end and instance_end > start:
+            result.append(normalize_event(instance))
+    return result
+
+
+def expand_events(events: list[dict], start: datetime, end: datetime, series_instances=None) -> list[dict]:
+    """
+    Result of events.list with singleEvents=False (masters, exceptions and single
+    events) as single events overlapping [start, end), normalized and ordered by start.
+    Series whose rule cannot be expanded locally are taken from `series_instances(series_id)`
+    (instances of the series from the API); without it RecurrenceError is raised.
+    """
+    masters = []
+    overridden: dict[str, set[float]] = {}
+    result = []
+    for event in events:
+        if event.get("recurringEventId") and event.get("originalStartTime"):
+            overridden.setdefault(event["recurringEventId"], set()).add(original_start(event))
+        if event.get("status") == "cancelled":
+            continue
+        if event.get("recurrence"):
+            # master zostaje w swojej strefie - od niej zależy godzina powtórzeń
+            masters.append(event)
+            continue
+        event_start, event_end = event_bounds(event)
+        if event_start < end and event_end > start:
+            result.append(normalize_event(event))
+    for master in masters:
+        try:
+            result.extend(expand_recurring(master, start, end, overridden.get(master["id"], frozenset())))
+        except RecurrenceError as e:
+            if series_instances is None:
+                raise
+            logger.warning("%s, fetching its instances", e)
+            # zmienione instancje serii są już w wyniku jako osobne zdarzenia
+            known = {event["id"] for event in result}
+            result.extend(instance for instance in series_events(series_instances(master["id"]), start, end)
+                          if instance["id"] not in known)
+    result.sort(key=lambda event: event_bounds(event)[0])
+    return result
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+
+from config import GEOCODER_PROVIDER, WARMUP_RETRY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+READY = "ready"
+DEGRADED = "degraded"
+
+
+class Readiness:
+    """
+    Thread-safe state of external dependencies, filled in by background warmups.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: dict[str, dict] = {}
+        self.started_at = time.time()
+
+    def set(self, name: str, status: str, detail: str | None = None):
+        with self._lock:
+            self._state[name] = {"status": status, "detail": detail, "updated_at": time.time()}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            dependencies = {name: dict(state) for name, state in self._state.items()}
+        if all(state["status"] == READY for state in dependencies.values()):
+            status = READY
+        elif any(state["status"] == DEGRADED for state in dependencies.values()):
+            status = DEGRADED
+        else:
+            status = PENDING
+        return {"status": status, "uptime": time.time() - self.started_at, "dependencies": dependencies}
+
+    @property
+    def is_ready(self) -> bool:
+        return self.snapshot()["status"] == READY
+
+
+readiness = Readiness()
+# zatrzymuje ponawianie nieudanych rozgrzewek przy wyłączaniu workera
+_stopping = threading.Event()
+
+
+def _run_warmup(name: str, func):
+    """
+    Run warmup until it succeeds; a failed one marks the dependency degraded and
+    is retried every WARMUP_RETRY_SECONDS.
+    """
+    while True:
+        started = time.monotonic()
+        try:
+            func()
+            readiness.set(name, READY)
+            logger.info("Warmup `%s` finished in %.2fs", name, time.monotonic() - started)
+            return
+        except Exception as e:
+            readiness.set(name, DEGRADED, str(e))
+            logger.error("Warmup `%s` failed, dependency degraded, retrying in %ss: %s",
+                         name, WARMUP_RETRY_SECONDS, e)
+        if _stopping.wait(WARMUP_RETRY_SECONDS):
+            return
+
+
+def _warm_postgres():
+    from services.db_service import connection_pool
+    connection_pool.prefill()
+    if not connection_pool.check():
+        raise Exception("Connection with Postgres failed.")
+
+
+def _warm_google_credentials():
+    from services.google_client import service_manager
+    service_manager.get_credentials()
+
+
+def _warm_google_discovery():
+    from services.google_client import service_manager
+    service_manager.load_discovery()
+
+
+WARMUPS = {
+    "postgres": _warm_postgres,
+    "google_credentials": _warm_google_credentials,
+    "google_discovery": _warm_google_discovery,
+}
+
+
+def start_warmups() -> list[threading.Thread]:
+    """
+    Run all warmups concurrently in background threads; does not block server start.
+    """
+    _stopping.clear()
+    if GEOCODER_PROVIDER == "stub":
+        logger.warning("GEOCODER_PROVIDER=stub - plan_technician_route uses made-up coordinates, "
+                       "set GEOCODER_PROVIDER=nominatim outside tests")
+    threads = []
+    for name, func in WARMUPS.items():
+        readiness.set(name, PENDING)
+        thread = threading.Thread(target=_run_warmup, args=(name, func),
+                                  name=f"warmup-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+async def shutdown(drain_timeout: float):
+    """
+    Graceful stop of a worker: mark it not ready, wait for in-flight tool calls,
+    then close pools owned by this process.
+    """
+    from dispatcher import drain, executor
+    from services import notification_service
+    from services.db_service import connection_pool
+    from services.geocoding import close_geocoder
+    from services.outbox import outbox, outbox_worker
+
+    readiness.set("server", DEGRADED, "shutting down")
+    _stopping.set()
+    await drain(drain_timeout)
+    # wiadomości przerwane w trakcie wysyłki wracają do kolejki po OUTBOX_STALE_SECONDS
+    await outbox_worker.stop()
+    await notification_service.close_http_client()
+    await notification_service.smtp_pool.close()
+    executor.shutdown(wait=False, cancel_futures=True)
+    connection_pool.close_all()
+    outbox.close()
+    close_geocoder()
+    logger.info("Worker resources released")
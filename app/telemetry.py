@@ -0,0 +1,299 @@
+from collections import deque
+from contextlib import contextmanager
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+
+from config import SLOW_TOOL_SECONDS, SLOW_DEPENDENCY_SECONDS, TRACE_BUFFER_SIZE
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: dict | None = None) -> str:
+    pairs = list(zip(labelnames, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # key -> [counts per bucket..., +Inf count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[len(self.buckets)] += 1
+            data[-1] += value
+
+    def count(self, **labels) -> int:
+        data = self._values.get(_label_key(self.labelnames, labels))
+        return data[len(self.buckets)] if data else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, data in sorted(self._values.items()):
+                for i, bound in enumerate(self.buckets):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': bound})} {data[i]}")
+                total = data[len(self.buckets)]
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': '+Inf'})} {total}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {data[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {total}")
+        return lines
+
+
+class Gauge:
+    """
+    Gauge read from a callback at scrape time, returning {labels tuple: value}.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.error("Gauge %s callback failed: %s", self.name, e)
+            return lines
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, object] = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+TOOL_CALLS = registry.register(Counter(
+    "mcp_tool_calls_total", "Tool calls by tool and outcome", ("tool", "status")))
+TOOL_LATENCY = registry.register(Histogram(
+    "mcp_tool_duration_seconds", "Tool call latency", ("tool",)))
+DEPENDENCY_CALLS = registry.register(Counter(
+    "dependency_calls_total", "Calls to external dependencies by outcome", ("dependency", "operation", "status")))
+DEPENDENCY_LATENCY = registry.register(Histogram(
+    "dependency_duration_seconds", "Latency of external dependency calls", ("dependency", "operation")))
+SLOW_CALLS = registry.register(Counter(
+    "slow_calls_total", "Calls above slow-call threshold", ("kind", "name")))
+
+
+# --- tracing ---
+
+class Span:
+    """
+    Finished span, field names follow the OpenTelemetry data model.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_time", "end_time",
+                 "attributes", "status", "error")
+
+    def __init__(self, name: str, trace_id: str, span_id: str, parent_span_id: str | None, attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_span_id = parent_span_id
+        self.start_time = time.time_ns()
+        self.end_time: int | None = None
+        self.attributes = attributes
+        self.status = "OK"
+        self.error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_time or time.time_ns()) - self.start_time) / 1e9
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__} | {"duration": self.duration}
+
+
+class InMemorySpanExporter:
+    """
+    Keeps the last finished spans in memory - offline inspection and tests.
+    """
+
+    def __init__(self, maxlen: int):
+        self._spans: deque[Span] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def get_finished_spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+span_exporter = InMemorySpanExporter(TRACE_BUFFER_SIZE)
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+_otel_tracer = otel_trace.get_tracer("optimalit_mcp") if otel_trace is not None else None
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    parent = _current_span.get()
+    current = Span(name,
+                   trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+                   span_id=os.urandom(8).hex(),
+                   parent_span_id=parent.span_id if parent else None,
+                   attributes=attributes)
+    token = _current_span.set(current)
+    otel_span = _otel_tracer.start_as_current_span(name, attributes=attributes) if _otel_tracer else None
+    try:
+        if otel_span is not None:
+            with otel_span:
+                yield current
+        else:
+            yield current
+    except Exception as e:
+        current.status = "ERROR"
+        current.error = str(e)
+        raise
+    finally:
+        current.end_time = time.time_ns()
+        _current_span.reset(token)
+        span_exporter.export(current)
+
+
+def _record_dependency(dependency: str, operation: str, current: Span):
+    duration = current.duration
+    status = "ok" if current.status == "OK" else "error"
+    DEPENDENCY_LATENCY.observe(duration, dependency=dependency, operation=operation)
+    DEPENDENCY_CALLS.inc(dependency=dependency, operation=operation, status=status)
+    if duration >= SLOW_DEPENDENCY_SECONDS:
+        SLOW_CALLS.inc(kind="dependency", name=f"{dependency}.{operation}")
+        logger.warning("Slow dependency call %s.%s: %.3fs", dependency, operation, duration)
+
+
+def traced(dependency: str, operation: str | None = None):
+    """
+    Decorator wrapping sync or async function in dependency_span.
+    """
+
+    def decorator(func):
+        name = operation or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with dependency_span(dependency, name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with dependency_span(dependency, name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def dependency_span(dependency: str, operation: str, **attributes):
+    """
+    Span around a call to Postgres, Google, SMTP or SMSAPI, recorded in dependency metrics.
+    """
+    current = None
+    try:
+        with span(f"{dependency}.{operation}", dependency=dependency, **attributes) as current:
+            yield current
+    finally:
+        if current is not None:
+            _record_dependency(dependency, operation, current)
+
+
+def record_tool_call(tool: str, duration: float, status: str):
+    TOOL_LATENCY.observe(duration, tool=tool)
+    TOOL_CALLS.inc(tool=tool, status=status)
+    if duration >= SLOW_TOOL_SECONDS:
+        SLOW_CALLS.inc(kind="tool", name=tool)
+        logger.warning("Slow tool call %s: %.3fs (%s)", tool, duration, status)
+
+
+def render_metrics() -> str:
+    return registry.render()
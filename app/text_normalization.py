@@ -0,0 +1,93 @@
+"""
+Text normalization shared by SMS sending and client search.
+
+Diacritics are removed with a `str.translate` table built once at import, covering
+Latin-1 Supplement and Latin Extended-A/B (including letters NFKD does not
+decompose, like "ł" or "ø"). GSM-7 helpers tell how SMSAPI will bill a message.
+"""
+import math
+import unicodedata
+
+# litery, których NFKD nie rozkłada na literę bazową + znak diakrytyczny
+_SPECIAL_LETTERS = {
+    "ł": "l", "Ł": "L", "đ": "d", "Đ": "D", "ø": "o", "Ø": "O", "ß": "ss", "æ": "ae", "Æ": "AE",
+    "œ": "oe", "Œ": "OE", "þ": "th", "Þ": "Th", "ð": "d", "Ð": "D", "ħ": "h", "Ħ": "H", "ı": "i",
+    "ĸ": "k", "ŀ": "l", "Ŀ": "L", "ŧ": "t", "Ŧ": "T", "ƀ": "b", "ƚ": "l", "ɍ": "r", "Ɍ": "R",
+}
+# typografia wstawiana przez edytory i modele językowe, poza GSM-7
+_PUNCTUATION = {
+    "‘": "'", "’": "'", "‚": "'", "“": '"', "”": '"', "„": '"',
+    "–": "-", "—": "-", "…": "...", " ": " ", "«": '"', "»": '"',
+}
+
+
+def _build_table() -> tuple[str, ...]:
+    """
+    Translate table indexed by code point. A tuple lookup is several times faster than
+    the dict from str.maketrans; characters past its end raise IndexError, which
+    str.translate treats as "leave unchanged".
+    """
+    replacements = {}
+    for codepoint in range(0x00C0, 0x0250):
+        char = chr(codepoint)
+        base = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+        if base != char and base.isascii() and base.isalpha():
+            replacements[char] = base
+    replacements.update(_SPECIAL_LETTERS)
+    replacements.update(_PUNCTUATION)
+    table = [chr(codepoint) for codepoint in range(max(map(ord, replacements)) + 1)]
+    for char, replacement in replacements.items():
+        table[ord(char)] = replacement
+    return tuple(table)
+
+
+DIACRITICS_TABLE = _build_table()
+
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# znaki z tablicy rozszerzeń kosztują 2 septety (ESC + znak)
+GSM7_EXTENSION = frozenset("^{}\\[~]|€\f")
+GSM7_CHARS = GSM7_BASIC | GSM7_EXTENSION
+
+GSM7_SINGLE_SEGMENT = 160
+GSM7_CONCAT_SEGMENT = 153
+UCS2_SINGLE_SEGMENT = 70
+UCS2_CONCAT_SEGMENT = 67
+
+
+def strip_diacritics(text: str) -> str:
+    if text.isascii():
+        return text
+    text = text.translate(DIACRITICS_TABLE)
+    if text.isascii():
+        return text
+    # pozostałe pisma (np. wietnamski) - wolniejsza ścieżka
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def fold_search_key(text: str) -> str:
+    """
+    Python counterpart of SQL `public.search_fold` (lower + unaccent) from migrations/001_client_search.sql.
+    """
+    return strip_diacritics(text).lower()
+
+
+def is_gsm7(text: str) -> bool:
+    return not set(text) - GSM7_CHARS
+
+
+def sms_info(text: str) -> dict:
+    """
+    How SMSAPI bills the text: encoding, length (septets for GSM-7, UTF-16 code units
+    for unicode) and number of segments.
+    """
+    if is_gsm7(text):
+        length = len(text) + sum(text.count(char) for char in GSM7_EXTENSION)
+        encoding, single, concat = "gsm7", GSM7_SINGLE_SEGMENT, GSM7_CONCAT_SEGMENT
+    else:
+        length = len(text.encode("utf-16-le")) // 2
+        encoding, single, concat = "ucs2", UCS2_SINGLE_SEGMENT, UCS2_CONCAT_SEGMENT
+    return {"encoding": encoding, "length": length,
+            "segments": 1 if length <= single else math.ceil(length / concat)}
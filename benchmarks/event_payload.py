@@ -0,0 +1,79 @@
+"""
+Calendar payload benchmark: raw Google event resources vs. shaped events (services/event_shape.py).
+
+Builds synthetic events shaped like real `events().list` items and reports JSON
+size and serialization time for every verbosity level. No network access needed.
+
+    python benchmarks/event_payload.py --events 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from services.event_shape import VERBOSITY_LEVELS, shape_event  # noqa: E402
+
+
+def raw_event(i: int) -> dict:
+    start = datetime(2025, 9, 1, 8) + timedelta(hours=3 * i)
+    return {
+        "kind": "calendar#event",
+        "etag": f"\"33{i:015d}\"",
+        "id": f"evt{i:08d}abcdefghijklmnop",
+        "status": "confirmed",
+        "htmlLink": f"https://www.google.com/calendar/event?eid=ZXZ0{i:08d}YWJjZGVmZ2hpamtsbW5vcCBzZXJ2aWNl",
+        "created": "2025-08-20T09:12:44.000Z",
+        "updated": "2025-08-21T11:02:13.532Z",
+        "summary": f"Wizyta serwisowa - Jan Kowalski {i}",
+        "description": "wizyta serwisowa, adres instalacji: ul. Słoneczna 12, 43-100 Skoczów",
+        "location": "ul. Słoneczna 12, 43-100 Skoczów",
+        "creator": {"email": "biuro@example.com"},
+        "organizer": {"email": "c_1234567890abcdef@group.calendar.google.com",
+                      "displayName": "Serwis", "self": True},
+        "start": {"dateTime": start.isoformat() + "+02:00", "timeZone": "Europe/Warsaw"},
+        "end": {"dateTime": (start + timedelta(hours=2)).isoformat() + "+02:00", "timeZone": "Europe/Warsaw"},
+        "iCalUID": f"evt{i:08d}abcdefghijklmnop@google.com",
+        "sequence": 0,
+        "attendees": [
+            {"email": "technik@example.com", "responseStatus": "accepted"},
+            {"email": "klient@example.com", "responseStatus": "needsAction"},
+        ],
+        "conferenceData": {
+            "entryPoints": [{"entryPointType": "video", "uri": "https://meet.google.com/abc-defg-hij",
+                             "label": "meet.google.com/abc-defg-hij"}],
+            "conferenceSolution": {"key": {"type": "hangoutsMeet"}, "name": "Google Meet",
+                                   "iconUri": "https://fonts.gstatic.com/s/i/productlogos/meet_2020q4/v6/web-512dp/logo_meet_2020q4_color_2x_web_512dp.png"},
+            "conferenceId": "abc-defg-hij",
+        },
+        "reminders": {"useDefault": False},
+        "eventType": "default",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    events = [raw_event(i) for i in range(args.events)]
+    raw_bytes = len(json.dumps(events, ensure_ascii=False).encode())
+
+    print(f"{'verbosity':<10} {'bytes':>10} {'reduction':>10} {'shape+dump ms':>14}")
+    for verbosity in ("raw", *VERBOSITY_LEVELS):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            shaped = events if verbosity == "raw" else [
+                shape_event(event, verbosity, calendar="service_calendar") for event in events
+            ]
+            payload = json.dumps(shaped, ensure_ascii=False).encode()
+        elapsed = (time.perf_counter() - started) * 1000 / args.repeat
+        print(f"{verbosity:<10} {len(payload):>10} {1 - len(payload) / raw_bytes:>9.0%} {elapsed:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Technician route planning benchmark (app/services/routing.py): nearest insertion
++ 2-opt over a day of visits with time windows, and the cheapest slot for every
+candidate visit, compared with visiting stops in the order they were booked.
+
+Points come from the stub geocoder, no network access needed.
+
+    python benchmarks/route_planning.py --stops 40
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from services.geocoding import StubGeocoder  # noqa: E402
+from services.routing import RoutePlanner, Stop, travel_matrix  # noqa: E402
+
+DAY_START, DAY_END = 7 * 60, 21 * 60
+
+
+def make_day(stops: int, radius_km: float, seed: int) -> tuple[list, list[Stop]]:
+    rng = random.Random(seed)
+    geocoder = StubGeocoder(radius_km=radius_km)
+    points = [geocoder.geocode("depot")] + [geocoder.geocode(f"ul. Testowa {i}, 43-100 Skoczów")
+                                           for i in range(stops)]
+    day = []
+    for i in range(stops):
+        # połowa wizyt z oknem "rano" / "po południu", reszta w dowolnej porze dnia
+        earliest, latest = rng.choice([(DAY_START, DAY_END - 30), (DAY_START, 12 * 60), (12 * 60, DAY_END - 30)])
+        day.append(Stop(f"stop:{i}", i + 1, rng.choice([10, 15, 20]), earliest, latest))
+    return points, day
+
+
+def timed(function, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - started) * 1e3 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stops", type=int, default=40, help="visits in the day")
+    parser.add_argument("--radius-km", type=float, default=15, help="visits spread around the depot")
+    parser.add_argument("--speed-kmh", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    points, day = make_day(args.stops, args.radius_km, args.seed)
+    matrix, matrix_ms = timed(lambda: travel_matrix(points, args.speed_kmh, 1.3), args.repeat)
+    planner = RoutePlanner(matrix, day_start=DAY_START)
+
+    booked = planner.schedule(day)
+    (route, unassigned), insertion_ms = timed(lambda: planner.nearest_insertion([], day), args.repeat)
+    improved, two_opt_ms = timed(lambda: planner.two_opt(route), args.repeat)
+    planned = planner.schedule(improved)
+
+    # nowa wizyta do wstawienia w gotowy plan dnia
+    candidate = Stop("candidate", len(points), 30, DAY_START, DAY_END - 30)
+    matrix = travel_matrix(points + [StubGeocoder(radius_km=args.radius_km).geocode("candidate")], args.speed_kmh, 1.3)
+    planner = RoutePlanner(matrix, day_start=DAY_START, allowed_lateness=planned.lateness)
+    slot, slot_ms = timed(lambda: planner.cheapest_insertion(improved, candidate), args.repeat)
+
+    print(f"{args.stops} stops, {len(unassigned)} not placed")
+    print(f"{'step':<22} {'ms':>8}")
+    for name, ms in [("travel matrix", matrix_ms), ("nearest insertion", insertion_ms),
+                     ("2-opt", two_opt_ms), ("cheapest slot", slot_ms)]:
+        print(f"{name:<22} {ms:>8.2f}")
+    print(f"travel minutes: booked order {booked.travel:.0f} (late {booked.lateness:.0f}), "
+          f"planned {planned.travel:.0f} (late {planned.lateness:.0f})")
+    print(f"candidate slot: {slot}")
+
+
+if __name__ == "__main__":
+    main()
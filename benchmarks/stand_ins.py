@@ -0,0 +1,268 @@
+"""
+Local stand-ins for external services used by benchmarks/load_test.py.
+
+- MockCalendar - the parts of Calendar API v3 the server uses: events list
+  (with sync tokens), get, insert, freeBusy and batch requests.
+- MockSMSAPI - accepts `sms.do` requests and counts recipients.
+- SMTPSink - aiosmtpd server accepting and counting every message.
+
+Every stand-in can add a fixed latency per request to imitate the real service.
+"""
+import asyncio
+import email.parser
+import itertools
+import json
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+import uvicorn
+
+CALENDARS = {
+    "service_calendar": "service@bench.local",
+    "formalities_calendar": "formalities@bench.local",
+    "product_meeting_calendar": "product@bench.local",
+}
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _event_start(event: dict) -> datetime:
+    return _parse_time(event["start"]["dateTime"])
+
+
+def _event_end(event: dict) -> datetime:
+    return _parse_time(event["end"]["dateTime"])
+
+
+def seed_events(calendar_id: str, days: int = 60, per_day: int = 4) -> dict[str, dict]:
+    """
+    Synthetic working-hours events from a week ago for `days` days.
+    Ids are predictable (`<calendar prefix>0000`, ...) so get requests can target them.
+    """
+    prefix = calendar_id.split("@")[0][:4]
+    first_day = datetime.now(timezone.utc).replace(hour=6, minute=0, second=0, microsecond=0) - timedelta(days=7)
+    events = {}
+    counter = itertools.count()
+    for day in range(days):
+        for slot in range(per_day):
+            start = first_day + timedelta(days=day, hours=2 * slot)
+            event_id = f"{prefix}{next(counter):04d}"
+            events[event_id] = {
+                "id": event_id,
+                "status": "confirmed",
+                "summary": f"Wizyta serwisowa {event_id}",
+                "description": "przegląd instalacji",
+                "location": "ul. Słoneczna 12, 43-100 Skoczów",
+                "start": {"dateTime": start.isoformat(), "timeZone": "Europe/Warsaw"},
+                "end": {"dateTime": (start + timedelta(hours=1, minutes=30)).isoformat(), "timeZone": "Europe/Warsaw"},
+                "attendees": [{"email": "technik@example.com", "responseStatus": "accepted"}],
+            }
+    return events
+
+
+class _Stub:
+    """
+    Starlette app served by uvicorn on a background thread with its own event loop.
+    """
+
+    def __init__(self, routes: list[Route], port: int, latency: float = 0.0):
+        self.port = port
+        self.latency = latency
+        self.requests = Counter()
+        self._server = uvicorn.Server(uvicorn.Config(Starlette(routes=routes), host="127.0.0.1", port=port,
+                                                     log_level="warning", lifespan="off"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _delay(self, name: str):
+        self.requests[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def start(self):
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"{type(self).__name__} failed to start on port {self.port}")
+            threading.Event().wait(0.05)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+class MockCalendar(_Stub):
+    def __init__(self, port: int, latency: float = 0.0, events_per_day: int = 4):
+        self._lock = threading.Lock()
+        self.events = {calendar_id: seed_events(calendar_id, per_day=events_per_day)
+                       for calendar_id in CALENDARS.values()}
+        self._changes: dict[str, list[dict]] = {calendar_id: [] for calendar_id in CALENDARS.values()}
+        base = "/calendar/v3"
+        super().__init__([
+            Route(f"{base}/calendars/{{calendar_id}}/events", self.list_or_insert, methods=["GET", "POST"]),
+            Route(f"{base}/calendars/{{calendar_id}}/events/{{event_id}}", self.get_event, methods=["GET"]),
+            Route(f"{base}/freeBusy", self.free_busy, methods=["POST"]),
+            Route("/batch/calendar/v3", self.batch, methods=["POST"]),
+        ], port, latency)
+
+    def event_ids(self, calendar: str) -> list[str]:
+        return list(self.events[CALENDARS[calendar]])
+
+    # --- operations shared by plain and batch requests ---
+
+    def _list(self, calendar_id: str, query: dict) -> tuple[int, dict]:
+        events = self.events.get(calendar_id)
+        if events is None:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        sync_token = query.get("syncToken")
+        with self._lock:
+            if sync_token is not None:
+                # token is the number of changes already seen by the client
+                seen = int(sync_token)
+                items = self._changes[calendar_id][seen:]
+            else:
+                time_min = _parse_time(query["timeMin"]) if "timeMin" in query else None
+                time_max = _parse_time(query["timeMax"]) if "timeMax" in query else None
+                items = [event for event in events.values()
+                         if (time_min is None or _event_end(event) > time_min)
+                         and (time_max is None or _event_start(event) < time_max)]
+                items.sort(key=_event_start)
+            next_token = str(len(self._changes[calendar_id]))
+        return 200, {"items": items, "nextSyncToken": next_token}
+
+    def _insert(self, calendar_id: str, body: dict) -> tuple[int, dict]:
+        events = self.events.get(calendar_id)
+        if events is None:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        event = {"status": "confirmed", **body, "id": body.get("id") or uuid.uuid4().hex}
+        with self._lock:
+            if event["id"] in events:
+                return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+            events[event["id"]] = event
+            self._changes[calendar_id].append(event)
+        return 200, event
+
+    # --- routes ---
+
+    async def list_or_insert(self, request: Request) -> Response:
+        calendar_id = request.path_params["calendar_id"]
+        if request.method == "POST":
+            await self._delay("events.insert")
+            status, payload = self._insert(calendar_id, await request.json())
+        else:
+            await self._delay("events.list")
+            status, payload = self._list(calendar_id, dict(request.query_params))
+        return JSONResponse(payload, status_code=status)
+
+    async def get_event(self, request: Request) -> Response:
+        await self._delay("events.get")
+        event = self.events.get(request.path_params["calendar_id"], {}).get(request.path_params["event_id"])
+        if event is None:
+            return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+        return JSONResponse(event)
+
+    async def free_busy(self, request: Request) -> Response:
+        await self._delay("freeBusy")
+        body = await request.json()
+        time_min, time_max = _parse_time(body["timeMin"]), _parse_time(body["timeMax"])
+        calendars = {}
+        for item in body.get("items", []):
+            events = self.events.get(item["id"], {})
+            calendars[item["id"]] = {"busy": [
+                {"start": event["start"]["dateTime"], "end": event["end"]["dateTime"]}
+                for event in sorted(events.values(), key=_event_start)
+                if _event_end(event) > time_min and _event_start(event) < time_max
+            ]}
+        return JSONResponse({"kind": "calendar#freeBusy", "calendars": calendars})
+
+    async def batch(self, request: Request) -> Response:
+        """
+        multipart/mixed batch of events.insert requests, as sent by BatchHttpRequest.
+        """
+        await self._delay("batch")
+        header = f"Content-Type: {request.headers['content-type']}\r\n\r\n".encode()
+        message = email.parser.BytesParser().parsebytes(header + await request.body())
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for part in message.get_payload():
+            request_line, _, rest = part.get_payload().partition("\n")
+            _, _, body = rest.replace("\r\n", "\n").partition("\n\n")
+            method, target, _ = request_line.split(" ", 2)
+            path = urlsplit(target).path
+            calendar_id = path.split("/calendars/", 1)[1].split("/", 1)[0]
+            if method == "POST":
+                status, payload = self._insert(calendar_id, json.loads(body))
+            else:
+                status, payload = self._list(calendar_id, {k: v[0] for k, v in parse_qs(urlsplit(target).query).items()})
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return Response("".join(parts), media_type=f"multipart/mixed; boundary={boundary}")
+
+
+class MockSMSAPI(_Stub):
+    def __init__(self, port: int, latency: float = 0.0):
+        self.recipients = 0
+        super().__init__([Route("/sms.do", self.send, methods=["POST"])], port, latency)
+
+    async def send(self, request: Request) -> Response:
+        await self._delay("sms.do")
+        payload = await request.json()
+        numbers = [number for number in str(payload.get("to", "")).split(",") if number]
+        self.recipients += len(numbers)
+        return JSONResponse({
+            "count": len(numbers),
+            "list": [{"id": uuid.uuid4().hex, "points": 0.16, "number": number, "status": "QUEUE"}
+                     for number in numbers],
+        })
+
+
+class SMTPSink:
+    """
+    aiosmtpd server accepting any login and any message.
+    """
+
+    def __init__(self, port: int, latency: float = 0.0):
+        try:
+            from aiosmtpd.controller import Controller
+            from aiosmtpd.smtp import AuthResult
+        except ImportError:
+            raise SystemExit("SMTP stand-in requires aiosmtpd: pip install aiosmtpd")
+        self.port = port
+        self.latency = latency
+        self.messages = 0
+        self.recipients = 0
+        self._controller = Controller(self, hostname="127.0.0.1", port=port,
+                                      auth_require_tls=False,
+                                      authenticator=lambda *args: AuthResult(success=True))
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.messages += 1
+        self.recipients += len(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+    def start(self):
+        self._controller.start()
+        return self
+
+    def stop(self):
+        self._controller.stop()
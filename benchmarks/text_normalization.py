@@ -0,0 +1,71 @@
+"""
+Diacritics stripping benchmark: previous NFKD + per-character generator vs.
+precomputed translate table (app/text_normalization.py).
+
+Runs on synthetic SMS texts and client names, no network access needed.
+
+    python benchmarks/text_normalization.py
+"""
+import argparse
+import os
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from text_normalization import fold_search_key, sms_info, strip_diacritics  # noqa: E402
+
+SMS_TEXTS = [
+    "Dzień dobry, przypominamy o jutrzejszej wizycie serwisowej w godz. 8:00-10:00. "
+    "Prosimy o zapewnienie dostępu do kotłowni. Pozdrawiamy, zespół serwisu.",
+    "Zażółć gęślą jaźń - Łódź, ul. Źródlana 5",
+    "Your technician is on the way, ETA 15 minutes.",
+]
+NAMES = ["Łukasz Kowalski", "Małgorzata Wiśniewska", "Józef Wójcik", "Żaneta Żółtowska", "Tomasz Mazur",
+         "Jarosław Dąbrowski", "Bożena Kozłowska", "Grzegorz Król", "Agnieszka Pawłowska", "Wojciech Nowak"]
+
+
+def nfkd_strip(text: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(c)
+    )
+
+
+def nfkd_fold(text: str) -> str:
+    return nfkd_strip(text).lower()
+
+
+def timed(function, texts: list[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - started) * 1e6 / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000, help="passes over every input list")
+    args = parser.parse_args()
+
+    cases = [
+        ("sms", SMS_TEXTS, nfkd_strip, strip_diacritics),
+        ("names", NAMES, nfkd_fold, fold_search_key),
+    ]
+    print(f"{'input':<8} {'nfkd loop us':>13} {'translate us':>13} {'speedup':>8}")
+    for name, texts, old, new in cases:
+        old_us = timed(old, texts, args.repeat)
+        new_us = timed(new, texts, args.repeat)
+        print(f"{name:<8} {old_us:>13.3f} {new_us:>13.3f} {old_us / new_us:>7.1f}x")
+
+    # NFKD nie rozkłada "ł" - po starej metodzie SMS wychodzi jako unicode (70 znaków na segment)
+    for text in SMS_TEXTS[:2]:
+        old, new = sms_info(nfkd_strip(text)), sms_info(strip_diacritics(text))
+        print(f"{text[:30]!r:<34} nfkd: {old['encoding']} {old['segments']} segment(s), "
+              f"translate: {new['encoding']} {new['segments']} segment(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+-- Indexed, accent-insensitive client search (used by db_service.get_client_details).
+-- Run once as a privileged user; the read-only API user only needs SELECT on clients.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() itself is only STABLE, wrapping it with explicit dictionary makes it usable
+-- in generated columns and indexes
+CREATE OR REPLACE FUNCTION public.search_fold(value text)
+RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, value))
+$$;
+
+ALTER TABLE clients
+    ADD COLUMN IF NOT EXISTS search_key text
+    GENERATED ALWAYS AS (public.search_fold(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))) STORED;
+
+-- GiST supports ordering by trigram distance (<->), so top-N ranked lookups
+-- are served straight from the index
+CREATE INDEX IF NOT EXISTS clients_search_key_trgm_idx
+    ON clients USING gist (search_key gist_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS clients_search_key_idx
+    ON clients (search_key);
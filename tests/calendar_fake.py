@@ -0,0 +1,121 @@
+"""
+In-memory stand-in for the Calendar API client (service.events().list/instances),
+enough for full and incremental sync and range listing.
+"""
+# adnotacje jako tekst - metoda `list` przesłania typ wbudowany w ciele klasy
+from __future__ import annotations
+
+from datetime import datetime
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+def _time(value: dict) -> str:
+    return value.get("dateTime") or value["date"]
+
+
+class _Request:
+    def __init__(self, execute):
+        self.execute = execute
+
+
+class _Batch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests: list[tuple[str, _Request]] = []
+
+    def add(self, request: _Request, request_id: str):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+
+class FakeCalendarService:
+    def __init__(self, events: list[dict] | None = None, page_size: int = 100):
+        self.events_by_id = {event["id"]: event for event in events or []}
+        self.instances_by_series: dict[str, list[dict]] = {}
+        self.page_size = page_size
+        # zmiany po każdym wydanym tokenie: token n widzi changes[n:]
+        self.changes: list[dict] = []
+        self.expired_tokens: set[str] = set()
+        self.calls: list[tuple[str, dict]] = []
+
+    # --- test helpers ---
+
+    def change(self, event: dict):
+        if event.get("status") == "cancelled":
+            self.events_by_id.pop(event["id"], None)
+        else:
+            self.events_by_id[event["id"]] = event
+        self.changes.append(event)
+
+    def expire_sync_tokens(self):
+        self.expired_tokens.update(str(index) for index in range(len(self.changes) + 1))
+
+    def calls_of(self, method: str) -> list[dict]:
+        return [kwargs for name, kwargs in self.calls if name == method]
+
+    # --- API ---
+
+    def events(self):
+        return self
+
+    def list(self, calendarId, singleEvents=False, pageToken=None, syncToken=None,
+             timeMin=None, timeMax=None, **kwargs):
+        self.calls.append(("list", {"syncToken": syncToken, "timeMin": timeMin, "timeMax": timeMax,
+                                    "pageToken": pageToken}))
+
+        def execute():
+            if syncToken is not None:
+                if syncToken in self.expired_tokens:
+                    raise HttpError(httplib2.Response({"status": 410}), b'{"error": "fullSyncRequired"}')
+                items = self.changes[int(syncToken):]
+            else:
+                items = [event for event in self.events_by_id.values() if self._in_range(event, timeMin, timeMax)]
+            return self._page(items, pageToken, sync=timeMax is None)
+        return _Request(execute)
+
+    def instances(self, calendarId, eventId, timeMin=None, timeMax=None, pageToken=None, **kwargs):
+        self.calls.append(("instances", {"eventId": eventId, "timeMin": timeMin, "timeMax": timeMax}))
+        return _Request(lambda: self._page(self.instances_by_series.get(eventId, []), pageToken, sync=False))
+
+    def insert(self, calendarId, body, **kwargs):
+        self.calls.append(("insert", {"id": body.get("id")}))
+
+        def execute():
+            if body.get("id") in self.events_by_id:
+                raise HttpError(httplib2.Response({"status": 409}), b'{"error": "duplicate"}')
+            event = {"status": "confirmed", **body}
+            self.change(event)
+            return event
+        return _Request(execute)
+
+    def new_batch_http_request(self, callback):
+        return _Batch(callback)
+
+    def _page(self, items: list[dict], page_token: str | None, sync: bool) -> dict:
+        offset = int(page_token or 0)
+        page = {"items": items[offset:offset + self.page_size]}
+        if offset + self.page_size < len(items):
+            page["nextPageToken"] = str(offset + self.page_size)
+        elif sync:
+            page["nextSyncToken"] = str(len(self.changes))
+        return page
+
+    @staticmethod
+    def _in_range(event: dict, time_min: str | None, time_max: str | None) -> bool:
+        if event.get("recurrence"):
+            # Google zwraca serię, jeśli którekolwiek jej wystąpienie wypada w zakresie - tu zawsze
+            return True
+        start = datetime.fromisoformat(_time(event["start"]).replace("Z", "+00:00"))
+        end = datetime.fromisoformat(_time(event["end"]).replace("Z", "+00:00"))
+        if start.tzinfo is None:
+            return True
+        return ((time_max is None or start < datetime.fromisoformat(time_max))
+                and (time_min is None or end > datetime.fromisoformat(time_min)))
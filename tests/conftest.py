@@ -0,0 +1,7 @@
+import os
+import sys
+
+# testy nie mają dostępu do sieci; w produkcji dostawca musi być ustawiony jawnie
+os.environ.setdefault("GEOCODER_PROVIDER", "stub")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from services.db_pool import ConnectionPool, PoolTimeout, _PooledConnection
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    info = FakeInfo()
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        pass
+
+
+class FakePool(ConnectionPool):
+    """
+    Pool handing out fake connections - only pool bookkeeping is under test.
+    """
+
+    def _connect(self):
+        with self._lock:
+            self._created += 1
+        return _PooledConnection(FakeConnection())
+
+
+def pool(max_size: int, timeout: float = 2) -> FakePool:
+    return FakePool(min_size=0, max_size=max_size, timeout=timeout, max_lifetime=1800, max_idle=60)
+
+
+def acquire_in_background(pool: ConnectionPool) -> tuple[threading.Thread, list]:
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(pool.getconn()), daemon=True)
+    thread.start()
+    # wątek czeka w kolejce puli
+    deadline = time.monotonic() + 2
+    while not pool.stats()["waiting"] and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return thread, acquired
+
+
+def test_waiter_times_out_when_pool_exhausted():
+    connections = pool(max_size=1, timeout=0.05)
+    connections.getconn()
+
+    with pytest.raises(PoolTimeout):
+        connections.getconn()
+    assert connections.stats()["timeouts_total"] == 1
+
+
+def test_growing_pool_wakes_waiters():
+    connections = pool(max_size=1)
+    connections.getconn()
+    thread, acquired = acquire_in_background(connections)
+
+    connections.resize(0, 2)
+    thread.join(timeout=1)
+
+    assert len(acquired) == 1
+    stats = connections.stats()
+    assert (stats["size"], stats["in_use"], stats["waiting"]) == (2, 2, 0)
+
+
+def test_shrinking_below_in_use_closes_connections_on_return():
+    connections = pool(max_size=3)
+    held = [connections.getconn() for _ in range(3)]
+
+    connections.resize(0, 1)
+    connections.putconn(held[0])
+    connections.putconn(held[1])
+
+    assert held[0].closed and held[1].closed
+    assert connections.stats()["size"] == 1
+    connections.putconn(held[2])
+    assert not held[2].closed
+    assert connections.stats()["idle"] == 1
+
+
+def test_waiter_is_not_given_a_slot_over_the_new_limit():
+    connections = pool(max_size=2)
+    held = [connections.getconn() for _ in range(2)]
+    thread, acquired = acquire_in_background(connections)
+
+    connections.resize(0, 1)
+    held[0].close()
+    connections.putconn(held[0])
+    assert acquired == [] and connections.stats()["size"] == 1
+
+    connections.putconn(held[1])
+    thread.join(timeout=1)
+    assert acquired == [held[1]]
+
+
+def test_stats_of_drained_pool():
+    connections = pool(max_size=1)
+    connections.putconn(connections.getconn())
+
+    connections.resize(0, 0)
+
+    stats = connections.stats()
+    assert (stats["size"], stats["max_size"], stats["utilization"]) == (0, 0, 0.0)
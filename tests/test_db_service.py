@@ -0,0 +1,63 @@
+"""
+Runs against a disposable Postgres database given by TEST_DATABASE_URL; the
+tables are created in schema `mcp_test`, which is dropped first.
+"""
+import os
+
+import psycopg2
+import pytest
+from psycopg2 import sql
+
+from services import db_service
+from services.db_pool import ConnectionPool
+from services.db_queries import PreparingConnection, QueryRegistry
+
+DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    with psycopg2.connect(DSN) as conn, conn.cursor() as cur:
+        cur.execute("""
+            DROP SCHEMA IF EXISTS mcp_test CASCADE;
+            CREATE SCHEMA mcp_test;
+            CREATE TABLE mcp_test.clients (id int PRIMARY KEY, name text);
+            CREATE TABLE mcp_test.objects (id int PRIMARY KEY, client_id int, address text, device text);
+            INSERT INTO mcp_test.clients VALUES (1, 'Jan'), (2, 'Anna');
+            INSERT INTO mcp_test.objects SELECT i, 1 + i % 2, 'ul. Testowa ' || i, 'pompa' FROM generate_series(1, 9) i;
+        """)
+    pool = ConnectionPool(0, 2, 5, 1800, 60, dsn=DSN, options="-c search_path=mcp_test",
+                          connection_factory=PreparingConnection)
+    monkeypatch.setattr(db_service, "connection_pool", pool)
+    monkeypatch.setattr(db_service, "queries", QueryRegistry(prepare=True))
+    yield pool
+    pool.close_all()
+
+
+def nested_installations(pool, columns, limit):
+    query = sql.SQL("SELECT c.id{installations} FROM clients c ORDER BY c.id").format(
+        installations=db_service._installations_column(columns))
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute(query, {"installations_limit": limit})
+        return dict(cur.fetchall())
+
+
+def test_nested_installations_follow_configured_columns_and_limit(pool):
+    installations = nested_installations(pool, ("address", "id"), limit=2)
+
+    assert installations[1] == [{"address": "ul. Testowa 2", "id": 2}, {"address": "ul. Testowa 4", "id": 4}]
+    assert [row["id"] for row in installations[2]] == [1, 3]
+    assert set(nested_installations(pool, None, limit=1)[1][0]) == {"id", "client_id", "address", "device"}
+
+
+def test_installation_pages_without_key_in_projection(pool, monkeypatch):
+    monkeypatch.setattr(db_service, "INSTALLATION_COLUMNS", ["address", "device"])
+
+    first = db_service.get_installation_details(1, limit=3)
+    second = db_service.get_installation_details(1, limit=3, cursor=first["next_cursor"])
+
+    assert [item["address"] for item in first["items"] + second["items"]] == \
+        [f"ul. Testowa {i}" for i in (2, 4, 6, 8)]
+    assert all(set(item) == {"address", "device"} for item in first["items"])
+    assert first["has_more"] and not second["has_more"]
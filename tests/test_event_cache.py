@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from calendar_fake import FakeCalendarService
+from commands.models import EventParams
+from services import event_cache as event_cache_module
+from services import google_service
+from services.event_cache import EventCache, EventStore
+
+CALENDAR = "service@group.calendar.google.com"
+# zdarzenia względem chwili obecnej - pełna synchronizacja sięga EVENT_CACHE_LOOKBACK_DAYS wstecz
+NOW = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def event(event_id: str, hours_from_now: float, hours: float = 1, **fields) -> dict:
+    start = NOW + timedelta(hours=hours_from_now)
+    return {"id": event_id, "status": "confirmed", "summary": event_id,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + timedelta(hours=hours)).isoformat()}, **fields}
+
+
+def ids(events: list[dict]) -> list[str]:
+    return [event["id"] for event in events]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # każde zapytanie synchronizuje zmiany, jak po upływie EVENT_CACHE_REFRESH_SECONDS
+    monkeypatch.setattr(event_cache_module, "EVENT_CACHE_REFRESH_SECONDS", 0)
+    service = FakeCalendarService([event("a", 1), event("b", 5), event("c", 48)], page_size=2)
+    store = EventStore(CALENDAR, lambda: service)
+    store.service = service
+    return store
+
+
+def test_full_sync_follows_pages_and_stores_sync_token(store):
+    events = store.query(NOW, NOW + timedelta(days=7))
+
+    assert ids(events) == ["a", "b", "c"]
+    full_sync = store.service.calls_of("list")
+    assert [call["pageToken"] for call in full_sync] == [None, "2"]
+    assert full_sync[0]["timeMin"] is not None and full_sync[0]["syncToken"] is None
+    assert store.covers(NOW)
+
+
+def test_query_returns_events_overlapping_range_in_order(store):
+    store.service.change(event("long", -2, hours=4))
+
+    assert ids(store.query(NOW, NOW + timedelta(hours=2))) == ["long", "a"]
+    assert ids(store.query(NOW + timedelta(hours=2), NOW + timedelta(hours=5))) == []
+    assert ids(store.query(NOW + timedelta(hours=5), NOW + timedelta(days=3))) == ["b", "c"]
+    # koniec zakresu jest otwarty
+    assert ids(store.query(NOW + timedelta(hours=4), NOW + timedelta(hours=5))) == []
+
+
+def test_incremental_sync_applies_changes_with_sync_token(store):
+    store.query(NOW, NOW + timedelta(days=7))
+    store.service.change(event("d", 3))
+    store.service.change(event("b", 10, summary="moved"))
+    store.service.change({"id": "a", "status": "cancelled"})
+
+    events = store.query(NOW, NOW + timedelta(days=7))
+
+    assert ids(events) == ["d", "b", "c"]
+    assert events[1]["summary"] == "moved"
+    incremental = store.service.calls_of("list")[-1]
+    assert incremental["syncToken"] == "0" and incremental["timeMin"] is None
+
+
+def test_expired_sync_token_runs_full_sync(store):
+    store.query(NOW, NOW + timedelta(days=7))
+    store.service.change(event("d", 3))
+    store.service.expire_sync_tokens()
+
+    events = store.query(NOW, NOW + timedelta(days=7))
+
+    assert ids(events) == ["a", "d", "b", "c"]
+    calls = store.service.calls_of("list")
+    assert calls[-3]["syncToken"] == "0"
+    # ponowna pełna synchronizacja od pierwszej strony
+    assert calls[-2]["timeMin"] is not None and calls[-2]["pageToken"] is None
+
+
+def test_sync_is_skipped_within_refresh_interval(store, monkeypatch):
+    monkeypatch.setattr(event_cache_module, "EVENT_CACHE_REFRESH_SECONDS", 3600)
+    store.query(NOW, NOW + timedelta(days=7))
+    calls = len(store.service.calls)
+    store.service.change(event("d", 3))
+
+    assert "d" not in ids(store.query(NOW, NOW + timedelta(days=7)))
+    assert len(store.service.calls) == calls
+    store.refresh(force=True)
+    assert "d" in ids(store.query(NOW, NOW + timedelta(days=7)))
+
+
+def test_created_event_is_visible_before_next_sync(store, monkeypatch):
+    monkeypatch.setattr(event_cache_module, "EVENT_CACHE_REFRESH_SECONDS", 3600)
+    store.query(NOW, NOW + timedelta(days=7))
+
+    store.upsert(event("new", 2))
+
+    assert ids(store.query(NOW, NOW + timedelta(days=7))) == ["a", "new", "b", "c"]
+
+
+def test_cache_keeps_one_store_per_calendar():
+    cache = EventCache(service_factory=lambda: FakeCalendarService())
+
+    assert cache.store(CALENDAR) is cache.store(CALENDAR)
+    assert cache.store(CALENDAR) is not cache.store("other")
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    service = FakeCalendarService([event("a", 1)])
+    monkeypatch.setattr(google_service, "get_service", lambda: service)
+    monkeypatch.setattr(google_service, "get_calendar_id", lambda calendar: CALENDAR)
+    monkeypatch.setattr(google_service, "event_cache", EventCache(service_factory=lambda: service))
+    monkeypatch.setattr(google_service, "EVENT_CACHE_ENABLED", True)
+    return service
+
+
+def new_event(hours_from_now: float, summary: str) -> dict:
+    start = NOW + timedelta(hours=hours_from_now)
+    return {"calendar": "service_calendar", "summary": summary,
+            "start": {"dateTime": start.isoformat()}, "end": {"dateTime": (start + timedelta(hours=1)).isoformat()}}
+
+
+def test_batch_conflict_check_sees_events_booked_since_last_sync(calendar):
+    # zapytanie w interwale odświeżania - bez wymuszonej synchronizacji nowa rezerwacja byłaby niewidoczna
+    google_service.get_many_events(NOW, NOW + timedelta(days=1), calendar="service_calendar")
+    calendar.change(event("booked_elsewhere", 3))
+
+    results = google_service.create_calendar_events([new_event(3, "clash"), new_event(6, "free")])
+
+    assert [result["status"] for result in results] == ["conflict", "created"]
+    assert results[0]["conflicts_with"] == ["booked_elsewhere"]
+
+
+def test_all_day_event_params_are_created_with_dates(calendar):
+    day = (NOW + timedelta(days=3)).date()
+    params = EventParams(calendar="service_calendar", summary="Urlop",
+                         start={"date": day.isoformat()}, end={"date": (day + timedelta(days=1)).isoformat()})
+
+    results = google_service.create_calendar_events([params.to_event_data()])
+
+    assert [result["status"] for result in results] == ["created"]
+    created = calendar.events_by_id[results[0]["event_id"]]
+    assert created["start"] == {"date": day.isoformat()}
+    assert created["end"] == {"date": (day + timedelta(days=1)).isoformat()}
+
+
+@pytest.mark.parametrize("start, end", [
+    ({"date": "2026-03-02", "dateTime": "2026-03-02T10:00:00"}, {"date": "2026-03-03"}),
+    ({"date": "2026-03-02"}, {"dateTime": "2026-03-02T12:00:00"}),
+    ({}, {"date": "2026-03-03"}),
+])
+def test_event_time_needs_exactly_one_form(start, end):
+    with pytest.raises(ValueError):
+        EventParams(calendar="service_calendar", summary="Urlop", start=start, end=end)
@@ -0,0 +1,27 @@
+import asyncio
+
+import main
+
+
+def test_outbox_workers_start_with_the_server(monkeypatch):
+    stopped = []
+
+    async def shutdown(timeout):
+        await main.outbox_worker.stop()
+        await main.notification_service.smtp_pool.close()
+        stopped.append(timeout)
+
+    monkeypatch.setattr(main, "start_warmups", lambda: [])
+    monkeypatch.setattr(main, "shutdown", shutdown)
+
+    async def serve():
+        async with main.sse_lifespan(None):
+            tasks = list(main.outbox_worker._tasks)
+            assert len(tasks) == main.outbox_worker.workers
+            assert not any(task.done() for task in tasks)
+        return tasks
+
+    tasks = asyncio.run(serve())
+
+    assert all(task.done() for task in tasks)
+    assert stopped == [main.SHUTDOWN_DRAIN_SECONDS]
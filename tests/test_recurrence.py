@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import pytest
+
+from calendar_fake import FakeCalendarService
+from services import google_service
+from services.event_cache import EventStore
+from services.time_engine import LOCAL_TZ, RecurrenceError, expand_events
+
+CALENDAR = "service@group.calendar.google.com"
+
+
+def at(day: str, hour: int = 0) -> datetime:
+    return datetime.fromisoformat(f"{day}T{hour:02d}:00").replace(tzinfo=LOCAL_TZ)
+
+
+def weekly(event_id="series", start="2026-03-02T09:00:00", end="2026-03-02T10:00:00", rules=("RRULE:FREQ=WEEKLY",)):
+    return {"id": event_id, "summary": "Przegląd", "status": "confirmed", "recurrence": list(rules),
+            "start": {"dateTime": start, "timeZone": "Europe/Warsaw"},
+            "end": {"dateTime": end, "timeZone": "Europe/Warsaw"}}
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    service = FakeCalendarService()
+    monkeypatch.setattr(google_service, "get_service", lambda: service)
+
+    def list_events(events, start, end):
+        service.events_by_id = {event["id"]: event for event in events}
+        return google_service._list_events(CALENDAR, start, end)
+
+    list_events.service = service
+    return list_events
+
+
+def starts(events):
+    return [event["start"].get("dateTime") or event["start"]["date"] for event in events]
+
+
+def test_weekly_series_is_expanded_within_range(calendar):
+    events = calendar([weekly()], at("2026-03-02"), at("2026-03-17"))
+
+    assert starts(events) == ["2026-03-02T09:00:00+01:00", "2026-03-09T09:00:00+01:00",
+                              "2026-03-16T09:00:00+01:00"]
+    assert events[1]["id"] == "series_20260309T080000Z"
+    assert events[1]["recurringEventId"] == "series"
+
+
+def test_exdate_skips_occurrence(calendar):
+    master = weekly(rules=("RRULE:FREQ=WEEKLY;COUNT=4", "EXDATE;TZID=Europe/Warsaw:20260309T090000"))
+
+    events = calendar([master], at("2026-03-01"), at("2026-04-01"))
+
+    assert starts(events) == ["2026-03-02T09:00:00+01:00", "2026-03-16T09:00:00+01:00",
+                              "2026-03-23T09:00:00+01:00"]
+
+
+def test_modified_and_cancelled_instances_replace_their_slots(calendar):
+    moved = {"id": "series_20260309T080000Z", "recurringEventId": "series", "status": "confirmed",
+             "summary": "Przegląd (przesunięty)",
+             "originalStartTime": {"dateTime": "2026-03-09T09:00:00+01:00"},
+             "start": {"dateTime": "2026-03-10T12:00:00+01:00"}, "end": {"dateTime": "2026-03-10T13:00:00+01:00"}}
+    cancelled = {"id": "series_20260316T080000Z", "recurringEventId": "series", "status": "cancelled",
+                 "originalStartTime": {"dateTime": "2026-03-16T09:00:00+01:00"},
+                 "start": {"dateTime": "2026-03-16T09:00:00+01:00"}, "end": {"dateTime": "2026-03-16T10:00:00+01:00"}}
+
+    events = calendar([weekly(), moved, cancelled], at("2026-03-02"), at("2026-03-24"))
+
+    assert starts(events) == ["2026-03-02T09:00:00+01:00", "2026-03-10T12:00:00+01:00",
+                              "2026-03-23T09:00:00+01:00"]
+    assert events[1]["summary"] == "Przegląd (przesunięty)"
+
+
+def test_all_day_series_keeps_dates(calendar):
+    master = {"id": "leave", "status": "confirmed", "recurrence": ["RRULE:FREQ=DAILY;UNTIL=20260305"],
+              "start": {"date": "2026-03-02"}, "end": {"date": "2026-03-03"}}
+
+    events = calendar([master], at("2026-03-03"), at("2026-03-10"))
+
+    assert starts(events) == ["2026-03-03", "2026-03-04", "2026-03-05"]
+    assert [event["end"]["date"] for event in events] == ["2026-03-04", "2026-03-05", "2026-03-06"]
+    assert events[0]["id"] == "leave_20260303"
+
+
+def test_wall_clock_time_survives_dst_change(calendar):
+    # zmiana czasu w Polsce: 29 marca 2026
+    events = calendar([weekly(start="2026-03-23T09:00:00", end="2026-03-23T10:00:00")],
+                      at("2026-03-23"), at("2026-04-07"))
+
+    assert starts(events) == ["2026-03-23T09:00:00+01:00", "2026-03-30T09:00:00+02:00",
+                              "2026-04-06T09:00:00+02:00"]
+    assert [event["id"] for event in events][1] == "series_20260330T070000Z"
+
+
+def test_unparseable_rule_falls_back_to_api_instances(calendar):
+    master = weekly(rules=("RRULE:FREQ=SOMETIMES",))
+    calendar.service.instances_by_series["series"] = [
+        {"id": "series_20260302T080000Z", "recurringEventId": "series", "status": "confirmed",
+         "start": {"dateTime": "2026-03-02T08:00:00Z"}, "end": {"dateTime": "2026-03-02T09:00:00Z"}},
+        {"id": "series_20260305T080000Z", "recurringEventId": "series", "status": "cancelled",
+         "start": {"dateTime": "2026-03-05T08:00:00Z"}, "end": {"dateTime": "2026-03-05T09:00:00Z"}},
+        {"id": "series_20260309T080000Z", "recurringEventId": "series", "status": "confirmed",
+         "start": {"dateTime": "2026-03-09T08:00:00Z"}, "end": {"dateTime": "2026-03-09T09:00:00Z"}},
+    ]
+
+    events = calendar([master], at("2026-03-01"), at("2026-03-15"))
+
+    assert starts(events) == ["2026-03-02T09:00:00+01:00", "2026-03-09T09:00:00+01:00"]
+    assert calendar.service.calls_of("instances")[0]["eventId"] == "series"
+
+
+def test_unparseable_rule_without_fallback_is_an_error():
+    with pytest.raises(RecurrenceError):
+        expand_events([weekly(rules=("RRULE:FREQ=SOMETIMES",))], at("2026-03-01"), at("2026-03-15"))
+
+
+def test_event_store_falls_back_to_api_instances():
+    service = FakeCalendarService([weekly(rules=("RRULE:FREQ=SOMETIMES",))])
+    service.instances_by_series["series"] = [
+        {"id": "series_20260302T080000Z", "recurringEventId": "series", "status": "confirmed",
+         "start": {"dateTime": "2026-03-02T08:00:00Z"}, "end": {"dateTime": "2026-03-02T09:00:00Z"}},
+    ]
+    store = EventStore(CALENDAR, lambda: service)
+
+    events = store.query(at("2026-03-01"), at("2026-03-08"))
+
+    assert starts(events) == ["2026-03-02T09:00:00+01:00"]
+    assert service.calls_of("instances")[0]["timeMin"] == at("2026-03-01").isoformat()
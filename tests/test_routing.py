@@ -0,0 +1,170 @@
+from datetime import date
+
+import httpx
+import pytest
+
+from commands import routing as routing_command
+from commands.models import RoutePlanParams
+from services import geocoding, google_service
+from services.geocoding import CachedGeocoder, Coordinates, StubGeocoder
+from services.routing import RoutePlanner, Stop, haversine_km, travel_matrix
+
+DAY = date(2026, 3, 2)
+OFFICE = Coordinates(49.7737, 18.8066)
+PLACES = {
+    google_service.DEFAULT_LOCATION: OFFICE,
+    "ul. Bielska 10, 43-100 Skoczów": Coordinates(49.80, 18.83),
+    "ul. Górecka 5, 43-430 Skoczów": Coordinates(49.75, 18.78),
+    "Plein 2A, 3861 AJ Nijkerk": Coordinates(52.22, 5.49),
+}
+
+
+def event(event_id, start, end, location):
+    return {"id": event_id, "summary": event_id, "location": location,
+            "start": f"2026-03-02T{start}:00+01:00", "end": f"2026-03-02T{end}:00+01:00"}
+
+
+@pytest.fixture
+def plan(monkeypatch, tmp_path):
+    events = []
+    geocoder = CachedGeocoder(StubGeocoder(PLACES, center=OFFICE), str(tmp_path / "geocode.sqlite3"))
+    monkeypatch.setattr(routing_command, "get_geocoder", lambda: geocoder)
+    monkeypatch.setattr(google_service, "get_many_events", lambda *args, **kwargs: events)
+
+    def run(day_events, **params):
+        events[:] = day_events
+        return routing_command.plan_technician_route(RoutePlanParams(day=DAY, **params))
+
+    yield run
+    geocoder.close()
+
+
+def test_depot_defaults_to_office(plan):
+    result = plan([event("a", "09:00", "10:00", "ul. Bielska 10, 43-100 Skoczów")])
+
+    assert result["data"]["depot"] == google_service.DEFAULT_LOCATION
+    assert result["data"]["geocoder"] == "stub"
+    assert [visit["event_id"] for visit in result["data"]["existing"]["visits"]] == ["a"]
+
+
+def test_depot_far_from_visits_is_rejected(plan):
+    result = plan([event("a", "09:00", "10:00", "ul. Bielska 10, 43-100 Skoczów")],
+                  depot="Plein 2A, 3861 AJ Nijkerk")
+
+    assert "error" in result
+    assert "km from the nearest visit" in result["error"]
+
+
+def planner_for(addresses, **kwargs):
+    geocoder = StubGeocoder(PLACES, center=OFFICE)
+    points = [OFFICE] + [geocoder.geocode(address) for address in addresses]
+    return RoutePlanner(travel_matrix(points, speed_kmh=50, detour_factor=1.3), day_start=480, **kwargs)
+
+
+def test_stub_geocoder_is_stable_and_close_to_center():
+    geocoder = StubGeocoder(center=OFFICE, radius_km=30)
+
+    point = geocoder.geocode("ul. Polna 1, 43-450 Ustroń")
+
+    assert point == geocoder.geocode("UL. POLNA 1,43-450 USTROŃ")
+    assert haversine_km(OFFICE, point) <= 30
+
+
+def test_schedule_waits_for_window_and_counts_lateness():
+    planner = planner_for(["ul. Bielska 10, 43-100 Skoczów", "ul. Górecka 5, 43-430 Skoczów"])
+    first = Stop("a", 1, 60, 600, 600)
+    second = Stop("b", 2, 60, 600, 600)
+
+    schedule = planner.schedule([first, second])
+
+    assert schedule.visits[0].start == 600
+    assert schedule.visits[1].start == pytest.approx(660 + planner.matrix[1][2])
+    assert schedule.lateness == pytest.approx(60 + planner.matrix[1][2])
+    assert not planner.feasible([first, second])
+
+
+def test_cheapest_insertion_respects_time_windows():
+    planner = planner_for(["ul. Bielska 10, 43-100 Skoczów", "ul. Górecka 5, 43-430 Skoczów"])
+    morning = Stop("morning", 1, 60, 480, 540)
+    afternoon = Stop("afternoon", 1, 60, 840, 840)
+
+    position, added = planner.cheapest_insertion([morning, afternoon], Stop("new", 2, 60, 480, 900))
+
+    assert position in (1, 2)
+    assert added > 0
+    # wizyta na cały dzień nie zmieści się nigdzie bez spóźnienia
+    assert planner.cheapest_insertion([morning, afternoon], Stop("long", 2, 600, 480, 480)) is None
+
+
+def test_nearest_insertion_and_two_opt_shorten_booking_order():
+    addresses = [f"ul. Testowa {number}, 43-100 Skoczów" for number in range(1, 13)]
+    planner = planner_for(addresses)
+    stops = [Stop(str(node), node, 30, 480, 1200) for node in range(1, len(addresses) + 1)]
+
+    route, unassigned = planner.nearest_insertion([], stops)
+    improved = planner.two_opt(route)
+
+    assert unassigned == []
+    assert sorted(stop.key for stop in improved) == sorted(stop.key for stop in stops)
+    assert planner.travel(improved) <= planner.travel(route) + 1e-6
+    assert planner.travel(improved) < planner.travel(stops)
+
+
+def test_plan_places_candidate_between_existing_visits(plan):
+    result = plan([event("a", "09:00", "10:00", "ul. Bielska 10, 43-100 Skoczów"),
+                   event("b", "14:00", "15:00", "ul. Górecka 5, 43-430 Skoczów")],
+                  candidates=[{"location": "ul. Testowa 1, 43-100 Skoczów", "label": "new"}])
+
+    slot = result["data"]["candidate_slots"][0]["slot"]
+    assert slot["after"]["event_id"] in ("a", "b") or slot["after"] == "depot"
+    assert result["data"]["unassigned"] == []
+    assert [visit.get("event_id") for visit in result["data"]["proposed"]["visits"]].count("a") == 1
+
+
+class FailingProvider:
+    name = "failing"
+
+    def __init__(self):
+        self.calls = 0
+
+    def geocode(self, address):
+        self.calls += 1
+        if self.calls == 1:
+            raise httpx.HTTPStatusError("429", request=httpx.Request("GET", "http://geocoder"),
+                                        response=httpx.Response(429))
+        return Coordinates(49.8, 18.8)
+
+    def close(self):
+        pass
+
+
+def test_provider_error_is_not_cached(tmp_path):
+    geocoder = CachedGeocoder(FailingProvider(), str(tmp_path / "geocode.sqlite3"))
+
+    assert geocoder.geocode("ul. Bielska 10, 43-100 Skoczów") is None
+    assert geocoder.geocode("ul. Bielska 10, 43-100 Skoczów") == Coordinates(49.8, 18.8)
+    geocoder.close()
+
+
+def test_failed_address_is_skipped_not_fatal(plan, monkeypatch):
+    def geocode(address):
+        if "Górecka" in address:
+            raise httpx.ConnectError("timeout")
+        return PLACES.get(address) or StubGeocoder(center=OFFICE).geocode(address)
+
+    monkeypatch.setattr(routing_command.get_geocoder().provider, "geocode", geocode)
+    result = plan([event("a", "09:00", "10:00", "ul. Bielska 10, 43-100 Skoczów"),
+                   event("b", "14:00", "15:00", "ul. Górecka 5, 43-430 Skoczów")])
+
+    assert [visit["event_id"] for visit in result["data"]["existing"]["visits"]] == ["a"]
+    assert result["data"]["skipped"] == [{"event_id": "b", "summary": "b", "reason": "address not found"}]
+
+
+def test_unset_geocoder_provider_is_an_error(monkeypatch):
+    monkeypatch.setattr(geocoding, "GEOCODER_PROVIDER", None)
+    monkeypatch.setattr(geocoding, "_geocoder", None)
+    monkeypatch.setattr(google_service, "get_many_events", lambda *args, **kwargs: [])
+
+    result = routing_command.plan_technician_route(RoutePlanParams(day=DAY))
+
+    assert "GEOCODER_PROVIDER is not set" in result["error"]
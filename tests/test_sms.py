@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from services import notification_service, outbox as outbox_module
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from services.outbox import Outbox, OutboxWorker
+
+
+class MockSMSAPI:
+    """
+    Stand-in for sms.do: answers every request with the next queued status
+    (200 when none are queued) and rejects numbers listed in `invalid`.
+    """
+
+    def __init__(self):
+        self.requests: list[dict] = []
+        self.statuses: list[int] = []
+        self.invalid: set[str] = set()
+        self.breaker_states: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        self.requests.append(payload)
+        self.breaker_states.append(notification_service.sms_breaker.state)
+        if self.statuses:
+            return httpx.Response(self.statuses.pop(0), json={"error": 13, "message": "Server error"})
+        if self.invalid & set(payload["to"].split(",")):
+            return httpx.Response(400, json={"error": 13, "message": "No correct phone numbers"})
+        return httpx.Response(200, json={"count": len(payload["to"].split(",")), "list": []})
+
+
+@pytest.fixture
+def smsapi(monkeypatch):
+    server = MockSMSAPI()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    monkeypatch.setattr(notification_service, "_http_client", client)
+    monkeypatch.setattr(notification_service, "sms_breaker", CircuitBreaker("SMSAPI", failure_threshold=2,
+                                                                            reset_timeout=0.05))
+    return server
+
+
+def sms(number: str, text: str = "Przypominamy o wizycie") -> dict:
+    return {"phone_number": number, "message": text}
+
+
+def test_same_text_goes_out_in_one_request(smsapi):
+    outcomes = asyncio.run(notification_service.send_bulk_sms_notification(
+        [sms("500100200"), sms("500100201"), sms("500100202")]))
+
+    assert [outcome["indexes"] for outcome in outcomes] == [[0, 1, 2]]
+    assert smsapi.requests[0]["to"] == "500100200,500100201,500100202"
+
+
+def test_rejected_batch_is_resent_one_by_one(smsapi):
+    smsapi.invalid = {"123"}
+
+    outcomes = asyncio.run(notification_service.send_bulk_sms_notification(
+        [sms("500100200", "Wizyta 9:00"), sms("123", "Wizyta 10:00"), sms("500100202", "Wizyta 11:00")]))
+
+    assert smsapi.requests[0]["message"] == "[%1%]"
+    assert [payload["to"] for payload in smsapi.requests[1:]] == ["500100200", "123", "500100202"]
+    assert [(outcome["indexes"], "error" in outcome) for outcome in outcomes] == \
+        [([0], False), ([1], True), ([2], False)]
+    assert outcomes[1]["error"].response.status_code == 400
+
+
+def test_failed_request_does_not_fail_the_others(smsapi):
+    # teksty z "|" nie mieszczą się w szablonie - osobne żądanie na każdy tekst
+    smsapi.statuses = [200, 503]
+
+    outcomes = asyncio.run(notification_service.send_bulk_sms_notification(
+        [sms("500100200", "A|B"), sms("500100201", "C|D"), sms("500100202", "A|B")]))
+
+    by_index = {index: outcome for outcome in outcomes for index in outcome["indexes"]}
+    assert len(smsapi.requests) == 2
+    assert sum("error" in outcome for outcome in outcomes) == 1
+    failed = next(outcome for outcome in outcomes if "error" in outcome)
+    assert failed["error"].response.status_code == 503
+    assert sorted(by_index) == [0, 1, 2]
+
+
+def test_breaker_opens_then_probes_and_closes(smsapi):
+    breaker = notification_service.sms_breaker
+    smsapi.statuses = [500, 500]
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await notification_service.send_sms_notification("500100200", "Test")
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await notification_service.send_sms_notification("500100200", "Test")
+        assert len(smsapi.requests) == 2
+
+        await asyncio.sleep(breaker.reset_timeout)
+        await notification_service.send_sms_notification("500100200", "Test")
+
+    asyncio.run(scenario())
+
+    assert smsapi.breaker_states == [CLOSED, CLOSED, HALF_OPEN]
+    assert breaker.state == CLOSED
+
+
+def test_outbox_settles_every_request_separately(smsapi, tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    smsapi.invalid = {"123"}
+    queued = [outbox.enqueue("sms", sms(number, f"Wizyta {hour}:00"))
+              for number, hour in (("500100200", 9), ("123", 10), ("500100202", 11))]
+
+    processed = asyncio.run(OutboxWorker(outbox)._process_sms())
+
+    assert processed == 3
+    statuses = [outbox.get(message["id"]) for message in queued]
+    assert [message["status"] for message in statuses] == \
+        [outbox_module.SENT, outbox_module.FAILED, outbox_module.SENT]
+    assert "400" in statuses[1]["last_error"]
+    outbox.close()
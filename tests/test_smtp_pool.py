@@ -0,0 +1,201 @@
+import asyncio
+import socket
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+
+from services.smtp_pool import SMTPPool
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+
+class Sink:
+    """
+    aiosmtpd handler counting sessions, NOOPs and messages.
+    """
+
+    def __init__(self):
+        self.sessions = 0
+        self.noops = 0
+        self.messages = 0
+        self.sending = 0
+        self.max_sending = 0
+        self.latency = 0.0
+        self.noop_latency = 0.0
+        self.drop_next = False
+        self.reject_next = False
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        self.noops += 1
+        await asyncio.sleep(self.noop_latency)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.drop_next:
+            self.drop_next = False
+            server.transport.close()
+            return "421 Closing connection"
+        if self.reject_next:
+            self.reject_next = False
+            return "554 Message rejected"
+        self.sending += 1
+        self.max_sending = max(self.max_sending, self.sending)
+        await asyncio.sleep(self.latency)
+        self.sending -= 1
+        self.messages += 1
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def sink():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = Sink()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    handler.port = port
+    yield handler
+    controller.stop()
+
+
+def message(index: int = 0) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = f"Test {index}"
+    msg.set_content("Treść")
+    return msg
+
+
+def run(sink, scenario, **options):
+    async def main():
+        pool = SMTPPool("127.0.0.1", sink.port, None, None, use_tls=False, **options)
+        pool.start()
+        try:
+            return await scenario(pool)
+        finally:
+            await pool.close()
+    return asyncio.run(main())
+
+
+def send(pool, index=0):
+    return pool.send_message(message(index), sender="biuro@example.com", recipients=["klient@example.com"])
+
+
+def test_session_is_reused_between_messages(sink):
+    async def scenario(pool):
+        for index in range(3):
+            await send(pool, index)
+
+    run(sink, scenario)
+
+    assert sink.messages == 3
+    assert sink.sessions == 1
+
+
+def test_concurrent_sessions_are_capped(sink):
+    sink.latency = 0.05
+
+    async def scenario(pool):
+        await asyncio.gather(*(send(pool, index) for index in range(6)))
+
+    run(sink, scenario, max_size=2)
+
+    assert sink.messages == 6
+    assert sink.max_sending == 2
+    assert sink.sessions == 2
+
+
+def test_message_is_retried_on_a_new_session_after_disconnect(sink):
+    async def scenario(pool):
+        await send(pool, 0)
+        sink.drop_next = True
+        await send(pool, 1)
+
+    run(sink, scenario)
+
+    assert sink.messages == 2
+    assert sink.sessions == 2
+
+
+def test_session_is_not_reused_after_rejected_message(sink):
+    async def scenario(pool):
+        await send(pool, 0)
+        sink.reject_next = True
+        with pytest.raises(aiosmtplib.SMTPResponseException):
+            await send(pool, 1)
+        await send(pool, 2)
+        return pool._open
+
+    assert run(sink, scenario) == 1
+    assert sink.messages == 2
+    assert sink.sessions == 2
+
+
+def test_cancelled_send_closes_its_session(sink):
+    sink.latency = 1
+
+    async def scenario(pool):
+        task = asyncio.ensure_future(send(pool))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return pool._open, len(pool._idle)
+
+    assert run(sink, scenario) == (0, 0)
+
+
+def test_keepalive_does_not_exceed_max_size(sink):
+    sink.noop_latency = 0.5
+
+    async def scenario(pool):
+        await send(pool, 0)
+        # keepalive trzyma jedyną sesję w trakcie NOOP, więc wysyłka otwiera drugą
+        await asyncio.sleep(0.3)
+        await send(pool, 1)
+        await asyncio.sleep(0.6)
+        return pool._open
+
+    assert run(sink, scenario, max_size=1, keepalive=0.1) == 1
+    assert sink.sessions == 2
+
+
+def test_idle_sessions_get_noop_keepalive(sink):
+    async def scenario(pool):
+        await send(pool)
+        await asyncio.sleep(0.35)
+        await send(pool)
+
+    run(sink, scenario, keepalive=0.1)
+
+    assert sink.noops >= 2
+    assert sink.sessions == 1
+
+
+def test_pool_can_be_restarted_on_another_loop(sink):
+    pool = SMTPPool("127.0.0.1", sink.port, None, None, use_tls=False, max_size=1)
+
+    async def serve():
+        pool.start()
+        try:
+            await asyncio.gather(send(pool), send(pool))
+        finally:
+            await pool.close()
+
+    asyncio.run(serve())
+    asyncio.run(serve())
+
+    assert sink.messages == 4
+
+
+def test_pool_must_be_started():
+    pool = SMTPPool("127.0.0.1", 25, None, None, use_tls=False)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(send(pool))
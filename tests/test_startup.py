@@ -0,0 +1,34 @@
+import startup
+
+
+def test_failed_warmup_is_retried_until_ready(monkeypatch):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(startup, "WARMUP_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(startup, "WARMUPS", {"flaky": flaky})
+    monkeypatch.setattr(startup, "readiness", startup.Readiness())
+
+    for thread in startup.start_warmups():
+        thread.join(timeout=5)
+
+    assert len(calls) == 3
+    assert startup.readiness.snapshot()["dependencies"]["flaky"]["status"] == startup.READY
+
+
+def test_retries_stop_on_shutdown(monkeypatch):
+    monkeypatch.setattr(startup, "WARMUP_RETRY_SECONDS", 60)
+    monkeypatch.setattr(startup, "WARMUPS", {"down": lambda: 1 / 0})
+    monkeypatch.setattr(startup, "readiness", startup.Readiness())
+
+    threads = startup.start_warmups()
+    startup._stopping.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert startup.readiness.snapshot()["status"] == startup.DEGRADED
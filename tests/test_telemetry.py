@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+
+import dispatcher
+import main
+from commands import models
+from telemetry import TOOL_CALLS, span, span_exporter
+
+
+def test_error_result_marks_tool_call_failed(monkeypatch):
+    monkeypatch.setitem(dispatcher.COMMANDS, "get_notification_status", lambda params: {"error": "not found"})
+    span_exporter.clear()
+    failed = TOOL_CALLS.value(tool="get_notification_status", status="error")
+
+    result = asyncio.run(dispatcher.dispatch_tool("get_notification_status",
+                                                  models.NotificationStatusParams(message_id="x")))
+
+    assert result == {"result": {"error": "not found"}}
+    assert TOOL_CALLS.value(tool="get_notification_status", status="error") == failed + 1
+    finished = [s for s in span_exporter.get_finished_spans() if s.name == "tool.get_notification_status"]
+    assert finished[-1].status == "ERROR"
+    assert finished[-1].error == "not found"
+
+
+def traces(query: str):
+    request = Request({"type": "http", "method": "GET", "path": "/traces",
+                       "query_string": query.encode(), "headers": []})
+    return asyncio.run(main.traces(request))
+
+
+def test_traces_limit_is_validated_and_clamped():
+    span_exporter.clear()
+    for index in range(5):
+        with span(f"test.{index}"):
+            pass
+
+    assert traces("limit=abc").status_code == 400
+    assert [s["name"] for s in json.loads(traces("limit=0").body)] == ["test.4"]
+    assert len(json.loads(traces("limit=2").body)) == 2
+    assert len(json.loads(traces("limit=1000000").body)) == 5